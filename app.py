@@ -1,4 +1,11 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 
 from flask import Flask, render_template, request, redirect, url_for, flash, session
 
@@ -8,6 +15,118 @@ app.secret_key = 'your_secret_key'  # session 需要這個金鑰
 API_BASE_URL = "http://127.0.0.1:8000/api/v1"
 
 
+# ==========================================
+# 0. 呼叫後端的共用工具
+# ==========================================
+
+# 共用的 HTTP Session：重複使用 TCP 連線 (keep-alive)，不必每次呼叫都重新握手
+http = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+http.mount("http://", _adapter)
+http.mount("https://", _adapter)
+HTTP_TIMEOUT = 10
+
+# 互不相依的後端呼叫丟到執行緒池平行處理
+executor = ThreadPoolExecutor(max_workers=8)
+
+# 下拉選單用的參考資料 (商品、供應商、倉庫、員工) 短暫快取
+# 過期後帶 If-None-Match 重新驗證，資料沒變時後端回 304，直接沿用快取內容
+REFERENCE_TTL = 5  # 秒 (過期後只是重新驗證，沒變動時是很便宜的 304)
+# 有連上後端的異動推送時，主檔變動會主動清掉快取，快取可以放久一點
+REFERENCE_TTL_FOLLOWING = 300
+_reference_cache = {}
+_following_changes = False
+
+def fetch_reference(path):
+    now = time.monotonic()
+    cached = _reference_cache.get(path)
+    if cached and cached[0] > now:
+        return cached[2]
+
+    headers = {"If-None-Match": cached[1]} if cached and cached[1] else {}
+    response = http.get(f"{API_BASE_URL}{path}", headers=headers, timeout=HTTP_TIMEOUT)
+    if response.status_code == 304 and cached:
+        data = cached[2]
+    else:
+        response.raise_for_status()
+        data = response.json()
+    ttl = REFERENCE_TTL_FOLLOWING if _following_changes else REFERENCE_TTL
+    _reference_cache[path] = (now + ttl, response.headers.get("ETag"), data)
+    return data
+
+def fetch_references(*paths):
+    # 同時送出所有請求，總耗時約等於最慢的那一個；失敗的項目回傳空清單
+    futures = [executor.submit(fetch_reference, path) for path in paths]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception:
+            results.append([])
+    return results
+
+def invalidate_reference(path):
+    # 主檔新增 / 刪除後清掉快取，下拉選單馬上看得到
+    _reference_cache.pop(path, None)
+
+
+# 主檔異動推送：背景執行緒跟隨後端的 /changes/stream (SSE)，其他人修改主檔時也立即清掉對應的快取；
+# 斷線時退回 REFERENCE_TTL 的重新驗證，並以最後收到的序號 (Last-Event-ID) 重新連線
+REFERENCE_ENTITIES = {"product": "/products/", "supplier": "/suppliers/", "warehouse": "/warehouse/", "staff": "/staff/"}
+CHANGE_RETRY = 3  # 秒
+# 已啟動跟隨執行緒的程序 (fork 出來的 worker 沒有繼承執行緒，要自己再啟動一次)
+_follower_pid = None
+_follower_lock = threading.Lock()
+
+def follow_changes():
+    global _following_changes
+    last_event_id = None
+    params = [("entity", entity) for entity in REFERENCE_ENTITIES]
+    # 後端連不上時只在第一次記錄，重新連上之後再斷線才會再記錄
+    warned = False
+    while True:
+        headers = {"Last-Event-ID": last_event_id} if last_event_id else {}
+        try:
+            # 長連線不佔用共用 Session 的連線池；後端每 15 秒送一次心跳，讀取逾時設得比它長
+            with requests.get(f"{API_BASE_URL}/changes/stream", params=params, headers=headers,
+                              stream=True, timeout=(HTTP_TIMEOUT, 60)) as response:
+                response.raise_for_status()
+                _following_changes = True
+                warned = False
+                app.logger.info("following backend changes from event %s", last_event_id or "now")
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("id:"):
+                        last_event_id = line[3:].strip()
+                    elif line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:") and event == "change":
+                        invalidate_reference(REFERENCE_ENTITIES[json.loads(line[5:])["ceEntity"]])
+                    elif line.startswith("data:") and event == "reset":
+                        _reference_cache.clear()
+        except requests.RequestException as e:
+            if not warned:
+                app.logger.warning("change stream unavailable (%s), retrying every %ss", e, CHANGE_RETRY)
+                warned = True
+        except Exception:
+            app.logger.exception("change stream failed, retrying in %ss", CHANGE_RETRY)
+        # 斷線期間的快取改回短時間重新驗證
+        _following_changes = False
+        _reference_cache.clear()
+        time.sleep(CHANGE_RETRY)
+
+@app.before_request
+def start_change_follower():
+    # 處理第一個請求時才啟動 (每個程序一次)：只 import app 的工具、測試與 debug reloader 的監看程序不會連線
+    global _follower_pid
+    if _follower_pid == os.getpid():
+        return
+    with _follower_lock:
+        if _follower_pid != os.getpid():
+            threading.Thread(target=follow_changes, name="follow-changes", daemon=True).start()
+            _follower_pid = os.getpid()
+
+
 # ==========================================
 # 1. 登入
 # ==========================================
@@ -56,7 +175,7 @@ def logout():
 @app.route('/product')
 def product_page():
     try:
-        response = requests.get(f"{API_BASE_URL}/products/")
+        response = http.get(f"{API_BASE_URL}/products/")
         products = response.json() if response.status_code == 200 else []
     except:
         products = []
@@ -72,7 +191,8 @@ def add_product():
             "prSpec": request.form['prSpec'] if request.form['prSpec'] else None
         }
         try:
-            requests.post(f"{API_BASE_URL}/products/", json=payload)
+            http.post(f"{API_BASE_URL}/products/", json=payload)
+            invalidate_reference("/products/")
             return redirect(url_for('product_page'))
         except Exception as e:
             flash(f'錯誤：{str(e)}', 'danger')
@@ -81,7 +201,8 @@ def add_product():
 @app.route('/product/delete/<int:product_id>', methods=['POST'])
 def delete_product(product_id):
     try:
-        requests.delete(f"{API_BASE_URL}/products/{product_id}")
+        http.delete(f"{API_BASE_URL}/products/{product_id}")
+        invalidate_reference("/products/")
     except:
         flash('刪除失敗', 'danger')
     return redirect(url_for('product_page'))
@@ -93,7 +214,7 @@ def delete_product(product_id):
 @app.route('/supplier')
 def supplier_page():
     try:
-        response = requests.get(f"{API_BASE_URL}/suppliers/")
+        response = http.get(f"{API_BASE_URL}/suppliers/")
         suppliers = response.json() if response.status_code == 200 else []
     except:
         suppliers = []
@@ -108,7 +229,8 @@ def add_supplier():
             "suAddress": request.form['suAddress']
         }
         try:
-            requests.post(f"{API_BASE_URL}/suppliers/", json=payload)
+            http.post(f"{API_BASE_URL}/suppliers/", json=payload)
+            invalidate_reference("/suppliers/")
             return redirect(url_for('supplier_page'))
         except:
             flash('新增失敗', 'danger')
@@ -117,7 +239,8 @@ def add_supplier():
 @app.route('/supplier/delete/<int:supplier_id>', methods=['POST'])
 def delete_supplier(supplier_id):
     try:
-        requests.delete(f"{API_BASE_URL}/suppliers/{supplier_id}")
+        http.delete(f"{API_BASE_URL}/suppliers/{supplier_id}")
+        invalidate_reference("/suppliers/")
     except:
         pass
     return redirect(url_for('supplier_page'))
@@ -129,7 +252,7 @@ def delete_supplier(supplier_id):
 @app.route('/warehouse')
 def warehouse_page():
     try:
-        response = requests.get(f"{API_BASE_URL}/warehouse/")
+        response = http.get(f"{API_BASE_URL}/warehouse/")
         warehouses = response.json() if response.status_code == 200 else []
     except:
         warehouses = []
@@ -142,14 +265,16 @@ def add_warehouse():
             "waName": request.form['waName'],
             "waLocation": request.form['waLocation']
         }
-        requests.post(f"{API_BASE_URL}/warehouse/", json=payload)
+        http.post(f"{API_BASE_URL}/warehouse/", json=payload)
+        invalidate_reference("/warehouse/")
         return redirect(url_for('warehouse_page'))
     return render_template('add_warehouse.html')
 
 @app.route('/warehouse/delete/<int:warehouse_id>', methods=['POST'])
 def delete_warehouse(warehouse_id):
     try:
-        requests.delete(f"{API_BASE_URL}/warehouse/{warehouse_id}")
+        http.delete(f"{API_BASE_URL}/warehouse/{warehouse_id}")
+        invalidate_reference("/warehouse/")
     except:
         pass
     return redirect(url_for('warehouse_page'))
@@ -161,7 +286,7 @@ def delete_warehouse(warehouse_id):
 @app.route('/staff')
 def staff_page():
     try:
-        response = requests.get(f"{API_BASE_URL}/staff/")
+        response = http.get(f"{API_BASE_URL}/staff/")
         staff_list = response.json() if response.status_code == 200 else []
     except:
         staff_list = []
@@ -171,14 +296,16 @@ def staff_page():
 def add_staff():
     if request.method == 'POST':
         payload = {"stName": request.form['stName'], "stDept": request.form['stDept']}
-        requests.post(f"{API_BASE_URL}/staff/", json=payload)
+        http.post(f"{API_BASE_URL}/staff/", json=payload)
+        invalidate_reference("/staff/")
         return redirect(url_for('staff_page'))
     return render_template('add_staff.html')
 
 @app.route('/staff/delete/<int:staff_id>', methods=['POST'])
 def delete_staff(staff_id):
     try:
-        requests.delete(f"{API_BASE_URL}/staff/{staff_id}")
+        http.delete(f"{API_BASE_URL}/staff/{staff_id}")
+        invalidate_reference("/staff/")
     except:
         pass
     return redirect(url_for('staff_page'))
@@ -190,7 +317,7 @@ def delete_staff(staff_id):
 @app.route('/inbound')
 def inbound_page():
     try:
-        response = requests.get(f"{API_BASE_URL}/inbound/")
+        response = http.get(f"{API_BASE_URL}/inbound/")
         if response.status_code == 200:
             inbound_list = response.json()
         else:
@@ -224,7 +351,7 @@ def add_inbound():
         }
 
         try:
-            response = requests.post(f"{API_BASE_URL}/inbound/", json=payload)
+            response = http.post(f"{API_BASE_URL}/inbound/", json=payload)
             if response.status_code == 201:
                 flash('進貨單建立成功！', 'success')
                 return redirect(url_for('inbound_page'))
@@ -233,15 +360,10 @@ def add_inbound():
         except Exception as e:
             flash(f'連線錯誤：{str(e)}', 'danger')
 
-    # GET: 準備選單資料
-    products, suppliers, warehouses, staff_list = [], [], [], []
-    try:
-        products = requests.get(f"{API_BASE_URL}/products/").json()
-        suppliers = requests.get(f"{API_BASE_URL}/suppliers/").json()
-        warehouses = requests.get(f"{API_BASE_URL}/warehouse/").json()
-        staff_list = requests.get(f"{API_BASE_URL}/staff/").json()
-    except:
-        pass
+    # GET: 準備選單資料 (平行取得)
+    products, suppliers, warehouses, staff_list = fetch_references(
+        "/products/", "/suppliers/", "/warehouse/", "/staff/"
+    )
 
     return render_template('add_inbound.html', 
                          products=products, 
@@ -252,7 +374,7 @@ def add_inbound():
 @app.route('/inbound/delete/<int:inbound_id>', methods=['POST'])
 def delete_inbound(inbound_id):
     try:
-        requests.delete(f"{API_BASE_URL}/inbound/{inbound_id}")
+        http.delete(f"{API_BASE_URL}/inbound/{inbound_id}")
     except:
         flash('刪除失敗', 'danger')
     return redirect(url_for('inbound_page'))
@@ -264,7 +386,7 @@ def delete_inbound(inbound_id):
 @app.route('/requisitions')  # <--- 網址改成有 s
 def requisition_page():
     try:
-        response = requests.get(f"{API_BASE_URL}/requisitions/")
+        response = http.get(f"{API_BASE_URL}/requisitions/")
         if response.status_code == 200:
             req_list = response.json()
         else:
@@ -303,7 +425,7 @@ def add_requisition():
         }
         
         try:
-            response = requests.post(f"{API_BASE_URL}/requisitions/", json=payload)
+            response = http.post(f"{API_BASE_URL}/requisitions/", json=payload)
             if response.status_code == 201:
                 flash(f'領料單建立成功！共包含 {len(details_payload)} 筆商品。', 'success')
                 return redirect(url_for('requisition_page'))
@@ -312,14 +434,8 @@ def add_requisition():
         except Exception as e:
             flash(f'連線錯誤：{str(e)}', 'danger')
 
-    # GET: 準備選單資料 (保持不變)
-    products, warehouses, staff_list = [], [], []
-    try:
-        products = requests.get(f"{API_BASE_URL}/products/").json()
-        warehouses = requests.get(f"{API_BASE_URL}/warehouse/").json()
-        staff_list = requests.get(f"{API_BASE_URL}/staff/").json()
-    except:
-        pass
+    # GET: 準備選單資料 (平行取得)
+    products, warehouses, staff_list = fetch_references("/products/", "/warehouse/", "/staff/")
 
     return render_template('add_requisitions.html', 
                          products=products, 
@@ -329,7 +445,7 @@ def add_requisition():
 @app.route('/requisitions/delete/<int:req_id>', methods=['POST']) # <--- 網址改成有 s
 def delete_requisition(req_id):
     try:
-        requests.delete(f"{API_BASE_URL}/requisitions/{req_id}")
+        http.delete(f"{API_BASE_URL}/requisitions/{req_id}")
         flash('領料單已刪除', 'success')
     except:
         flash('刪除失敗', 'danger')
@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+
+from app.schemas.change import ChangeEventRead, ChangePage
+from app.core.changes import iter_changes, read_changes, resume_point, seq_bounds
+
+router = APIRouter(prefix="/changes", tags=["Changes"])
+
+Entity = Literal["product", "staff", "supplier", "warehouse", "inbound", "requisition"]
+
+# SSE 斷線後瀏覽器重新連線前等待的毫秒數
+SSE_RETRY_MS = 3000
+
+def _event(event) -> ChangeEventRead:
+    return ChangeEventRead.model_validate(event, from_attributes=True)
+
+@router.get("/", response_model=ChangePage)
+async def get_changes(
+    after: int = Query(0, ge=0, description="上次收到的最後一個序號 (ceSeq)"),
+    entity: Optional[List[Entity]] = Query(None, description="只取這些種類的異動"),
+    limit: int = Query(500, ge=1, le=5000),
+):
+    # 分頁讀取異動事件 (不方便維持長連線的用戶端改用輪詢)：以回應的 last_seq 作為下一次的 after
+    start, reset = await resume_point(after)
+    if reset:
+        low, _ = await seq_bounds()
+        return ChangePage(last_seq=start, reset=True, oldest_seq=low)
+    batch = await read_changes(start, limit, set(entity) if entity else None)
+    return ChangePage(items=[_event(e) for e in batch.events], last_seq=batch.last_seq)
+
+@router.get("/stream")
+async def stream_changes(
+    after: Optional[int] = Query(None, ge=0, description="從這個序號之後開始；未指定時只推送之後的新異動"),
+    entity: Optional[List[Entity]] = Query(None, description="只推送這些種類的異動"),
+    last_event_id: Optional[int] = Header(None, description="EventSource 重新連線時自動帶入"),
+):
+    # Server-Sent Events：event: change 的 id 為序號；event: reset 代表中間的事件已清除，需重新取得完整清單
+    # 資料只帶 (種類, 動作, 主鍵)，內容以各 router 的 batch-get 取回
+    start = last_event_id if last_event_id is not None else after
+    entities = set(entity) if entity else None
+
+    async def events():
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        async for kind, item in iter_changes(start, entities):
+            if kind == "change":
+                yield f"id: {item.ceSeq}\nevent: change\ndata: {_event(item).model_dump_json()}\n\n"
+            elif kind == "reset":
+                yield f"id: {item}\nevent: reset\ndata: {{\"last_seq\": {item}}}\n\n"
+            else:
+                yield ": ping\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # 不快取，並關閉反向代理 (nginx) 的緩衝，事件才會立即送達
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/ws")
+async def websocket_changes(
+    websocket: WebSocket,
+    after: Optional[int] = Query(None, ge=0),
+    entity: Optional[List[Entity]] = Query(None),
+):
+    # 與 /stream 相同的事件，每則一個 JSON 訊息: {"event": "change" | "reset" | "ping", ...}
+    await websocket.accept()
+    try:
+        async for kind, item in iter_changes(after, set(entity) if entity else None):
+            if kind == "change":
+                await websocket.send_text(f'{{"event": "change", "data": {_event(item).model_dump_json()}}}')
+            elif kind == "reset":
+                await websocket.send_json({"event": "reset", "last_seq": item})
+            else:
+                await websocket.send_json({"event": "ping"})
+    except WebSocketDisconnect:
+        pass
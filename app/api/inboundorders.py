@@ -1,13 +1,25 @@
-from fastapi import APIRouter, HTTPException, Query, status, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status, Depends
+from typing import Callable, List, Literal, Optional
 from datetime import date
-from sqlmodel import select
+from sqlmodel import select, tuple_
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.schemas.inboundorder import InboundOrder as InboundOrderSchema, InboundOrderCreate, InboundOrderRead
-from app.models.inbound_order import InboundOrder, InboundDetail
+from app.schemas.inboundorder import InboundOrder as InboundOrderSchema, InboundOrderCreate, InboundOrderRead, InboundOrderPatch, InboundDetailBase
+from app.models.inbound_order import InboundOrder, InboundDetail, InboundOrderArchive
 from app.core.database import get_db
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.export import export_response, inbound_export_statement
+from app.core.order_reads import inbound_headers, load_inbound_orders, json_response, with_archive
+from app.core.archive import include_archive
+from app.core.inventory import StockDeltas, add_stock_deltas, apply_stock_deltas, check_stock, stock_guard
+from app.schemas.batch import BatchGetRequest, BatchGetResult
+from app.core.batch import batch_result
+from app.core.order_details import merge_detail_patch, sync_details
+from app.core.rollup import add_inbound_volume, apply_volume_deltas
+from app.core.inbound_import import import_inbound_orders
+from app.core.streaming import detect_format
+from app.schemas.bulk import BulkImportResult
 
 router = APIRouter(prefix="/inbound", tags=["Inbound Orders"])
 
@@ -16,45 +28,75 @@ async def get_inbound_orders(
     io_date: Optional[date] = Query(None, description="篩選進貨日期"),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, le=100),
+    after: Optional[str] = Query(None, description="分頁游標 (取自上一頁回應的 X-Next-Cursor 標頭，使用時忽略 skip)"),
+    include_archived: bool = Query(False, description="一併列出已封存的舊單 (篩選的日期已封存時自動包含)"),
     db: AsyncSession = Depends(get_db)
 ):
-    statement = select(InboundOrder).options(
-        selectinload(InboundOrder.details).options(
-            selectinload(InboundDetail.product),
-            selectinload(InboundDetail.warehouse)
-        ),
-        selectinload(InboundOrder.supplier),
-        selectinload(InboundOrder.staff)
-    )
-    
-    if io_date:
-        statement = statement.where(InboundOrder.ioDate == io_date)
-    
-    # 排序：新單在後 (或依 ID 倒序)
-    statement = statement.order_by(InboundOrder.InboundID.desc())
-    if limit > 0:
-        statement = statement.offset(skip).limit(limit)
-    
-    result = await db.exec(statement)
-    return result.all()
+    # 游標分頁：直接從上一頁最後一筆的 (ioDate, InboundID) 之後開始，深頁也不必掃過前面的資料
+    cursor = tuple(decode_cursor(after, date.fromisoformat, int)) if after else None
+
+    def page(model):
+        # 快速路徑：Core 查詢直接組 dict，不建立 ORM 物件
+        statement = inbound_headers(model)
+        if io_date:
+            statement = statement.where(model.ioDate == io_date)
+        if cursor:
+            statement = statement.where(tuple_(model.ioDate, model.InboundID) < cursor)
+        # 排序：新單在前 (日期倒序，同日再依 ID 倒序)
+        return statement.order_by(model.ioDate.desc(), model.InboundID.desc())
+
+    # 預設只查 hot 表 (近期的單據)
+    archived = await include_archive("inbound", include_archived, io_date)
+    if archived:
+        statement = with_archive(page, InboundOrder, InboundOrderArchive, "ioDate", "InboundID", 0 if after else skip, limit)
+    else:
+        statement = page(InboundOrder)
+        if limit > 0:
+            if not after:
+                statement = statement.offset(skip)
+            statement = statement.limit(limit)
+
+    orders = await load_inbound_orders(db, statement, archived)
+    response = json_response(orders)
+    set_next_cursor(response, orders, limit, lambda o: (o["ioDate"], o["InboundID"]))
+    return response
+
+@router.get("/export")
+async def export_inbound(
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    date_from: Optional[date] = Query(None, description="起始日期 (含)"),
+    date_to: Optional[date] = Query(None, description="結束日期 (含)"),
+    include_archived: bool = Query(False, description="一併匯出已封存的舊單 (date_from 早於封存日期時自動包含)"),
+):
+    # 串流匯出進貨歷史 (主單 + 明細攤平)，不受 limit 100 限制；未指定 date_from 時只匯出 hot 表
+    archived = await include_archive("inbound", include_archived, date_from)
+    return export_response(inbound_export_statement(date_from, date_to, archived), format, "inbound")
 
 @router.get("/{inbound_id}", response_model=InboundOrderRead)
 async def get_inbound_order(inbound_id: int, db: AsyncSession = Depends(get_db)):
-    statement = select(InboundOrder).where(InboundOrder.InboundID == inbound_id).options(
-        selectinload(InboundOrder.details).options(
-            selectinload(InboundDetail.product),
-            selectinload(InboundDetail.warehouse)
-        ),
-        selectinload(InboundOrder.supplier),
-        selectinload(InboundOrder.staff)
-    )
-
-    result = await db.exec(statement)
-    order = result.first()
+    orders = await load_inbound_orders(db, inbound_headers().where(InboundOrder.InboundID == inbound_id))
+    if not orders:
+        # 已封存的單據
+        archived = inbound_headers(InboundOrderArchive).where(InboundOrderArchive.InboundID == inbound_id)
+        orders = await load_inbound_orders(db, archived, archived=True)
     
-    if not order:
+    if not orders:
         raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    return json_response(orders[0])
+
+@router.post("/batch-get", response_model=BatchGetResult[InboundOrderRead])
+async def batch_get_inbound_orders(request: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    # 一次取回多張進貨單 (含明細)：主單一次 IN 查詢，依請求順序回傳並列出查無資料的 ID
+    found = {}
+    if request.ids:
+        orders = await load_inbound_orders(db, inbound_headers().where(InboundOrder.InboundID.in_(set(request.ids))))
+        found = {o["InboundID"]: o for o in orders}
+        # hot 表沒有的再到封存表找
+        missing = set(request.ids) - found.keys()
+        if missing:
+            archived = inbound_headers(InboundOrderArchive).where(InboundOrderArchive.InboundID.in_(missing))
+            found.update((o["InboundID"], o) for o in await load_inbound_orders(db, archived, archived=True))
+    return json_response(batch_result(request.ids, found))
 
 @router.post("/", response_model=InboundOrderSchema, status_code=status.HTTP_201_CREATED)
 async def create_inbound_order(order_data: InboundOrderCreate, db: AsyncSession = Depends(get_db)):
@@ -82,6 +124,10 @@ async def create_inbound_order(order_data: InboundOrderCreate, db: AsyncSession
             WarehouseID=d.WarehouseID
         )
         db.add(new_detail)
+
+    # 3. 同一交易內增加庫存與進貨量彙總
+    await apply_stock_deltas(db, add_stock_deltas({}, order_data.details, "idQuantity"))
+    await apply_volume_deltas(db, add_inbound_volume({}, new_order.ioDate, new_order.SupplierID, order_data.details))
     
     await db.commit()
     # 重新讀取以包含 details
@@ -89,48 +135,90 @@ async def create_inbound_order(order_data: InboundOrderCreate, db: AsyncSession
     result = await db.exec(statement)
     return result.first()
 
-@router.put("/{inbound_id}", response_model=InboundOrderSchema)
-async def update_inbound_order(inbound_id: int, order_data: InboundOrderCreate, db: AsyncSession = Depends(get_db)):
-    # 1. 撈取舊資料 (含明細)
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_inbound_orders(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="未指定時依 Content-Type 判斷"),
+    chunk_size: int = Query(500, ge=1, le=5000, description="每個交易寫入的單據數"),
+    db: AsyncSession = Depends(get_db)
+):
+    # 串流匯入大量進貨單 (CSV / NDJSON)，每個 chunk 一個交易，回傳各 chunk 的成功 / 失敗筆數
+    fmt = detect_format(request.headers.get("content-type"), format)
+    return await import_inbound_orders(db, request.stream(), fmt, chunk_size)
+
+async def _get_order_with_details(db: AsyncSession, inbound_id: int, lock: bool = False) -> InboundOrder:
     statement = select(InboundOrder).where(InboundOrder.InboundID == inbound_id).options(selectinload(InboundOrder.details))
+    if lock:
+        # 臨界區內重讀：覆蓋 session 中先前載入的明細；PostgreSQL 鎖住主單，同一張單的修改依序進行
+        statement = statement.execution_options(populate_existing=True)
+        if db.get_bind().dialect.name == "postgresql":
+            statement = statement.with_for_update(of=InboundOrder)
     result = await db.exec(statement)
     order = result.first()
-    
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    
-    # 2. 更新主單
-    order.ioDate = order_data.ioDate
-    order.SupplierID = order_data.SupplierID
-    order.StaffID = order_data.StaffID
-    db.add(order)
-    
-    # 3. 更新明細 (策略: 刪除舊的 -> 加入新的)
-    # 找出目前所有明細並刪除
-    for detail in order.details:
-        await db.delete(detail)
-        
-    # 加入新明細
-    for d in order_data.details:
-        new_detail = InboundDetail(
-            InboundID=inbound_id,
-            ProductID=d.ProductID,
-            idQuantity=d.idQuantity,
-            WarehouseID=d.WarehouseID
-        )
-        db.add(new_detail)
-        
-    await db.commit()
-    await db.refresh(order)
     return order
 
+def _inbound_deltas(details, lines) -> StockDeltas:
+    # 庫存增減 = 扣回舊明細 + 加上新明細；減少進貨量 / 刪除明細時會扣庫存，需要檢查 (已被領用就不能減)
+    deltas = add_stock_deltas({}, details, "idQuantity", sign=-1)
+    return add_stock_deltas(deltas, lines, "idQuantity")
+
+async def _update_order(
+    db: AsyncSession, inbound_id: int, header: dict, build_lines: Callable[[List[InboundDetail]], List[InboundDetailBase]]
+) -> InboundOrder:
+    # 與領料單相同：先以目前讀到的明細決定要鎖的 SKU，進入臨界區後重讀 (並鎖住) 再計算增減
+    order = await _get_order_with_details(db, inbound_id)
+    async with stock_guard(db, _inbound_deltas(order.details, build_lines(order.details))):
+        order = await _get_order_with_details(db, inbound_id, lock=True)
+        lines = build_lines(order.details)
+        deltas = _inbound_deltas(order.details, lines)
+        await check_stock(db, deltas)
+
+        # 進貨量彙總：舊的日期 / 供應商沖銷舊明細，再以新的加上新明細
+        volume = add_inbound_volume({}, order.ioDate, order.SupplierID, order.details, sign=-1)
+
+        # 1. 更新主單
+        for key, value in header.items():
+            setattr(order, key, value)
+        db.add(order)
+
+        # 2. 更新明細 (策略: 依 ProductID 比對，只寫入有變動的列) 並同步庫存
+        await sync_details(db, InboundDetail, "InboundID", order.InboundID, "idQuantity", order.details, lines)
+        await apply_stock_deltas(db, deltas)
+        await apply_volume_deltas(db, add_inbound_volume(volume, order.ioDate, order.SupplierID, lines))
+
+        await db.commit()
+
+    await db.refresh(order, attribute_names=["details"])
+    return order
+
+@router.put("/{inbound_id}", response_model=InboundOrderSchema)
+async def update_inbound_order(inbound_id: int, order_data: InboundOrderCreate, db: AsyncSession = Depends(get_db)):
+    # 整張單覆蓋：明細以傳入的清單為準
+    return await _update_order(db, inbound_id, order_data.model_dump(exclude={'details'}), lambda details: order_data.details)
+
+@router.patch("/{inbound_id}", response_model=InboundOrderSchema)
+async def patch_inbound_order(inbound_id: int, patch: InboundOrderPatch, db: AsyncSession = Depends(get_db)):
+    # 部分更新：只傳有變動的主單欄位與明細列 (套用在臨界區內重讀的明細上)
+    return await _update_order(
+        db, inbound_id, patch.model_dump(exclude={'details'}, exclude_none=True),
+        lambda details: merge_detail_patch(details, patch.details, "idQuantity", InboundDetailBase),
+    )
+
 @router.delete("/{inbound_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_inbound_order(inbound_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.get(InboundOrder, inbound_id)
-    if not result:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    # 由於設定了 cascade="all, delete-orphan"，刪除主單會自動刪除明細
-    await db.delete(result)
-    await db.commit()
+    # 扣回這張進貨單的庫存：進來的貨已被領用時回 409，庫存不會變成負數
+    order = await _get_order_with_details(db, inbound_id)
+    async with stock_guard(db, add_stock_deltas({}, order.details, "idQuantity", sign=-1)):
+        result = await _get_order_with_details(db, inbound_id, lock=True)
+        deltas = add_stock_deltas({}, result.details, "idQuantity", sign=-1)
+        await check_stock(db, deltas)
+
+        await apply_stock_deltas(db, deltas)
+        await apply_volume_deltas(db, add_inbound_volume({}, result.ioDate, result.SupplierID, result.details, sign=-1))
+
+        # 由於設定了 cascade="all, delete-orphan"，刪除主單會自動刪除明細
+        await db.delete(result)
+        await db.commit()
     return None
\ No newline at end of file
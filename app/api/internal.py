@@ -0,0 +1,101 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from typing import Dict, Optional
+
+from app.schemas.internal import PoolStatus, ReplicaSetStatus, ReplicaStatus, CacheStats, QueryLogSummary, QueryStat, SlowQuery, RepeatedQuery
+from app.core.cache import cache_stats, clear_caches
+from app.core.database import engine, pool_wait_stats, TimedQueuePool
+from app.core.config import settings
+from app.core.replicas import replica_set
+from app.core.querylog import explain, format_parameters, query_log
+
+
+async def require_internal_access(x_internal_token: Optional[str] = Header(None)):
+    # 設定 INTERNAL_API_TOKEN 時需帶上相同的 X-Internal-Token；未設定時正式環境不開放 (當作不存在)
+    token = settings.internal_api_token
+    if token is None:
+        if settings.is_production:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+        return
+    if x_internal_token is None or not secrets.compare_digest(x_internal_token, token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="需要有效的 X-Internal-Token")
+
+
+router = APIRouter(prefix="/_internal", tags=["Internal"], dependencies=[Depends(require_internal_access)])
+
+@router.get("/pool", response_model=PoolStatus)
+async def get_pool_status():
+    # 連線池使用狀況：checked_out 接近 size + max_overflow 或 wait 時間上升代表連線池飽和
+    pool = engine.pool
+    status = PoolStatus(pool_class=type(pool).__name__)
+    if isinstance(pool, TimedQueuePool):
+        status.size = pool.size()
+        status.checked_out = pool.checkedout()
+        status.idle = pool.checkedin()
+        status.overflow = max(pool.overflow(), 0)
+        status.max_overflow = settings.db_max_overflow
+
+    stats = pool_wait_stats
+    status.checkouts = stats.checkouts
+    status.timeouts = stats.timeouts
+    if stats.checkouts:
+        status.wait_avg_ms = round(stats.total_wait / stats.checkouts * 1000, 3)
+    status.wait_max_ms = round(stats.max_wait * 1000, 3)
+    return status
+
+@router.get("/replicas", response_model=ReplicaSetStatus)
+async def get_replica_status():
+    # 讀取副本的延遲與分到的讀取量；fallback 持續增加代表副本跟不上或不可用，GET 都回到主庫
+    return ReplicaSetStatus(
+        balance=replica_set.balance,
+        max_lag_seconds=replica_set.max_lag,
+        replicas=[
+            ReplicaStatus(
+                name=replica.name, healthy=replica.healthy, lag_seconds=replica.lag,
+                checked_out=replica.checked_out, reads=replica.reads, error=replica.error,
+            )
+            for replica in replica_set.members
+        ],
+        unavailable_fallbacks=replica_set.unavailable_fallbacks,
+        stale_fallbacks=replica_set.stale_fallbacks,
+    )
+
+@router.get("/cache", response_model=Dict[str, CacheStats])
+async def get_cache_stats():
+    # 主檔快取的命中率與大小
+    return cache_stats()
+
+@router.delete("/cache", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_cache():
+    clear_caches()
+    return None
+
+
+@router.get("/queries", response_model=QueryLogSummary)
+async def get_query_log(
+    top: int = Query(20, ge=1, le=200, description="依總執行時間列出前 N 種語句"),
+    explain_slow: bool = Query(False, alias="explain", description="對尚未分析的慢查詢執行 EXPLAIN"),
+):
+    # 慢查詢、疑似 N+1 的請求與各語句 (fingerprint) 的累計時間
+    summary = QueryLogSummary(slow_query_ms=settings.slow_query_ms, n_plus_one_threshold=settings.n_plus_one_threshold)
+    ranked = sorted(query_log.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+    summary.top = [
+        QueryStat(fingerprint=fp, statement=statement, count=count, total_ms=round(total * 1000, 3), max_ms=round(longest * 1000, 3))
+        for fp, (statement, count, total, longest) in ranked
+    ]
+
+    # EXPLAIN 本身也會記錄進慢查詢，先複製一份再逐筆處理
+    for entry in reversed(list(query_log.slow)):
+        plan = await explain(entry) if explain_slow else entry.plan
+        summary.slow.append(SlowQuery(
+            fingerprint=entry.fingerprint, statement=entry.statement, parameters=format_parameters(entry.parameters),
+            duration_ms=round(entry.duration * 1000, 3), route=entry.route, at=entry.at, plan=plan,
+        ))
+    summary.repeated = [RepeatedQuery(**item) for item in reversed(query_log.repeated)]
+    return summary
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_query_log():
+    query_log.clear()
+    return None
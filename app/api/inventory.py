@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Query, Depends
+from typing import List, Optional
+from sqlmodel import select, tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.schemas.inventory import StockBalance as StockBalanceSchema, StockLookup, StockRebuildResult
+from app.models.inventory import StockBalance
+from app.core.database import get_db
+from app.core.inventory import rebuild_stock_balances
+
+router = APIRouter(prefix="/inventory", tags=["Inventory"])
+
+@router.get("/", response_model=List[StockBalanceSchema])
+async def get_stock_balances(
+    product_id: Optional[int] = Query(None, description="篩選商品"),
+    warehouse_id: Optional[int] = Query(None, description="篩選倉庫"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    statement = select(StockBalance)
+    if product_id is not None:
+        statement = statement.where(StockBalance.ProductID == product_id)
+    if warehouse_id is not None:
+        statement = statement.where(StockBalance.WarehouseID == warehouse_id)
+
+    statement = statement.order_by(StockBalance.ProductID, StockBalance.WarehouseID)
+    if limit > 0:
+        statement = statement.offset(skip).limit(limit)
+
+    result = await db.exec(statement)
+    return result.all()
+
+@router.get("/products/{product_id}", response_model=List[StockBalanceSchema])
+async def get_product_stock(product_id: int, db: AsyncSession = Depends(get_db)):
+    # 某商品在各倉庫的庫存
+    statement = select(StockBalance).where(StockBalance.ProductID == product_id).order_by(StockBalance.WarehouseID)
+    result = await db.exec(statement)
+    return result.all()
+
+@router.get("/warehouses/{warehouse_id}", response_model=List[StockBalanceSchema])
+async def get_warehouse_stock(warehouse_id: int, db: AsyncSession = Depends(get_db)):
+    # 某倉庫內各商品的庫存
+    statement = select(StockBalance).where(StockBalance.WarehouseID == warehouse_id).order_by(StockBalance.ProductID)
+    result = await db.exec(statement)
+    return result.all()
+
+@router.post("/lookup", response_model=List[StockBalanceSchema])
+async def lookup_stock(lookup: StockLookup, db: AsyncSession = Depends(get_db)):
+    # 批次查詢：一次 IN 查詢，依請求順序回傳，沒有紀錄的組合視為 0
+    keys = [(k.ProductID, k.WarehouseID) for k in lookup.items]
+    found = {}
+    if keys:
+        statement = select(StockBalance).where(
+            tuple_(StockBalance.ProductID, StockBalance.WarehouseID).in_(set(keys))
+        )
+        result = await db.exec(statement)
+        found = {(b.ProductID, b.WarehouseID): b.sbQuantity for b in result.all()}
+
+    return [
+        StockBalanceSchema(ProductID=pid, WarehouseID=wid, sbQuantity=found.get((pid, wid), 0))
+        for pid, wid in keys
+    ]
+
+@router.post("/rebuild", response_model=StockRebuildResult)
+async def rebuild_stock(db: AsyncSession = Depends(get_db)):
+    # 由明細重算全部庫存 (資料修復用)
+    count = await rebuild_stock_balances(db)
+    return StockRebuildResult(balances=count)
+
+@router.get("/{product_id}/{warehouse_id}", response_model=StockBalanceSchema)
+async def get_stock(product_id: int, warehouse_id: int, db: AsyncSession = Depends(get_db)):
+    # 主鍵查詢，O(1)；尚未有異動的組合回傳 0
+    balance = await db.get(StockBalance, (product_id, warehouse_id))
+    if not balance:
+        return StockBalanceSchema(ProductID=product_id, WarehouseID=warehouse_id, sbQuantity=0)
+    return balance
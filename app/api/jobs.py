@@ -0,0 +1,151 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse
+from datetime import date
+from typing import List, Literal, Optional
+
+from app.schemas.job import JobRead
+from app.models.job import Job
+from app.core.jobs import (
+    ACTIVE_STATUSES, JOB_KINDS, SUCCEEDED, cancel_job, delete_job, get_job, job_dir, list_jobs, submit_job,
+)
+from app.core.archive import archive_cutoff
+from app.core.config import settings
+from app.core.export import MEDIA_TYPES
+from app.core.streaming import detect_format
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+JOBS_PATH = "/api/v1/jobs"
+
+def _read(job: Job) -> JobRead:
+    data = JobRead.model_validate(job, from_attributes=True)
+    if job.jbTotal:
+        data.progress = round(min(job.jbDone / job.jbTotal, 1.0), 4)
+    elif job.jbStatus == SUCCEEDED:
+        data.progress = 1.0
+    if job.jbResultFile:
+        data.result_url = f"{JOBS_PATH}/{job.JobID}/result"
+    return data
+
+async def _accepted(response: Response, job_id: int) -> JobRead:
+    # 202 + Location 指向狀態查詢
+    response.headers["Location"] = f"{JOBS_PATH}/{job_id}"
+    return _read(await get_job(job_id))
+
+async def _get_or_404(job_id: int) -> Job:
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# --- 送出工作 (立即回 202，以 GET /jobs/{id} 查詢進度) ---
+
+@router.post("/inbound-import", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_inbound_import(
+    request: Request,
+    response: Response,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="未指定時依 Content-Type 判斷"),
+    chunk_size: int = Query(500, ge=1, le=5000, description="每個交易寫入的單據數"),
+):
+    # 與 POST /inbound/bulk 相同的格式；上傳內容先存檔，背景匯入，完整的各 chunk 結果由 result 下載
+    fmt = detect_format(request.headers.get("content-type"), format)
+    job_id = await submit_job("inbound_import", {"format": fmt, "chunk_size": chunk_size}, upload=request.stream())
+    return await _accepted(response, job_id)
+
+@router.post("/bulk-upsert/{entity}", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_master_upsert(
+    entity: Literal["product", "staff", "supplier", "warehouse"],
+    request: Request,
+    response: Response,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="未指定時依 Content-Type 判斷"),
+    chunk_size: int = Query(1000, ge=1, le=10000, description="每個交易寫入的筆數"),
+):
+    # 與各主檔的 POST /bulk-upsert 相同的格式
+    fmt = detect_format(request.headers.get("content-type"), format)
+    params = {"entity": entity, "format": fmt, "chunk_size": chunk_size}
+    job_id = await submit_job("master_upsert", params, upload=request.stream())
+    return await _accepted(response, job_id)
+
+@router.post("/export/{target}", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_export(
+    target: Literal["inbound", "requisitions"],
+    response: Response,
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    date_from: Optional[date] = Query(None, description="起始日期 (含)"),
+    date_to: Optional[date] = Query(None, description="結束日期 (含)"),
+    include_archived: bool = Query(False, description="一併匯出已封存的舊單 (date_from 早於封存日期時自動包含)"),
+):
+    # 匯出成檔案，完成後由 result 下載 (GET /inbound/export 等串流匯出仍可直接使用)
+    params = {
+        "target": target, "format": format,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "include_archived": include_archived,
+    }
+    return await _accepted(response, await submit_job("export", params))
+
+@router.post("/archive/{target}", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_archive(
+    target: Literal["inbound", "requisitions"],
+    response: Response,
+    before: Optional[date] = Query(None, description=f"封存這一天之前的單據 (預設為 {settings.archive_after_days} 天前)"),
+    batch_size: int = Query(settings.archive_batch_size, ge=1, le=10000, description="每個交易搬移的單據數"),
+):
+    # 把舊單分批搬到封存表 (與 python -m app.core.archive 相同)，進度單位為已搬移的單據數
+    params = {"target": target, "before": (before or archive_cutoff()).isoformat(), "batch_size": batch_size}
+    return await _accepted(response, await submit_job("archive", params))
+
+@router.post("/rebuild/{target}", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_rebuild(target: Literal["inventory", "reports", "search"], response: Response):
+    # 重算庫存 / 報表彙總 / 搜尋索引 (資料修復用)
+    return await _accepted(response, await submit_job(f"rebuild_{target}", {}))
+
+# --- 查詢 / 取消 / 結果 ---
+
+@router.get("/", response_model=List[JobRead])
+async def get_jobs(
+    status: Optional[Literal["queued", "running", "succeeded", "failed", "cancelled"]] = Query(None),
+    kind: Optional[str] = Query(None, description=f"工作種類: {', '.join(JOB_KINDS)}"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, le=100),
+):
+    # 新的在前
+    return [_read(job) for job in await list_jobs(status, kind, skip, limit)]
+
+@router.get("/{job_id}", response_model=JobRead)
+async def get_job_status(job_id: int):
+    return _read(await _get_or_404(job_id))
+
+@router.post("/{job_id}/cancel", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def cancel_job_request(job_id: int):
+    # 排隊中的立即取消；執行中的在下一次回報進度時中止 (批次匯入已提交的 chunk 不會回滾)，
+    # 庫存 / 報表重建在單一交易內完成，沒有中途的檢查點
+    job = await _get_or_404(job_id)
+    if job.jbStatus not in ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.jbStatus}")
+    await cancel_job(job_id)
+    return _read(await get_job(job_id))
+
+@router.get("/{job_id}/result")
+async def download_job_result(job_id: int):
+    # 有結果檔 (匯出檔、匯入的完整結果) 時下載檔案，否則回傳結果摘要
+    job = await _get_or_404(job_id)
+    if job.jbStatus != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.jbStatus}")
+    if not job.jbResultFile:
+        return job.jbResult or {}
+
+    path = job_dir(job_id) / job.jbResultFile
+    if not path.is_file():
+        raise HTTPException(status_code=410, detail="Result file has been removed")
+    suffix = path.suffix.lstrip(".")
+    return FileResponse(path, media_type=MEDIA_TYPES.get(suffix, "application/json"), filename=path.name)
+
+@router.delete("/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_job_record(job_id: int):
+    # 刪除已結束的工作與其上傳檔 / 結果檔
+    job = await _get_or_404(job_id)
+    if job.jbStatus in ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail="Cancel the job before deleting it")
+    await delete_job(job_id)
+    return None
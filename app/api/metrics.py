@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from app.core.database import engine, pool_wait_stats, TimedQueuePool
+from app.core.metrics import format_metric, render_route_metrics
+from app.core.replicas import replica_set
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request):
+    # Prometheus 抓取用：各路由的延遲 / SQL / 回應大小，加上連線池整體狀態
+    lines = render_route_metrics()
+
+    pool = engine.pool
+    if isinstance(pool, TimedQueuePool):
+        lines += format_metric("wms_db_pool_size", "gauge", "Configured pool size", [("", {}, pool.size())])
+        lines += format_metric("wms_db_pool_checked_out", "gauge", "Connections currently checked out", [("", {}, pool.checkedout())])
+    lines += format_metric("wms_db_pool_checkouts_total", "counter", "Connection checkouts", [("", {}, pool_wait_stats.checkouts)])
+    lines += format_metric("wms_db_pool_timeouts_total", "counter", "Connection checkout timeouts", [("", {}, pool_wait_stats.timeouts)])
+
+    if replica_set.enabled:
+        members = replica_set.members
+        lines += format_metric("wms_db_replica_healthy", "gauge", "Replica in rotation (1) or skipped (0)", [("", {"replica": r.name}, int(r.healthy)) for r in members])
+        lines += format_metric("wms_db_replica_lag_seconds", "gauge", "Replication lag at the last check", [("", {"replica": r.name}, r.lag or 0) for r in members])
+        lines += format_metric("wms_db_replica_reads_total", "counter", "Sessions routed to the replica", [("", {"replica": r.name}, r.reads) for r in members])
+        lines += format_metric(
+            "wms_db_replica_fallbacks_total", "counter", "GET sessions that fell back to the primary",
+            [("", {"reason": "unavailable"}, replica_set.unavailable_fallbacks), ("", {"reason": "stale"}, replica_set.stale_fallbacks)],
+        )
+
+    startup = getattr(request.app.state, "startup_seconds", {})
+    lines += format_metric(
+        "wms_startup_seconds", "gauge", "Process startup time by phase",
+        [("", {"phase": phase}, seconds) for phase, seconds in startup.items()],
+    )
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,45 +1,86 @@
-from fastapi import APIRouter, HTTPException, Query, status, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, status, Depends, Response, Request
+from typing import List, Literal, Optional
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.schemas.product import Product as ProductSchema, ProductCreate
 from app.models.product import Product as ProductModel
 from app.core.database import get_db
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.search import index_rows, remove_rows, search_page
+from app.core.cache import product_cache
 from sqlalchemy.exc import IntegrityError
 from app.schemas.error import HTTPError
+from app.schemas.batch import BatchGetRequest, BatchGetResult
+from app.core.batch import batch_result
+from app.core.master_upsert import upsert_master_rows
+from app.core.streaming import detect_format
+from app.schemas.bulk import BulkUpsertResult
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 @router.get("/", response_model=List[ProductSchema])
 async def get_products(
+    response: Response,
     skip: int = Query(0, ge=0, description="跳過前 N 筆"),
     limit: int = Query(10, le=100, description="限制回傳 N 筆"),
+    after: Optional[str] = Query(None, description="分頁游標 (取自上一頁回應的 X-Next-Cursor 標頭，使用時忽略 skip)"),
     q: Optional[str] = Query(None, description="搜尋產品名稱或分類"),
     db: AsyncSession = Depends(get_db)
 ):
-    statement = select(ProductModel)
+    # 搜尋模式：走 n-gram 索引，依相關度排序 (游標為相關度 + 主鍵)
     if q:
-        statement = statement.where(
-            (ProductModel.prName.contains(q)) | (ProductModel.prCategory.contains(q))
-        )
-    
+        return await search_page(db, response, "product", q, skip, limit, after)
+
+    statement = select(ProductModel)
+
+    # 依主鍵排序，游標分頁從上一頁最後一筆之後開始
+    statement = statement.order_by(ProductModel.ProductID)
+    if after:
+        (after_id,) = decode_cursor(after, int)
+        statement = statement.where(ProductModel.ProductID > after_id)
+
     if limit > 0:
-        statement = statement.offset(skip).limit(limit)
+        if not after:
+            statement = statement.offset(skip)
+        statement = statement.limit(limit)
+
     result = await db.exec(statement)
-    return result.all()
+    rows = result.all()
+    set_next_cursor(response, rows, limit, lambda r: (r.ProductID,))
+    return rows
 
 @router.get("/{product_id}", response_model=ProductSchema)
 async def get_product(product_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.get(ProductModel, product_id)
+    # 先查快取，未命中才查資料庫
+    result = await product_cache.get(db, product_id)
     if not result:
         raise HTTPException(status_code=404, detail="Product not found")
     return result
 
+@router.post("/batch-get", response_model=BatchGetResult[ProductSchema])
+async def batch_get_products(request: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    # 一次取回多筆商品：快取沒有的以一次 IN 查詢補齊，依請求順序回傳並列出查無資料的 ID
+    found = await product_cache.get_many(db, request.ids)
+    return batch_result(request.ids, found)
+
+@router.post("/bulk-upsert", response_model=BulkUpsertResult)
+async def bulk_upsert_products(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="未指定時依 Content-Type 判斷"),
+    chunk_size: int = Query(1000, ge=1, le=10000, description="每個交易寫入的筆數"),
+    db: AsyncSession = Depends(get_db)
+):
+    # 串流匯入大量商品 (CSV / NDJSON，每列需帶主鍵)：已存在則更新、不存在則新增，回傳新增 / 更新 / 未變動筆數
+    fmt = detect_format(request.headers.get("content-type"), format)
+    return await upsert_master_rows(db, "product", request.stream(), fmt, chunk_size)
+
 @router.post("/", response_model=ProductSchema, status_code=status.HTTP_201_CREATED)
 async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_db)):
     new_product = ProductModel.model_validate(product)
     db.add(new_product)
+    await db.flush() # 取得 ID 後同步搜尋索引
+    await index_rows(db, "product", [new_product])
     await db.commit()
     await db.refresh(new_product)
     return new_product
@@ -55,8 +96,10 @@ async def update_product(product_id: int, updated_product: ProductCreate, db: As
         setattr(db_product, key, value)
         
     db.add(db_product)
+    await index_rows(db, "product", [db_product])
     await db.commit()
     await db.refresh(db_product)
+    product_cache.invalidate(product_id)
     return db_product
 
 @router.delete(
@@ -72,8 +115,10 @@ async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Product not found")
     
     try:
+        await remove_rows(db, "product", [product_id])
         await db.delete(db_product)
         await db.commit()
+        product_cache.invalidate(product_id)
     except IntegrityError:
         await db.rollback()
         raise HTTPException(
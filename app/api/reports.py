@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Query, Depends
+from typing import List, Literal, Optional
+from datetime import date
+from sqlalchemy import func, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.schemas.report import VolumeReportRow, RollupRebuildResult
+from app.models.report import VolumeRollup
+from app.core.database import get_db
+from app.core.rollup import NO_SUPPLIER, period_start, rebuild_volume_rollups
+
+router = APIRouter(prefix="/reports", tags=["Reports"])
+
+# 分組維度 -> 彙總表欄位
+DIMENSIONS = {
+    "product": VolumeRollup.ProductID,
+    "warehouse": VolumeRollup.WarehouseID,
+    "supplier": VolumeRollup.SupplierID,
+}
+
+@router.get("/volume", response_model=List[VolumeReportRow])
+async def get_volume_report(
+    period: Literal["day", "week", "month"] = Query("month", description="彙總期間"),
+    date_from: Optional[date] = Query(None, description="起始日期 (含)，會對齊到所屬期間的起日"),
+    date_to: Optional[date] = Query(None, description="結束日期 (含)"),
+    group_by: List[Literal["product", "warehouse", "supplier"]] = Query([], description="分組維度，可重複指定；不指定則只依期間加總"),
+    product_id: Optional[int] = Query(None, description="篩選商品"),
+    warehouse_id: Optional[int] = Query(None, description="篩選倉庫"),
+    supplier_id: Optional[int] = Query(None, description="篩選供應商 (只會有進貨量)"),
+    db: AsyncSession = Depends(get_db)
+):
+    # 只讀預先彙總的列：一年的月報表每個維度組合只有 12 列
+    columns = [DIMENSIONS[name] for name in dict.fromkeys(group_by)]
+    inbound = func.sum(VolumeRollup.vrInbound)
+    outbound = func.sum(VolumeRollup.vrOutbound)
+    statement = select(
+        VolumeRollup.vrStart,
+        *columns,
+        inbound.label("vrInbound"),
+        outbound.label("vrOutbound"),
+    ).where(VolumeRollup.vrPeriod == period)
+
+    if date_from:
+        statement = statement.where(VolumeRollup.vrStart >= period_start(period, date_from))
+    if date_to:
+        statement = statement.where(VolumeRollup.vrStart <= date_to)
+    if product_id is not None:
+        statement = statement.where(VolumeRollup.ProductID == product_id)
+    if warehouse_id is not None:
+        statement = statement.where(VolumeRollup.WarehouseID == warehouse_id)
+    if supplier_id is not None:
+        statement = statement.where(VolumeRollup.SupplierID == supplier_id)
+
+    # 單據刪除 / 改期後沖銷歸零的彙總列不回傳
+    statement = (
+        statement.group_by(VolumeRollup.vrStart, *columns)
+        .having(or_(inbound != 0, outbound != 0))
+        .order_by(VolumeRollup.vrStart, *columns)
+    )
+    result = await db.exec(statement)
+
+    rows = []
+    for row in result.mappings():
+        row = dict(row)
+        # 領料列沒有供應商 (彙總表記為 0)，回傳 null
+        if row.get("SupplierID") == NO_SUPPLIER:
+            row["SupplierID"] = None
+        rows.append(row)
+    return rows
+
+@router.post("/rebuild", response_model=RollupRebuildResult)
+async def rebuild_reports(db: AsyncSession = Depends(get_db)):
+    # 由進貨 / 領料歷史重新計算全部彙總 (backfill，資料修復用)
+    return RollupRebuildResult(rows=await rebuild_volume_rollups(db))
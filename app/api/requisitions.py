@@ -1,13 +1,22 @@
 from fastapi import APIRouter, HTTPException, Query, status, Depends
-from typing import List, Optional
+from typing import Callable, List, Literal, Optional
 from datetime import date
-from sqlmodel import select
+from sqlmodel import select, tuple_
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import selectinload # 用於預加載關聯
 
-from app.schemas.requisition import Requisition as RequisitionSchema, RequisitionCreate, RequisitionRead
-from app.models.requisition import Requisition, ReqDetail
+from app.schemas.requisition import Requisition as RequisitionSchema, RequisitionCreate, RequisitionRead, RequisitionPatch, ReqDetailBase
+from app.models.requisition import Requisition, ReqDetail, RequisitionArchive
 from app.core.database import get_db
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.export import export_response, requisition_export_statement
+from app.core.order_reads import requisition_headers, load_requisitions, json_response, with_archive
+from app.core.archive import include_archive
+from app.core.inventory import StockDeltas, add_stock_deltas, apply_stock_deltas, check_stock, stock_guard
+from app.schemas.batch import BatchGetRequest, BatchGetResult
+from app.core.batch import batch_result
+from app.core.order_details import merge_detail_patch, sync_details
+from app.core.rollup import add_requisition_volume, apply_volume_deltas
 
 router = APIRouter(prefix="/requisitions", tags=["Requisitions"])
 
@@ -17,116 +26,189 @@ async def get_requisitions(
     q: Optional[str] = Query(None, description="搜尋單號或領料原因"),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, le=100),
+    after: Optional[str] = Query(None, description="分頁游標 (取自上一頁回應的 X-Next-Cursor 標頭，使用時忽略 skip)"),
+    include_archived: bool = Query(False, description="一併列出已封存的舊單 (篩選的日期已封存時自動包含)"),
     db: AsyncSession = Depends(get_db)
 ):
-    statement = select(Requisition).options(
-        selectinload(Requisition.details).options(
-            selectinload(ReqDetail.product),
-            selectinload(ReqDetail.warehouse)
-        ),
-        selectinload(Requisition.staff)
-    )
-    
-    if re_date:
-        statement = statement.where(Requisition.reDate == re_date)
-    
-    if q:
-        # 搜尋 ID (轉字串) 或 原因
-        # 注意: SQLModel 搜尋 ID 通常需轉型，這裡簡化搜尋 Reason 即可，若要搜 ID 需精確匹配
-        statement = statement.where(Requisition.reReason.contains(q))
-    
-    # 排序：新單在後
-    statement = statement.order_by(Requisition.ReqID.desc())
-    if limit > 0:
-        statement = statement.offset(skip).limit(limit)
-    
-    result = await db.exec(statement)
-    return result.all()
+    # 游標分頁：直接從上一頁最後一筆的 (reDate, ReqID) 之後開始，深頁也不必掃過前面的資料
+    cursor = tuple(decode_cursor(after, date.fromisoformat, int)) if after else None
+
+    def page(model):
+        # 快速路徑：Core 查詢直接組 dict，不建立 ORM 物件
+        statement = requisition_headers(model)
+        if re_date:
+            statement = statement.where(model.reDate == re_date)
+        if q:
+            # 搜尋 ID (轉字串) 或 原因
+            # 注意: SQLModel 搜尋 ID 通常需轉型，這裡簡化搜尋 Reason 即可，若要搜 ID 需精確匹配
+            statement = statement.where(model.reReason.contains(q))
+        if cursor:
+            statement = statement.where(tuple_(model.reDate, model.ReqID) < cursor)
+        # 排序：新單在前 (日期倒序，同日再依 ID 倒序)
+        return statement.order_by(model.reDate.desc(), model.ReqID.desc())
+
+    # 預設只查 hot 表 (近期的單據)
+    archived = await include_archive("requisitions", include_archived, re_date)
+    if archived:
+        statement = with_archive(page, Requisition, RequisitionArchive, "reDate", "ReqID", 0 if after else skip, limit)
+    else:
+        statement = page(Requisition)
+        if limit > 0:
+            if not after:
+                statement = statement.offset(skip)
+            statement = statement.limit(limit)
+
+    reqs = await load_requisitions(db, statement, archived)
+    response = json_response(reqs)
+    set_next_cursor(response, reqs, limit, lambda r: (r["reDate"], r["ReqID"]))
+    return response
+
+@router.get("/export")
+async def export_requisitions(
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    date_from: Optional[date] = Query(None, description="起始日期 (含)"),
+    date_to: Optional[date] = Query(None, description="結束日期 (含)"),
+    include_archived: bool = Query(False, description="一併匯出已封存的舊單 (date_from 早於封存日期時自動包含)"),
+):
+    # 串流匯出領料歷史 (主單 + 明細攤平)，不受 limit 100 限制；未指定 date_from 時只匯出 hot 表
+    archived = await include_archive("requisitions", include_archived, date_from)
+    return export_response(requisition_export_statement(date_from, date_to, archived), format, "requisitions")
 
 @router.get("/{req_id}", response_model=RequisitionRead)
 async def get_requisition(req_id: int, db: AsyncSession = Depends(get_db)):
-    statement = select(Requisition).where(Requisition.ReqID == req_id).options(
-        selectinload(Requisition.details).options(
-            selectinload(ReqDetail.product),
-            selectinload(ReqDetail.warehouse)
-        ),
-        selectinload(Requisition.staff)
-    )
-
-    result = await db.exec(statement)
-    req = result.first()
+    reqs = await load_requisitions(db, requisition_headers().where(Requisition.ReqID == req_id))
+    if not reqs:
+        # 已封存的單據
+        archived = requisition_headers(RequisitionArchive).where(RequisitionArchive.ReqID == req_id)
+        reqs = await load_requisitions(db, archived, archived=True)
     
-    if not req:
+    if not reqs:
         raise HTTPException(status_code=404, detail="Requisition not found")
-    return req
+    return json_response(reqs[0])
+
+@router.post("/batch-get", response_model=BatchGetResult[RequisitionRead])
+async def batch_get_requisitions(request: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    # 一次取回多張領料單 (含明細)：主單一次 IN 查詢，依請求順序回傳並列出查無資料的 ID
+    found = {}
+    if request.ids:
+        orders = await load_requisitions(db, requisition_headers().where(Requisition.ReqID.in_(set(request.ids))))
+        found = {o["ReqID"]: o for o in orders}
+        # hot 表沒有的再到封存表找
+        missing = set(request.ids) - found.keys()
+        if missing:
+            archived = requisition_headers(RequisitionArchive).where(RequisitionArchive.ReqID.in_(missing))
+            found.update((o["ReqID"], o) for o in await load_requisitions(db, archived, archived=True))
+    return json_response(batch_result(request.ids, found))
 
 @router.post("/", response_model=RequisitionSchema, status_code=status.HTTP_201_CREATED)
 async def create_requisition(req_data: RequisitionCreate, db: AsyncSession = Depends(get_db)):
-    # 1. 建立主單 (排除 details list)
-    new_req = Requisition(**req_data.model_dump(exclude={'details'}))
-    
-    # 若需自動生成 ID，這裡不指定 ReqID，讓 DB 處理
-    db.add(new_req)
-    await db.flush() # 取得 new_req.ReqID
-    await db.refresh(new_req)
-    
-    # 2. 建立明細
-    for d in req_data.details:
-        new_detail = ReqDetail(
-            ReqID=new_req.ReqID,
-            ProductID=d.ProductID,
-            rdQuantity=d.rdQuantity,
-            WarehouseID=d.WarehouseID
-        )
-        db.add(new_detail)
-    
-    await db.commit()
-    
+    deltas = add_stock_deltas({}, req_data.details, "rdQuantity", sign=-1)
+
+    # 鎖定要扣減的 SKU，確認庫存足夠後才寫入 (不同 SKU 的領料不會互相等待)
+    async with stock_guard(db, deltas):
+        await check_stock(db, deltas)
+
+        # 1. 建立主單 (排除 details list)
+        new_req = Requisition(**req_data.model_dump(exclude={'details'}))
+
+        # 若需自動生成 ID，這裡不指定 ReqID，讓 DB 處理
+        db.add(new_req)
+        await db.flush() # 取得 new_req.ReqID
+        await db.refresh(new_req)
+
+        # 2. 建立明細
+        for d in req_data.details:
+            new_detail = ReqDetail(
+                ReqID=new_req.ReqID,
+                ProductID=d.ProductID,
+                rdQuantity=d.rdQuantity,
+                WarehouseID=d.WarehouseID
+            )
+            db.add(new_detail)
+
+        # 3. 同一交易內扣除庫存並累加領料量彙總
+        await apply_stock_deltas(db, deltas)
+        await apply_volume_deltas(db, add_requisition_volume({}, new_req.reDate, req_data.details))
+
+        await db.commit()
+
     # 重新讀取 (包含 details)
     statement = select(Requisition).where(Requisition.ReqID == new_req.ReqID).options(selectinload(Requisition.details))
     result = await db.exec(statement)
     return result.first()
 
-@router.put("/{req_id}", response_model=RequisitionSchema)
-async def update_requisition(req_id: int, req_data: RequisitionCreate, db: AsyncSession = Depends(get_db)):
-    # 1. 撈取舊資料
+async def _get_requisition_with_details(db: AsyncSession, req_id: int, lock: bool = False) -> Requisition:
     statement = select(Requisition).where(Requisition.ReqID == req_id).options(selectinload(Requisition.details))
+    if lock:
+        # 臨界區內重讀：覆蓋 session 中先前載入的明細；PostgreSQL 鎖住主單，同一張單的修改依序進行
+        statement = statement.execution_options(populate_existing=True)
+        if db.get_bind().dialect.name == "postgresql":
+            statement = statement.with_for_update(of=Requisition)
     result = await db.exec(statement)
     req = result.first()
-    
     if not req:
         raise HTTPException(status_code=404, detail="Requisition not found")
-    
-    # 2. 更新主單欄位
-    req.reDate = req_data.reDate
-    req.reReason = req_data.reReason
-    req.StaffID = req_data.StaffID
-    db.add(req)
-    
-    # 3. 更新明細 (刪除舊的 -> 加入新的)
-    for detail in req.details:
-        await db.delete(detail)
-        
-    for d in req_data.details:
-        new_detail = ReqDetail(
-            ReqID=req_id,
-            ProductID=d.ProductID,
-            rdQuantity=d.rdQuantity,
-            WarehouseID=d.WarehouseID
-        )
-        db.add(new_detail)
-        
-    await db.commit()
-    await db.refresh(req)
     return req
 
+def _requisition_deltas(details, lines) -> StockDeltas:
+    # 庫存增減 = 補回舊明細 + 扣除新明細 (未變動的列會互相抵銷，與差異寫入的結果相同)
+    deltas = add_stock_deltas({}, details, "rdQuantity")
+    return add_stock_deltas(deltas, lines, "rdQuantity", sign=-1)
+
+async def _update_requisition(
+    db: AsyncSession, req_id: int, header: dict, build_lines: Callable[[List[ReqDetail]], List[ReqDetailBase]]
+) -> Requisition:
+    # 先以目前讀到的明細決定要鎖的 SKU；進入臨界區後重讀 (並鎖住) 主單與明細，以最新的明細計算增減，
+    # 避免讀取與鎖定之間其他請求修改了同一張單
+    req = await _get_requisition_with_details(db, req_id)
+    async with stock_guard(db, _requisition_deltas(req.details, build_lines(req.details))):
+        req = await _get_requisition_with_details(db, req_id, lock=True)
+        lines = build_lines(req.details)
+        deltas = _requisition_deltas(req.details, lines)
+        await check_stock(db, deltas)
+
+        # 領料量彙總：舊的日期沖銷舊明細，再以新的加上新明細
+        volume = add_requisition_volume({}, req.reDate, req.details, sign=-1)
+
+        # 1. 更新主單
+        for key, value in header.items():
+            setattr(req, key, value)
+        db.add(req)
+
+        # 2. 更新明細 (策略: 依 ProductID 比對，只寫入有變動的列) 並同步庫存
+        await sync_details(db, ReqDetail, "ReqID", req.ReqID, "rdQuantity", req.details, lines)
+        await apply_stock_deltas(db, deltas)
+        await apply_volume_deltas(db, add_requisition_volume(volume, req.reDate, lines))
+
+        await db.commit()
+
+    await db.refresh(req, attribute_names=["details"])
+    return req
+
+@router.put("/{req_id}", response_model=RequisitionSchema)
+async def update_requisition(req_id: int, req_data: RequisitionCreate, db: AsyncSession = Depends(get_db)):
+    # 整張單覆蓋：明細以傳入的清單為準
+    return await _update_requisition(db, req_id, req_data.model_dump(exclude={'details'}), lambda details: req_data.details)
+
+@router.patch("/{req_id}", response_model=RequisitionSchema)
+async def patch_requisition(req_id: int, patch: RequisitionPatch, db: AsyncSession = Depends(get_db)):
+    # 部分更新：只傳有變動的主單欄位與明細列 (套用在臨界區內重讀的明細上)
+    return await _update_requisition(
+        db, req_id, patch.model_dump(exclude={'details'}, exclude_none=True),
+        lambda details: merge_detail_patch(details, patch.details, "rdQuantity", ReqDetailBase),
+    )
+
 @router.delete("/{req_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_requisition(req_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.get(Requisition, req_id)
-    if not result:
-        raise HTTPException(status_code=404, detail="Requisition not found")
-    
-    # Cascade 設定會自動刪除明細
-    await db.delete(result)
-    await db.commit()
+    # 只補回庫存、不需檢查；仍在臨界區內重讀 (並鎖住) 明細，補回的是最新的數量
+    async with stock_guard(db, {}):
+        result = await _get_requisition_with_details(db, req_id, lock=True)
+
+        # 補回這張領料單扣除的庫存
+        await apply_stock_deltas(db, add_stock_deltas({}, result.details, "rdQuantity"))
+        await apply_volume_deltas(db, add_requisition_volume({}, result.reDate, result.details, sign=-1))
+
+        # Cascade 設定會自動刪除明細
+        await db.delete(result)
+        await db.commit()
     return None
\ No newline at end of file
@@ -1,49 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response, Request
+from typing import List, Literal, Optional
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.schemas.staff import Staff as StaffSchema, StaffCreate
 from app.models.staff import Staff as StaffModel
 from app.core.database import get_db
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.search import index_rows, remove_rows, search_page
+from app.core.cache import staff_cache
 from sqlalchemy.exc import IntegrityError
 from app.schemas.error import HTTPError
+from app.schemas.batch import BatchGetRequest, BatchGetResult
+from app.core.batch import batch_result
+from app.core.master_upsert import upsert_master_rows
+from app.core.streaming import detect_format
+from app.schemas.bulk import BulkUpsertResult
 
 router = APIRouter(prefix="/staff", tags=["Staff"])
 
 @router.get("/", response_model=List[StaffSchema])
 async def get_all_staff(
+    response: Response,
     q: Optional[str] = Query(None, description="搜尋員工姓名或部門"),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=0, le=100),
+    after: Optional[str] = Query(None, description="分頁游標 (取自上一頁回應的 X-Next-Cursor 標頭，使用時忽略 skip)"),
     db: AsyncSession = Depends(get_db) # DI DB Session
 ):
-    statement = select(StaffModel)
-    
+    # 搜尋模式：走 n-gram 索引，依相關度排序 (游標為相關度 + 主鍵)
     if q:
-        statement = statement.where(
-            (StaffModel.stName.contains(q)) | (StaffModel.stDept.contains(q))
-        )
-    
+        return await search_page(db, response, "staff", q, skip, limit, after)
+
+    statement = select(StaffModel)
+
+    # 依主鍵排序，游標分頁從上一頁最後一筆之後開始
+    statement = statement.order_by(StaffModel.StaffID)
+    if after:
+        (after_id,) = decode_cursor(after, int)
+        statement = statement.where(StaffModel.StaffID > after_id)
+
     if limit > 0:
-        statement = statement.offset(skip).limit(limit)
-    
+        if not after:
+            statement = statement.offset(skip)
+        statement = statement.limit(limit)
+
     result = await db.exec(statement)
-    return result.all()
+    rows = result.all()
+    set_next_cursor(response, rows, limit, lambda r: (r.StaffID,))
+    return rows
 
 @router.get("/{staff_id}", response_model=StaffSchema)
 async def get_staff(staff_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.get(StaffModel, staff_id)
+    # 先查快取，未命中才查資料庫
+    result = await staff_cache.get(db, staff_id)
     if not result:
         raise HTTPException(status_code=404, detail="Staff not found")
     return result
 
+@router.post("/batch-get", response_model=BatchGetResult[StaffSchema])
+async def batch_get_staff(request: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    # 一次取回多筆員工：快取沒有的以一次 IN 查詢補齊，依請求順序回傳並列出查無資料的 ID
+    found = await staff_cache.get_many(db, request.ids)
+    return batch_result(request.ids, found)
+
+@router.post("/bulk-upsert", response_model=BulkUpsertResult)
+async def bulk_upsert_staff(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="未指定時依 Content-Type 判斷"),
+    chunk_size: int = Query(1000, ge=1, le=10000, description="每個交易寫入的筆數"),
+    db: AsyncSession = Depends(get_db)
+):
+    # 串流匯入大量員工 (CSV / NDJSON，每列需帶主鍵)：已存在則更新、不存在則新增，回傳新增 / 更新 / 未變動筆數
+    fmt = detect_format(request.headers.get("content-type"), format)
+    return await upsert_master_rows(db, "staff", request.stream(), fmt, chunk_size)
+
 @router.post("/", response_model=StaffSchema, status_code=status.HTTP_201_CREATED)
 async def create_staff(staff: StaffCreate, db: AsyncSession = Depends(get_db)):
     # 將 Schema 轉為 Model
     new_staff = StaffModel.model_validate(staff)
     
     db.add(new_staff)
+    await db.flush() # 取得 ID 後同步搜尋索引
+    await index_rows(db, "staff", [new_staff])
     await db.commit()
     await db.refresh(new_staff) # 刷新以取得 DB 自動生成的 StaffID
     return new_staff
@@ -61,8 +100,10 @@ async def update_staff(staff_id: int, updated_staff: StaffCreate, db: AsyncSessi
         setattr(db_staff, key, value)
         
     db.add(db_staff)
+    await index_rows(db, "staff", [db_staff])
     await db.commit()
     await db.refresh(db_staff)
+    staff_cache.invalidate(staff_id)
     return db_staff
 
 @router.delete(
@@ -78,8 +119,10 @@ async def delete_staff(staff_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Staff not found")
         
     try:
+        await remove_rows(db, "staff", [staff_id])
         await db.delete(db_staff)
         await db.commit()
+        staff_cache.invalidate(staff_id)
     except IntegrityError:
         # 捕捉資料庫的關聯錯誤 (Foreign Key Violation)
         await db.rollback()
@@ -1,44 +1,86 @@
-from fastapi import APIRouter, HTTPException, status, Query, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Query, Depends, Response, Request
+from typing import List, Literal, Optional
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.schemas.supplier import Supplier as SupplierSchema, SupplierCreate
 from app.models.supplier import Supplier as SupplierModel
 from app.core.database import get_db
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.search import index_rows, remove_rows, search_page
+from app.core.cache import supplier_cache
 from sqlalchemy.exc import IntegrityError
 from app.schemas.error import HTTPError
+from app.schemas.batch import BatchGetRequest, BatchGetResult
+from app.core.batch import batch_result
+from app.core.master_upsert import upsert_master_rows
+from app.core.streaming import detect_format
+from app.schemas.bulk import BulkUpsertResult
 
 router = APIRouter(prefix="/suppliers", tags=["Suppliers"])
 
 @router.get("/", response_model=List[SupplierSchema])
 async def get_suppliers(
+    response: Response,
     q: Optional[str] = Query(None, description="搜尋供應商名稱"),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, le=100),
+    after: Optional[str] = Query(None, description="分頁游標 (取自上一頁回應的 X-Next-Cursor 標頭，使用時忽略 skip)"),
     db: AsyncSession = Depends(get_db)
 ):
-    statement = select(SupplierModel)
+    # 搜尋模式：走 n-gram 索引，依相關度排序 (游標為相關度 + 主鍵)
     if q:
-        statement = statement.where(SupplierModel.suName.contains(q))
-    
+        return await search_page(db, response, "supplier", q, skip, limit, after)
+
+    statement = select(SupplierModel)
+
+    # 依主鍵排序，游標分頁從上一頁最後一筆之後開始
+    statement = statement.order_by(SupplierModel.SupplierID)
+    if after:
+        (after_id,) = decode_cursor(after, int)
+        statement = statement.where(SupplierModel.SupplierID > after_id)
+
     if limit > 0:
-        statement = statement.offset(skip).limit(limit)
+        if not after:
+            statement = statement.offset(skip)
+        statement = statement.limit(limit)
 
     result = await db.exec(statement)
-    return result.all()
+    rows = result.all()
+    set_next_cursor(response, rows, limit, lambda r: (r.SupplierID,))
+    return rows
 
 @router.get("/{supplier_id}", response_model=SupplierSchema)
 async def get_supplier(supplier_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.get(SupplierModel, supplier_id)
+    # 先查快取，未命中才查資料庫
+    result = await supplier_cache.get(db, supplier_id)
     if not result:
         raise HTTPException(status_code=404, detail="Supplier not found")
     return result
 
+@router.post("/batch-get", response_model=BatchGetResult[SupplierSchema])
+async def batch_get_suppliers(request: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    # 一次取回多筆供應商：快取沒有的以一次 IN 查詢補齊，依請求順序回傳並列出查無資料的 ID
+    found = await supplier_cache.get_many(db, request.ids)
+    return batch_result(request.ids, found)
+
+@router.post("/bulk-upsert", response_model=BulkUpsertResult)
+async def bulk_upsert_suppliers(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="未指定時依 Content-Type 判斷"),
+    chunk_size: int = Query(1000, ge=1, le=10000, description="每個交易寫入的筆數"),
+    db: AsyncSession = Depends(get_db)
+):
+    # 串流匯入大量供應商 (CSV / NDJSON，每列需帶主鍵)：已存在則更新、不存在則新增，回傳新增 / 更新 / 未變動筆數
+    fmt = detect_format(request.headers.get("content-type"), format)
+    return await upsert_master_rows(db, "supplier", request.stream(), fmt, chunk_size)
+
 @router.post("/", response_model=SupplierSchema, status_code=status.HTTP_201_CREATED)
 async def create_supplier(supplier: SupplierCreate, db: AsyncSession = Depends(get_db)):
     new_supplier = SupplierModel.model_validate(supplier)
     db.add(new_supplier)
+    await db.flush() # 取得 ID 後同步搜尋索引
+    await index_rows(db, "supplier", [new_supplier])
     await db.commit()
     await db.refresh(new_supplier)
     return new_supplier
@@ -54,8 +96,10 @@ async def update_supplier(supplier_id: int, updated_supplier: SupplierCreate, db
         setattr(db_supplier, key, value)
         
     db.add(db_supplier)
+    await index_rows(db, "supplier", [db_supplier])
     await db.commit()
     await db.refresh(db_supplier)
+    supplier_cache.invalidate(supplier_id)
     return db_supplier
 
 @router.delete(
@@ -71,8 +115,10 @@ async def delete_supplier(supplier_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Supplier not found")
         
     try:
+        await remove_rows(db, "supplier", [supplier_id])
         await db.delete(db_supplier)
         await db.commit()
+        supplier_cache.invalidate(supplier_id)
     except IntegrityError:
         await db.rollback()
         raise HTTPException(
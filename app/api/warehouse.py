@@ -1,51 +1,88 @@
-from fastapi import APIRouter, HTTPException, Query, status, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, status, Depends, Response, Request
+from typing import List, Literal, Optional
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.schemas.warehouse import Warehouse as WarehouseSchema, WarehouseCreate
 from app.models.warehouse import Warehouse as WarehouseModel
 from app.core.database import get_db
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.search import index_rows, remove_rows, search_page
+from app.core.cache import warehouse_cache
 from sqlalchemy.exc import IntegrityError
 from app.schemas.error import HTTPError
+from app.schemas.batch import BatchGetRequest, BatchGetResult
+from app.core.batch import batch_result
+from app.core.master_upsert import upsert_master_rows
+from app.core.streaming import detect_format
+from app.schemas.bulk import BulkUpsertResult
 
 router = APIRouter(prefix="/warehouse", tags=["Warehouse"])
 
 @router.get("/", response_model=List[WarehouseSchema])
 async def get_warehouses(
+    response: Response,
     q: Optional[str] = Query(None, description="搜尋倉庫名稱或地點"),
     skip: int = Query(0, ge=0, description="跳過前 N 筆"),
     limit: int = Query(10, le=100, description="限制回傳 N 筆"),
+    after: Optional[str] = Query(None, description="分頁游標 (取自上一頁回應的 X-Next-Cursor 標頭，使用時忽略 skip)"),
     db: AsyncSession = Depends(get_db)
 ):
-    statement = select(WarehouseModel)
-    
-    # 搜尋邏輯: 搜尋 名稱 OR 地點
+    # 搜尋模式：走 n-gram 索引，依相關度排序 (游標為相關度 + 主鍵)
     if q:
-        statement = statement.where(
-            (WarehouseModel.waName.contains(q)) | (WarehouseModel.waLocation.contains(q))
-        )
-    
-    # 分頁切片
+        return await search_page(db, response, "warehouse", q, skip, limit, after)
+
+    statement = select(WarehouseModel)
+
+    # 依主鍵排序，游標分頁從上一頁最後一筆之後開始
+    statement = statement.order_by(WarehouseModel.WarehouseID)
+    if after:
+        (after_id,) = decode_cursor(after, int)
+        statement = statement.where(WarehouseModel.WarehouseID > after_id)
+
     if limit > 0:
-        statement = statement.offset(skip).limit(limit)
-    
+        if not after:
+            statement = statement.offset(skip)
+        statement = statement.limit(limit)
+
     result = await db.exec(statement)
-    return result.all()
+    rows = result.all()
+    set_next_cursor(response, rows, limit, lambda r: (r.WarehouseID,))
+    return rows
 
 @router.get("/{warehouse_id}", response_model=WarehouseSchema)
 async def get_warehouse(warehouse_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.get(WarehouseModel, warehouse_id)
+    # 先查快取，未命中才查資料庫
+    result = await warehouse_cache.get(db, warehouse_id)
     if not result:
         raise HTTPException(status_code=404, detail="Warehouse not found")
     return result
 
+@router.post("/batch-get", response_model=BatchGetResult[WarehouseSchema])
+async def batch_get_warehouses(request: BatchGetRequest, db: AsyncSession = Depends(get_db)):
+    # 一次取回多筆倉庫：快取沒有的以一次 IN 查詢補齊，依請求順序回傳並列出查無資料的 ID
+    found = await warehouse_cache.get_many(db, request.ids)
+    return batch_result(request.ids, found)
+
+@router.post("/bulk-upsert", response_model=BulkUpsertResult)
+async def bulk_upsert_warehouses(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="未指定時依 Content-Type 判斷"),
+    chunk_size: int = Query(1000, ge=1, le=10000, description="每個交易寫入的筆數"),
+    db: AsyncSession = Depends(get_db)
+):
+    # 串流匯入大量倉庫 (CSV / NDJSON，每列需帶主鍵)：已存在則更新、不存在則新增，回傳新增 / 更新 / 未變動筆數
+    fmt = detect_format(request.headers.get("content-type"), format)
+    return await upsert_master_rows(db, "warehouse", request.stream(), fmt, chunk_size)
+
 @router.post("/", response_model=WarehouseSchema, status_code=status.HTTP_201_CREATED)
 async def create_warehouse(warehouse: WarehouseCreate, db: AsyncSession = Depends(get_db)):
     # 將 Schema 轉換為 Model
     new_warehouse = WarehouseModel.model_validate(warehouse)
     
     db.add(new_warehouse)
+    await db.flush() # 取得 ID 後同步搜尋索引
+    await index_rows(db, "warehouse", [new_warehouse])
     await db.commit()
     await db.refresh(new_warehouse) # 取得自動生成的 ID
     return new_warehouse
@@ -64,8 +101,10 @@ async def update_warehouse(warehouse_id: int, updated_warehouse: WarehouseCreate
         
     # 3. 儲存
     db.add(db_warehouse)
+    await index_rows(db, "warehouse", [db_warehouse])
     await db.commit()
     await db.refresh(db_warehouse)
+    warehouse_cache.invalidate(warehouse_id)
     return db_warehouse
 
 @router.delete(
@@ -81,8 +120,10 @@ async def delete_warehouse(warehouse_id: int, db: AsyncSession = Depends(get_db)
         raise HTTPException(status_code=404, detail="Warehouse not found")
     
     try:
+        await remove_rows(db, "warehouse", [warehouse_id])
         await db.delete(db_warehouse)
         await db.commit()
+        warehouse_cache.invalidate(warehouse_id)
     except IntegrityError:
         await db.rollback()
         raise HTTPException(
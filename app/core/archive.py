@@ -0,0 +1,147 @@
+# app/core/archive.py
+# 舊單封存 (hot / cold)：進貨 / 領料單超過 ARCHIVE_AFTER_DAYS 天就分批搬到欄位相同的封存表，
+# 列表、索引與明細 JOIN 只需要處理近期的資料
+#
+# - 每批 ARCHIVE_BATCH_SIZE 張單一個交易：複製主單與明細到封存表後刪除原資料，API 照常讀寫，不需停機
+#   (PostgreSQL 以 FOR UPDATE SKIP LOCKED 跳過正在被修改的單據，下次再搬)
+# - 庫存餘額與進貨 / 領料彙總是累計值，搬移不影響；重建時同時讀 hot 表與封存表
+# - 封存的單據仍可以 GET /{id}、batch-get、include_archived=true 或查詢較早的日期讀到，但不能再修改或刪除
+# - 搬移不是資料異動，不寫異動事件 (change feed)；資料表版本號照常更新，列表的 ETag 會失效
+#
+# 使用方式: python -m app.core.archive [--target inbound] [--before 2025-01-01] [--batch-size 500]
+import argparse
+import asyncio
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.database import engine, get_db_session_context
+from app.core.versions import table_versions
+from app.models.inbound_order import InboundDetail, InboundDetailArchive, InboundOrder, InboundOrderArchive
+from app.models.requisition import ReqDetail, ReqDetailArchive, Requisition, RequisitionArchive
+
+
+@dataclass(frozen=True)
+class ArchiveSpec:
+    order: type
+    detail: type
+    order_archive: type
+    detail_archive: type
+    key: str
+    date: str
+
+
+# 與匯出 / 背景工作的 target 名稱相同
+ARCHIVES: Dict[str, ArchiveSpec] = {
+    "inbound": ArchiveSpec(InboundOrder, InboundDetail, InboundOrderArchive, InboundDetailArchive, "InboundID", "ioDate"),
+    "requisitions": ArchiveSpec(Requisition, ReqDetail, RequisitionArchive, ReqDetailArchive, "ReqID", "reDate"),
+}
+
+
+def archive_cutoff(today: Optional[date] = None) -> date:
+    """早於這一天的單據要封存"""
+    return (today or date.today()) - timedelta(days=settings.archive_after_days)
+
+
+class ArchiveHorizon:
+    """封存表中最新的單據日期：查詢的日期晚於它就不必讀封存表；以封存表的版本號判斷要不要重查"""
+
+    def __init__(self):
+        self._latest: Dict[str, Tuple[int, Optional[date]]] = {}
+
+    async def latest(self, target: str) -> Optional[date]:
+        spec = ARCHIVES[target]
+        table = spec.order_archive.__tablename__
+        (version,) = await table_versions.get([table])
+        cached = self._latest.get(table)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        async with engine.connect() as conn:
+            latest = await conn.scalar(select(func.max(getattr(spec.order_archive, spec.date))))
+        self._latest[table] = (version, latest)
+        return latest
+
+
+archive_horizon = ArchiveHorizon()
+
+
+async def include_archive(target: str, include_archived: bool, since: Optional[date]) -> bool:
+    """include_archived=true，或查詢的起始日期不晚於封存表最新的日期時，才需要一起查封存表"""
+    if include_archived:
+        return True
+    if since is None:
+        return False
+    latest = await archive_horizon.latest(target)
+    return latest is not None and since <= latest
+
+
+async def archive_batch(db: AsyncSession, spec: ArchiveSpec, before: date, batch_size: int) -> int:
+    """搬一批 (一個交易)，回傳搬移的單據數"""
+    order, detail = spec.order.__table__, spec.detail.__table__
+    key, order_date = order.c[spec.key], order.c[spec.date]
+
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+    statement = select(key).where(order_date < before).order_by(order_date, key).limit(batch_size)
+    if is_postgres:
+        statement = statement.with_for_update(skip_locked=True)
+    result = await db.exec(statement)
+    ids = [row[0] for row in result.all()]
+    if not ids:
+        return 0
+    if is_postgres:
+        # 只改明細的 PATCH 不會鎖主單：先鎖住明細，等進行中的修改 commit 後才複製，封存的數量與庫存一致
+        await db.exec(select(detail.c[spec.key]).where(detail.c[spec.key].in_(ids)).with_for_update())
+
+    # 先複製到封存表 (主單在前，明細的外鍵才成立)，再刪除 hot 表 (明細在前)
+    for source, target in ((order, spec.order_archive.__table__), (detail, spec.detail_archive.__table__)):
+        columns = [column.name for column in source.c]
+        await db.exec(target.insert().from_select(columns, select(*source.c).where(source.c[spec.key].in_(ids))))
+    await db.exec(delete(detail).where(detail.c[spec.key].in_(ids)))
+    await db.exec(delete(order).where(key.in_(ids)))
+    await db.commit()
+    return len(ids)
+
+
+async def archive_orders(
+    db: AsyncSession,
+    target: str,
+    before: Optional[date] = None,
+    batch_size: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """把 before (預設為 archive_cutoff()) 之前的單據全部搬到封存表，回傳搬移的單據數；progress 在每批之後收到累計數"""
+    spec = ARCHIVES[target]
+    before = before or archive_cutoff()
+    batch_size = batch_size or settings.archive_batch_size
+    moved = 0
+    while True:
+        count = await archive_batch(db, spec, before, batch_size)
+        if not count:
+            return moved
+        moved += count
+        if progress is not None:
+            progress(moved)
+        # 批次之間讓出 event loop，API 程序內執行時不會連續佔住寫入
+        await asyncio.sleep(0)
+
+
+async def _main(targets, before: Optional[date], batch_size: Optional[int]):
+    before = before or archive_cutoff()
+    async with get_db_session_context() as db:
+        for target in targets:
+            moved = await archive_orders(db, target, before, batch_size)
+            print(f"🗄️ {target}: archived {moved} orders dated before {before}.")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把舊的進貨 / 領料單分批搬到封存表")
+    parser.add_argument("--target", choices=list(ARCHIVES), action="append", help="未指定時兩種單據都封存")
+    parser.add_argument("--before", type=date.fromisoformat, help=f"封存這一天之前的單據 (預設為 {settings.archive_after_days} 天前)")
+    parser.add_argument("--batch-size", type=int, help=f"每個交易搬移的單據數 (預設 {settings.archive_batch_size})")
+    args = parser.parse_args()
+    asyncio.run(_main(args.target or list(ARCHIVES), args.before, args.batch_size))
@@ -0,0 +1,17 @@
+# app/core/batch.py
+# 批次依 ID 查詢 (batch-get) 的共用處理：依請求順序排列結果並列出查無資料的 ID
+from typing import Dict, Iterable, List
+
+
+def unique_ids(ids: Iterable[int]) -> List[int]:
+    # 去除重複並保留第一次出現的順序
+    return list(dict.fromkeys(ids))
+
+
+def batch_result(ids: Iterable[int], found: Dict[int, object]) -> dict:
+    """found 為 {ID: 資料}，回傳 {"items": [...], "missing": [...]}"""
+    ids = unique_ids(ids)
+    return {
+        "items": [found[i] for i in ids if i in found],
+        "missing": [i for i in ids if i not in found],
+    }
@@ -0,0 +1,164 @@
+# app/core/cache.py
+# 主檔 (商品 / 倉庫 / 員工 / 供應商) 的程序內 LRU + TTL 快取
+# 主檔很少變動卻被大量讀取 (單據列表的每個明細都要帶出商品與倉庫)，
+# 命中時不必再查資料庫；PUT / DELETE 時清除本程序對應的 key
+#
+# 其他 worker 的修改經由異動事件 (change feed) 清除：PostgreSQL 收到 NOTIFY 就清除，
+# SQLite 最多延遲 CHANGE_FEED_POLL_INTERVAL 秒。CHANGE_FEED_ENABLED=false 時沒有跨程序的清除，
+# 其他 worker 的修改最多 CACHE_TTL 秒後才看得到：只跑單一 worker，或把 CACHE_TTL 設短
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Type
+
+from pydantic import BaseModel
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.changes import change_feed
+from app.core.config import settings
+from app.models.change import ChangeEvent
+from app.models.product import Product
+from app.models.staff import Staff
+from app.models.supplier import Supplier
+from app.models.warehouse import Warehouse
+from app.schemas.product import Product as ProductSchema
+from app.schemas.staff import Staff as StaffSchema
+from app.schemas.supplier import Supplier as SupplierSchema
+from app.schemas.warehouse import Warehouse as WarehouseSchema
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[object, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class EntityCache:
+    """以主鍵快取單一主檔，值為 schema 的 dict (可直接放進回應)"""
+
+    def __init__(self, model: Type[SQLModel], schema: Type[BaseModel], pk: str):
+        self.model = model
+        self.schema = schema
+        self.pk = pk
+        self.cache = TTLCache(settings.cache_maxsize, settings.cache_ttl)
+        # 每次清除就 +1；查詢期間若有寫入，查到的舊資料就不回填快取
+        self._generation = 0
+
+    def _to_dict(self, row) -> dict:
+        return self.schema.model_validate(row).model_dump()
+
+    async def get(self, db: AsyncSession, key: int) -> Optional[dict]:
+        return (await self.get_many(db, [key])).get(key)
+
+    async def get_many(self, db: AsyncSession, keys: Iterable[int]) -> Dict[int, dict]:
+        """快取沒有的 key 以一次 IN 查詢補齊，不存在的 key 不會出現在結果中"""
+        found, missing = {}, set()
+        for key in keys:
+            if key in found or key in missing:
+                continue
+            value = self.cache.get(key)
+            if value is None:
+                missing.add(key)
+            else:
+                found[key] = value
+
+        if missing:
+            generation = self._generation
+            column = getattr(self.model, self.pk)
+            result = await db.exec(select(self.model).where(column.in_(missing)))
+            for row in result.all():
+                value = self._to_dict(row)
+                found[value[self.pk]] = value
+                if generation == self._generation:
+                    self.cache.set(value[self.pk], value)
+        return found
+
+    def invalidate(self, key: int):
+        self._generation += 1
+        self.cache.invalidate(key)
+
+    def clear(self):
+        self._generation += 1
+        self.cache.clear()
+
+
+product_cache = EntityCache(Product, ProductSchema, "ProductID")
+warehouse_cache = EntityCache(Warehouse, WarehouseSchema, "WarehouseID")
+staff_cache = EntityCache(Staff, StaffSchema, "StaffID")
+supplier_cache = EntityCache(Supplier, SupplierSchema, "SupplierID")
+
+ENTITY_CACHES = {
+    "products": product_cache,
+    "warehouse": warehouse_cache,
+    "staff": staff_cache,
+    "suppliers": supplier_cache,
+}
+
+
+# 異動事件的 entity -> 快取
+CHANGE_ENTITY_CACHES = {
+    "product": product_cache,
+    "warehouse": warehouse_cache,
+    "staff": staff_cache,
+    "supplier": supplier_cache,
+}
+
+
+def invalidate_changed(events: List[ChangeEvent]) -> None:
+    """change feed 的 listener：清除異動事件涉及的主檔 (含本程序自己的寫入，重複清除無妨)"""
+    for e in events:
+        cache = CHANGE_ENTITY_CACHES.get(e.ceEntity)
+        if cache is not None:
+            cache.invalidate(e.ceKey)
+
+
+change_feed.add_listener(invalidate_changed)
+
+
+def cache_stats() -> dict:
+    return {name: c.cache.stats() for name, c in ENTITY_CACHES.items()}
+
+
+def clear_caches():
+    for c in ENTITY_CACHES.values():
+        c.clear()
@@ -0,0 +1,385 @@
+# app/core/changes.py
+# 異動事件 (change feed)：單據 / 主檔的新增、修改、刪除在 commit 時寫進 changeevent (與資料同一個交易)，
+# ceSeq 遞增，用戶端記住最後收到的序號，斷線後從那裡接續，就能維護本地副本而不必反覆重抓整份清單
+#
+# - ORM 的新增 / 修改 / 刪除由 session 事件自動記錄；Core 語句 (批次匯入、upsert、明細同步) 以 record_changes 手動記錄
+# - ceSeq 由 sequence 取號，寫入之間不互相等待；PostgreSQL 的 commit 順序不一定與序號相同 (小號可能晚 commit)，
+#   讀取端遇到序號空缺就先停在空缺前，等晚 commit 的交易補上，空缺後的事件寫入超過 CHANGE_FEED_COMMIT_GRACE 秒
+#   仍未補上才視為已 rollback 跳過；因此送出的事件依序號遞增，用戶端以最後收到的序號接續不會漏掉
+# - PostgreSQL 以 NOTIFY 通知所有 worker；SQLite 寫入本來就是序列化的，由 after_commit 通知本程序，
+#   其他程序的寫入由每 CHANGE_FEED_POLL_INTERVAL 秒的輪詢補上
+# - 每個程序只有一個 ChangeFeed 讀取新事件，再分送給所有 SSE / WebSocket 連線與程序內的 listener
+#   (例如主檔快取據此清除其他 worker 修改過的資料)
+import asyncio
+import logging
+import signal
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.change import ChangeEvent
+from app.models.inbound_order import InboundDetail, InboundOrder
+from app.models.product import Product
+from app.models.requisition import ReqDetail, Requisition
+from app.models.staff import Staff
+from app.models.supplier import Supplier
+from app.models.warehouse import Warehouse
+
+logger = logging.getLogger("wms.changes")
+
+CHANNEL = "wms_changes"
+READ_BATCH_SIZE = 500
+# 每個連線最多累積的未送出批次，超過就改回資料庫補讀
+SUBSCRIBER_QUEUE_SIZE = 100
+PRUNE_INTERVAL = 3600
+
+# 資料表 -> (事件的 entity, 主鍵欄位, 是否為主檔 / 主單)；明細的異動記為所屬主單的 update
+CHANGE_TABLES: Dict[str, Tuple[str, str, bool]] = {
+    Product.__tablename__: ("product", "ProductID", True),
+    Staff.__tablename__: ("staff", "StaffID", True),
+    Supplier.__tablename__: ("supplier", "SupplierID", True),
+    Warehouse.__tablename__: ("warehouse", "WarehouseID", True),
+    InboundOrder.__tablename__: ("inbound", "InboundID", True),
+    InboundDetail.__tablename__: ("inbound", "InboundID", False),
+    Requisition.__tablename__: ("requisition", "ReqID", True),
+    ReqDetail.__tablename__: ("requisition", "ReqID", False),
+}
+ENTITIES = sorted({entity for entity, _, _ in CHANGE_TABLES.values()})
+
+_PENDING = "pending_changes"
+_NOTIFY = "notify_changes"
+# 同一交易內同一筆資料有多次異動時只留一個：delete > create > update
+_PRIORITY = {"update": 0, "create": 1, "delete": 2}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _add(session, entity: str, op: str, key: int) -> None:
+    pending = session.info.setdefault(_PENDING, {})
+    current = pending.get((entity, key))
+    if current is None or _PRIORITY[op] > _PRIORITY[current]:
+        pending[(entity, key)] = op
+
+
+def record_changes(session, model, op: str, keys: Iterable[int]) -> None:
+    """Core 語句不經過 ORM，需手動記錄異動的主鍵 (明細的 model 傳主單的主鍵)；commit 時寫入"""
+    if not settings.change_feed_enabled:
+        return
+    entity, _, is_header = CHANGE_TABLES[model.__tablename__]
+    for key in keys:
+        _add(session, entity, op if is_header else "update", key)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_orm_changes(session, flush_context):
+    if not settings.change_feed_enabled:
+        return
+    for objects, op in ((session.new, "create"), (session.dirty, "update"), (session.deleted, "delete")):
+        for obj in objects:
+            table = getattr(type(obj), "__table__", None)
+            spec = CHANGE_TABLES.get(table.name) if table is not None else None
+            if spec is None:
+                continue
+            entity, key, is_header = spec
+            if op == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            _add(session, entity, op if is_header else "update", getattr(obj, key))
+
+
+@event.listens_for(Session, "before_commit")
+def _write_changes(session):
+    session.flush()
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+
+    # 在 commit 前一刻才取號 (ceAt 也是此時)，取號到 commit 之間很短，讀取端等待空缺的時間也短
+    conn = session.connection()
+    is_postgres = conn.dialect.name == "postgresql"
+    now = _utcnow()
+    conn.execute(ChangeEvent.__table__.insert(), [
+        {"ceEntity": entity, "ceOp": op, "ceKey": key, "ceAt": now}
+        for (entity, key), op in sorted(pending.items())
+    ])
+    if is_postgres:
+        # NOTIFY 隨交易 commit 才送出
+        conn.execute(text("SELECT pg_notify(:channel, '')"), {"channel": CHANNEL})
+    session.info[_NOTIFY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_feed(session):
+    if session.info.pop(_NOTIFY, False):
+        change_feed.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_PENDING, None)
+    session.info.pop(_NOTIFY, None)
+
+
+# --- 讀取 ---
+
+@dataclass
+class ChangeBatch:
+    events: List[ChangeEvent]
+    # 下一次讀取的起點：已確定不會再有更小序號補進來的位置 (含被 entities 濾掉的事件)
+    last_seq: int
+    # 停在尚未補上的序號空缺前，稍後需要再讀一次
+    held: bool = False
+    # 讀滿 limit 筆，之後可能還有事件
+    more: bool = False
+
+
+def _settled_at() -> datetime:
+    """寫入時間早於這個時間的事件，之前的序號空缺不會再補上 (取號的交易已經 rollback)"""
+    return _utcnow() - timedelta(seconds=settings.change_feed_commit_grace)
+
+
+async def read_changes(
+    after: int, limit: int = READ_BATCH_SIZE, entities: Optional[Set[str]] = None
+) -> ChangeBatch:
+    # 不在 SQL 以 entities 過濾：其他種類的事件也要讀到，才分得出序號空缺
+    statement = select(ChangeEvent).where(ChangeEvent.ceSeq > after).order_by(ChangeEvent.ceSeq).limit(limit)
+    async with engine.connect() as conn:
+        rows = (await conn.execute(statement)).mappings().all()
+
+    settled = _settled_at()
+    batch = ChangeBatch([], after)
+    for row in rows:
+        event = ChangeEvent.model_construct(**row)
+        if event.ceSeq != batch.last_seq + 1 and event.ceAt > settled:
+            batch.held = True
+            break
+        batch.last_seq = event.ceSeq
+        if not entities or event.ceEntity in entities:
+            batch.events.append(event)
+    batch.more = not batch.held and len(rows) == limit
+    return batch
+
+
+async def seq_bounds() -> Tuple[Optional[int], int]:
+    """目前保留的最小 / 最大序號 (沒有事件時為 (None, 0))"""
+    async with engine.connect() as conn:
+        low, high = (await conn.execute(select(func.min(ChangeEvent.ceSeq), func.max(ChangeEvent.ceSeq)))).one()
+    return low, high or 0
+
+
+async def settled_seq() -> int:
+    """之前不會再有事件補進來的最大序號：寫入超過寬限時間的最後一個事件 (更新的事件之間可能還有空缺)"""
+    async with engine.connect() as conn:
+        seq = await conn.scalar(select(func.max(ChangeEvent.ceSeq)).where(ChangeEvent.ceAt <= _settled_at()))
+    return seq or 0
+
+
+async def resume_point(after: Optional[int]) -> Tuple[int, bool]:
+    """回傳 (從哪個序號之後開始, 是否需要重新同步)；未指定 after 時從目前最新的事件之後開始
+    (從確定的位置開始，最近寬限時間內的事件可能再收到一次)"""
+    low, high = await seq_bounds()
+    if after is None:
+        return await settled_seq(), False
+    # 要求的序號之後已有事件被清除，或比目前最大序號還大 (資料庫重建過)：中間的異動無法補齊
+    if after > high or (low is not None and after < low - 1):
+        return high, True
+    return after, False
+
+
+# --- 分送 ---
+
+class Subscription:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)  # 叫醒正在等待的串流
+        except asyncio.QueueFull:
+            pass
+
+    def put(self, events: List[ChangeEvent]) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(events)
+        except asyncio.QueueFull:
+            # 用戶端讀太慢：不再累積，之後改從資料庫補讀
+            self.overflowed = True
+
+
+class ChangeFeed:
+    """每個程序一個：收到通知 (或輪詢逾時) 就讀出新事件，分送給所有訂閱者"""
+
+    def __init__(self):
+        self.last_seq = 0
+        self._subscribers: Set[Subscription] = set()
+        self._listeners: Set[Callable[[List[ChangeEvent]], None]] = set()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._listener = None  # PostgreSQL LISTEN 專用的連線
+        self._closing = False
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def add_listener(self, listener: Callable[[List[ChangeEvent]], None]) -> None:
+        """程序內的同步 callback：每批新事件 (所有 entity) 都會收到，例外只記錄不影響分送"""
+        self._listeners.add(listener)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[Subscription]:
+        subscription = Subscription()
+        if self._closing:
+            subscription.close()
+        self._subscribers.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscribers.discard(subscription)
+
+    def close_streams(self) -> None:
+        """結束所有 SSE / WebSocket 串流 (用戶端以最後的序號重新連線到其他 worker 或重啟後的程序)"""
+        self._closing = True
+        for subscription in self._subscribers:
+            subscription.close()
+
+    def close_streams_on_exit(self) -> None:
+        """uvicorn 收到 SIGINT / SIGTERM 後要等所有請求結束才執行 lifespan 的關閉，長連線不會自己結束：
+        包住原本的 signal handler，先結束串流再交給它處理 (只能在主執行緒註冊)"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            previous = signal.getsignal(sig)
+            if not callable(previous):
+                continue
+
+            def handler(signum, frame, previous=previous):
+                loop.call_soon_threadsafe(self.close_streams)
+                previous(signum, frame)
+
+            try:
+                signal.signal(sig, handler)
+            except ValueError:
+                return
+
+    async def start(self) -> None:
+        self._closing = False
+        self._wake = asyncio.Event()
+        self.last_seq = await settled_seq()
+        if engine.dialect.name == "postgresql":
+            self._listener = await engine.connect()
+            raw = await self._listener.get_raw_connection()
+            await raw.driver_connection.add_listener(CHANNEL, lambda *_: self.notify())
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_prune = float("-inf")
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.change_feed_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self._dispatch()
+                if loop.time() - last_prune >= PRUNE_INTERVAL:
+                    last_prune = loop.time()
+                    await prune_changes()
+            except Exception:
+                logger.exception("change feed dispatch failed")
+
+    async def _dispatch(self) -> None:
+        if not self._subscribers and not self._listeners:
+            # 沒有訂閱者時只記住確定的序號；查詢期間有人訂閱就照常讀取，避免跳過他還沒收到的事件
+            settled = await settled_seq()
+            if not self._subscribers:
+                self.last_seq = max(self.last_seq, settled)
+                return
+        while True:
+            batch = await read_changes(self.last_seq)
+            self.last_seq = batch.last_seq
+            if batch.events:
+                for listener in list(self._listeners):
+                    try:
+                        listener(batch.events)
+                    except Exception:
+                        logger.exception("change feed listener %r failed", listener)
+                for subscription in list(self._subscribers):
+                    subscription.put(batch.events)
+            if batch.held:
+                # 寬限時間後再讀一次：空缺補上或已可跳過
+                asyncio.get_running_loop().call_later(settings.change_feed_commit_grace, self.notify)
+                return
+            if not batch.more:
+                return
+
+
+change_feed = ChangeFeed()
+
+
+async def prune_changes() -> int:
+    """刪除超過保留天數的事件"""
+    if settings.change_feed_retention_days <= 0:
+        return 0
+    cutoff = _utcnow() - timedelta(days=settings.change_feed_retention_days)
+    async with engine.begin() as conn:
+        result = await conn.execute(delete(ChangeEvent).where(ChangeEvent.ceAt < cutoff))
+    return result.rowcount
+
+
+async def iter_changes(after: Optional[int], entities: Optional[Set[str]] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """依序產生 ("change", 事件)、("reset", 新的起點序號) 與閒置時的 ("ping", None)；
+    先訂閱再從資料庫補讀，補讀與即時分送重疊的部分以序號去除"""
+    async with change_feed.subscribe() as subscription:
+        last, reset = await resume_point(after)
+        if reset:
+            yield "reset", last
+
+        while True:
+            # 補讀 (第一次連線，或分送佇列曾經滿出來)
+            subscription.overflowed = False
+            while True:
+                batch = await read_changes(last, entities=entities)
+                for e in batch.events:
+                    yield "change", e
+                last = batch.last_seq
+                if not batch.more:
+                    break
+
+            while not subscription.overflowed:
+                try:
+                    events = await asyncio.wait_for(subscription.queue.get(), settings.change_feed_heartbeat)
+                except asyncio.TimeoutError:
+                    yield "ping", None
+                    continue
+                if events is None or subscription.closed:
+                    return
+                for e in events:
+                    if e.ceSeq <= last:
+                        continue
+                    last = e.ceSeq
+                    if not entities or e.ceEntity in entities:
+                        yield "change", e
+
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
@@ -0,0 +1,152 @@
+# app/core/config.py
+# 集中讀取環境變數 (.env)，其他模組一律透過 settings 取得設定
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_list(name: str) -> Tuple[str, ...]:
+    # 以逗號分隔，忽略空白項目
+    return tuple(item.strip() for item in os.getenv(name, "").split(",") if item.strip())
+
+
+@dataclass(frozen=True)
+class Settings:
+    app_env: str
+    postgres_url: Optional[str]
+    sqlite_url: str
+
+    # SQL 語句輸出 (只建議在開發時打開)
+    sql_echo: bool
+
+    # 連線池 (SQLite 記憶體資料庫不適用)
+    db_pool_size: int
+    db_max_overflow: int
+    db_pool_timeout: float
+    db_pool_recycle: int
+    db_pool_pre_ping: bool
+
+    # 啟動時資料庫結構不是最新版就自動執行 alembic upgrade (正式環境預設關閉，改在部署時執行一次)
+    db_auto_migrate: bool
+
+    # 主檔 (商品 / 倉庫 / 員工 / 供應商) 的程序內快取
+    cache_ttl: float
+    cache_maxsize: int
+
+    # 領料扣庫存時 SQLite 使用的分段鎖數量 (PostgreSQL 改用列鎖)
+    stock_lock_stripes: int
+
+    # ETag 使用的資料表版本號在記憶體中最多沿用幾秒 (多個 worker 時其他 worker 的寫入最多延遲這麼久才反映)
+    etag_max_age: float
+
+    # 每個路由的延遲 / SQL 統計 (/metrics)
+    metrics_enabled: bool
+
+    # 慢查詢紀錄 (毫秒) 與 N+1 偵測 (同一請求內同一語句的執行次數上限)
+    query_log_enabled: bool
+    slow_query_ms: float
+    n_plus_one_threshold: int
+    # 慢查詢的參數值是否原樣寫進 log 與 /_internal/queries (預設只留型別；參數可能含個資)
+    query_log_parameters: bool
+
+    # /api/v1/_internal 的存取權杖 (X-Internal-Token 標頭)；未設定時只在非正式環境開放
+    internal_api_token: Optional[str]
+
+    # 背景工作：API 程序內同時執行的工作數 (0 = 不在 API 程序執行，改由 python -m app.core.jobs 執行)、
+    # 上傳檔與結果檔目錄、取工作的輪詢間隔 (秒)、多久沒有心跳視為中斷 (秒)
+    job_concurrency: int
+    job_dir: str
+    job_poll_interval: float
+    job_stale_seconds: float
+
+    # 異動事件 (change feed)：事件保留天數、補抓其他程序寫入的輪詢間隔 (秒)、SSE / WebSocket 保持連線的心跳 (秒)
+    change_feed_enabled: bool
+    change_feed_retention_days: float
+    change_feed_poll_interval: float
+    change_feed_heartbeat: float
+    # 序號有空缺時等待晚 commit 的交易幾秒 (超過就視為已 rollback 跳過；需大於各 worker 的時鐘誤差)
+    change_feed_commit_grace: float
+
+    # 讀取副本：GET 請求的查詢分散到這些連線字串 (空 = 全部走主庫)、選擇方式 (round_robin / least_connections)、
+    # 複寫延遲超過幾秒就暫停使用、多久量測一次延遲 (秒)
+    read_replica_urls: Tuple[str, ...]
+    replica_balance: str
+    replica_max_lag: float
+    replica_check_interval: float
+
+    # 舊單封存：進貨 / 領料單超過幾天搬到封存表、每個交易搬幾張單
+    archive_after_days: int
+    archive_batch_size: int
+
+    @property
+    def is_production(self) -> bool:
+        return self.app_env == "production"
+
+    @property
+    def database_url(self) -> str:
+        return self.postgres_url if self.is_production else self.sqlite_url
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        app_env = os.getenv("APP_ENV", "development")
+        return cls(
+            app_env=app_env,
+            postgres_url=os.getenv("DATABASE_URL"),
+            sqlite_url=os.getenv("SQLITE_URL", "sqlite+aiosqlite:///./local_dev.db"),
+            sql_echo=env_bool("SQL_ECHO", False),
+            db_pool_size=env_int("DB_POOL_SIZE", 10),
+            db_max_overflow=env_int("DB_MAX_OVERFLOW", 20),
+            db_pool_timeout=env_float("DB_POOL_TIMEOUT", 30),
+            db_pool_recycle=env_int("DB_POOL_RECYCLE", 1800),
+            db_pool_pre_ping=env_bool("DB_POOL_PRE_PING", True),
+            db_auto_migrate=env_bool("DB_AUTO_MIGRATE", app_env != "production"),
+            cache_ttl=env_float("CACHE_TTL", 60),
+            cache_maxsize=env_int("CACHE_MAXSIZE", 10000),
+            stock_lock_stripes=env_int("STOCK_LOCK_STRIPES", 1024),
+            etag_max_age=env_float("ETAG_MAX_AGE", 1),
+            metrics_enabled=env_bool("METRICS_ENABLED", True),
+            query_log_enabled=env_bool("QUERY_LOG_ENABLED", True),
+            slow_query_ms=env_float("SLOW_QUERY_MS", 200),
+            n_plus_one_threshold=env_int("N_PLUS_ONE_THRESHOLD", 10),
+            query_log_parameters=env_bool("QUERY_LOG_PARAMETERS", False),
+            internal_api_token=os.getenv("INTERNAL_API_TOKEN") or None,
+            job_concurrency=env_int("JOB_CONCURRENCY", 2),
+            job_dir=os.getenv("JOB_DIR", "./job_files"),
+            job_poll_interval=env_float("JOB_POLL_INTERVAL", 1),
+            job_stale_seconds=env_float("JOB_STALE_SECONDS", 300),
+            change_feed_enabled=env_bool("CHANGE_FEED_ENABLED", True),
+            change_feed_retention_days=env_float("CHANGE_FEED_RETENTION_DAYS", 7),
+            change_feed_poll_interval=env_float("CHANGE_FEED_POLL_INTERVAL", 5),
+            change_feed_heartbeat=env_float("CHANGE_FEED_HEARTBEAT", 15),
+            change_feed_commit_grace=env_float("CHANGE_FEED_COMMIT_GRACE", 2),
+            read_replica_urls=env_list("READ_REPLICA_URLS"),
+            replica_balance=os.getenv("REPLICA_BALANCE", "round_robin"),
+            replica_max_lag=env_float("REPLICA_MAX_LAG", 5),
+            replica_check_interval=env_float("REPLICA_CHECK_INTERVAL", 2),
+            archive_after_days=env_int("ARCHIVE_AFTER_DAYS", 365),
+            archive_batch_size=env_int("ARCHIVE_BATCH_SIZE", 500),
+        )
+
+
+settings = Settings.from_env()
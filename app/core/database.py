@@ -1,51 +1,145 @@
 # app/core/database.py
-import os
-from sqlmodel import SQLModel, create_engine
+import time
+from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import create_async_engine
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.dialects import postgresql, sqlite
 from contextlib import asynccontextmanager
+from fastapi import Request
 
-load_dotenv()
-
-# 讀取環境變數
-APP_ENV = os.getenv("APP_ENV", "development")
-POSTGRES_URL = os.getenv("DATABASE_URL")
-SQLITE_URL = os.getenv("SQLITE_URL", "sqlite+aiosqlite:///./local_dev.db")
+from app.core.config import Settings, settings
+from app.core.metrics import record_pool_wait
+from app.core.querylog import install_query_log
 
 # 判斷連線字串
-if APP_ENV == "production":
-    DATABASE_URL = POSTGRES_URL
+DATABASE_URL = settings.database_url
+if settings.is_production:
     print("🚀 Using PostgreSQL Database")
 else:
-    DATABASE_URL = SQLITE_URL
     print("🛠️ Using SQLite Database (Development Mode)")
 
-# 建立 Async Engine
-# echo=True 會印出 SQL 語句，方便開發除錯
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
 
-# 依賴注入用的 Session 產生器
-async def get_db():
-    async_session = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
+class PoolWaitStats:
+    """記錄從連線池取得連線所花的時間，用來判斷連線池是否飽和"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, elapsed: float):
+        self.checkouts += 1
+        self.total_wait += elapsed
+        self.max_wait = max(self.max_wait, elapsed)
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # 包住 QueuePool 取得連線的動作 (含排隊等待與建立新連線)
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_wait_stats.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            pool_wait_stats.record(elapsed)
+            record_pool_wait(elapsed)
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and (
+        parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory"
     )
-    async with async_session() as session:
+
+
+def create_engine_from_settings(config: Settings, url: str = None, poolclass=TimedQueuePool) -> AsyncEngine:
+    """依設定建立 Async Engine (預設為主庫)；SQL_ECHO=true 時才輸出 SQL 語句"""
+    url = url or config.database_url
+    if _is_sqlite_memory(url):
+        # 記憶體資料庫只能共用單一連線，不套用連線池設定
+        return create_async_engine(url, echo=config.sql_echo)
+
+    return create_async_engine(
+        url,
+        echo=config.sql_echo,
+        poolclass=poolclass,
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_timeout=config.db_pool_timeout,
+        pool_recycle=config.db_pool_recycle,
+        pool_pre_ping=config.db_pool_pre_ping,
+    )
+
+
+# session.info 中指定讀取副本的 key (值為副本的 sync engine，None 代表全部走主庫)
+READ_BIND = "read_bind"
+
+# 會送到讀取副本的 HTTP 方法
+READ_METHODS = ("GET", "HEAD")
+
+
+class RoutingSession(Session):
+    """有指定讀取副本時，單純的 SELECT 送到副本；寫入、鎖定 (FOR UPDATE) 與之後的查詢都在主庫"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get(READ_BIND)
+        if replica is not None:
+            if isinstance(clause, Select) and clause._for_update_arg is None:
+                return replica
+            # flush / Core 寫入 / session.connection() 都會走到這裡：之後改讀主庫，才讀得到自己剛寫入的資料
+            self.info[READ_BIND] = None
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+# 建立 Async Engine 與全域唯一的 Session 工廠 (不再每個請求重建)
+engine = create_engine_from_settings(settings)
+async_session = async_sessionmaker(engine, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False)
+
+# 慢查詢紀錄 / N+1 偵測 (SQL 指紋統計)
+if settings.query_log_enabled:
+    install_query_log(engine)
+
+# 依賴注入用的 Session 產生器：GET 請求的查詢由讀取副本負責 (未設定副本或副本過期時仍是主庫)
+async def get_db(request: Request):
+    read_bind = await replicas.replica_set.choose() if request.method in READ_METHODS else None
+    async with async_session(info={READ_BIND: read_bind}) as session:
         yield session
 
-# 初始化 DB (用於 SQLite 快速建立 Table，正規做法是用 Alembic)
-async def init_db():
-    async with engine.begin() as conn:
-        # await conn.run_sync(SQLModel.metadata.drop_all) # 開發初期若要重置可打開
-        await conn.run_sync(SQLModel.metadata.create_all)
+# 依方言取得支援 ON CONFLICT 的 insert (PostgreSQL / SQLite 語法相同)
+def dialect_insert(db: AsyncSession, table):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
 
+async def reset_sequence(db: AsyncSession, table: str, pk: str) -> None:
+    """明確指定主鍵寫入後，把 PostgreSQL 的 serial sequence 調到目前最大值 (SQLite 不需要)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    await db.exec(text(f"SELECT setval(pg_get_serial_sequence('{table}', '{pk}'), (SELECT MAX(\"{pk}\") FROM {table}));"))
 
 @asynccontextmanager
-async def get_db_session_context():
-    """提供給非 FastAPI Depends 使用的 Context Manager (例如 seed.py)"""
-    async_session = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with async_session() as session:
-        yield session
\ No newline at end of file
+async def get_db_session_context(read_only: bool = False):
+    """提供給非 FastAPI Depends 使用的 Context Manager (例如 seed.py)；read_only=True 時查詢可以送到讀取副本"""
+    read_bind = await replicas.replica_set.choose() if read_only else None
+    async with async_session(info={READ_BIND: read_bind}) as session:
+        yield session
+
+
+# 資料表版本號 (ETag 用) 與異動事件 (change feed) 的 session 事件：API 與 CLI 的寫入都要記錄，所以在這裡註冊；
+# 放在檔案最後 import，避開 versions / changes -> database 的循環引用
+from app.core import versions  # noqa: E402,F401
+from app.core import changes  # noqa: E402,F401
+# 讀取副本的 engine 同樣以 create_engine_from_settings 建立 (只 import 模組，replicas 先被 import 時也不會循環失敗)
+from app.core import replicas  # noqa: E402
@@ -0,0 +1,295 @@
+# app/core/datagen.py
+# 壓測 / 基準測試用的大量假資料產生器
+# - 同一組參數與 seed 產生的資料完全相同 (只使用單一 random.Random，產生順序固定，與批次大小無關)
+# - 分布刻意偏斜：商品 / 倉庫 / 供應商的熱門度依 Zipf 分布，平日單量高於週末，明細數與數量多數偏小
+# - 寫入走批次路徑：PostgreSQL 用 asyncpg COPY，SQLite 用 driver 層 executemany，不建立 ORM 物件
+# - ID 從各表目前的最大值之後開始編，可以疊加在既有資料上
+#
+# 使用方式: python -m app.core.datagen --products 100000 --inbound-orders 1000000 --requisitions 500000
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.database import engine, get_db_session_context, reset_sequence
+from app.core.inventory import rebuild_stock_balances
+from app.core.migrations import ensure_schema
+from app.core.rollup import rebuild_volume_rollups
+from app.core.search import rebuild_search_index
+from app.core.versions import mark_changed
+from app.models.inbound_order import InboundDetail, InboundOrder, InboundOrderArchive
+from app.models.product import Product
+from app.models.requisition import ReqDetail, Requisition, RequisitionArchive
+from app.models.staff import Staff
+from app.models.supplier import Supplier
+from app.models.warehouse import Warehouse
+
+CATEGORIES = ["電子產品", "電腦周邊", "文具", "食品", "日用品", "服飾", "家電", "工具", "包材", "五金"]
+ADJECTIVES = ["無線", "輕量", "加大", "迷你", "專業", "防水", "節能", "高速", "經典", "環保"]
+NOUNS = ["耳機", "鍵盤", "滑鼠", "螢幕", "紙箱", "膠帶", "手套", "電池", "插座", "水壺", "背包", "燈泡"]
+CITIES = ["台北", "新北", "桃園", "新竹", "台中", "彰化", "嘉義", "台南", "高雄", "屏東"]
+SURNAMES = "陳林黃張李王吳劉蔡楊許鄭謝郭洪曾邱廖賴周"
+GIVEN = "志明俊傑淑芬雅婷家豪冠宇怡君承恩宗翰佳穎"
+DEPARTMENTS = ["倉庫部", "採購部", "物流部", "品管部", "管理部"]
+REASONS = ["產線領料", "門市補貨", "樣品", "維修", "報廢", "客戶出貨"]
+
+
+@dataclass(frozen=True)
+class DatagenConfig:
+    products: int = 10000
+    warehouses: int = 10
+    suppliers: int = 200
+    staff: int = 100
+    inbound_orders: int = 100000
+    requisitions: int = 50000
+    max_details: int = 10          # 每張單據最多幾筆明細 (1 筆最常見)
+    start: date = date(2024, 1, 1)
+    days: int = 365
+    seed: int = 42
+    batch_size: int = 20000        # 每次寫入的單據數
+    skew: float = 1.1              # Zipf 指數，越大越集中在少數熱門項目
+
+
+def _zipf_cum_weights(n: int, s: float) -> List[float]:
+    # 第 k 名的權重 1 / k^s；random.choices 使用累積權重時是 O(log n)
+    return list(itertools.accumulate(1 / (k ** s) for k in range(1, n + 1)))
+
+
+class Generator:
+    def __init__(self, config: DatagenConfig, first_ids: Dict[str, int]):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.first_ids = first_ids
+
+        # 熱門度排名打散，熱門商品不會都集中在 ID 前段
+        self.product_ids = self._shuffled_ids("product", config.products)
+        self.warehouse_ids = self._shuffled_ids("warehouse", config.warehouses)
+        self.supplier_ids = self._shuffled_ids("supplier", config.suppliers)
+        self.staff_ids = list(range(first_ids["staff"], first_ids["staff"] + config.staff))
+        self.product_weights = _zipf_cum_weights(config.products, config.skew)
+        self.warehouse_weights = _zipf_cum_weights(config.warehouses, config.skew)
+        self.supplier_weights = _zipf_cum_weights(config.suppliers, config.skew)
+
+        # 平日權重 1、週末 0.3
+        self.dates = [config.start + timedelta(days=i) for i in range(config.days)]
+        self.date_weights = list(itertools.accumulate(1.0 if d.weekday() < 5 else 0.3 for d in self.dates))
+        # 明細筆數 k 的權重 1 / k
+        self.detail_counts = list(range(1, config.max_details + 1))
+        self.detail_weights = list(itertools.accumulate(1 / k for k in self.detail_counts))
+
+        # 進貨後的庫存 (領料數量不超過庫存，最終庫存不會是負數)
+        self.stock: Dict[Tuple[int, int], int] = {}
+
+    def _shuffled_ids(self, table: str, count: int) -> List[int]:
+        ids = list(range(self.first_ids[table], self.first_ids[table] + count))
+        self.rng.shuffle(ids)
+        return ids
+
+    # --- 主檔 ---
+    def products(self) -> List[tuple]:
+        rng, first = self.rng, self.first_ids["product"]
+        return [
+            (pid, f"{rng.choice(ADJECTIVES)}{rng.choice(NOUNS)} {pid}", f"規格 {rng.randint(1, 999)}", rng.choice(CATEGORIES))
+            for pid in range(first, first + self.config.products)
+        ]
+
+    def warehouses(self) -> List[tuple]:
+        rng, first = self.rng, self.first_ids["warehouse"]
+        return [
+            (wid, f"{rng.choice(CITIES)}{wid}號倉", f"{rng.choice(CITIES)}物流園區 {rng.randint(1, 50)} 號")
+            for wid in range(first, first + self.config.warehouses)
+        ]
+
+    def suppliers(self) -> List[tuple]:
+        rng, first = self.rng, self.first_ids["supplier"]
+        return [
+            (sid, f"{rng.choice(CITIES)}供應商{sid}", f"0{rng.randint(2, 8)}-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}", f"{rng.choice(CITIES)}市工業路 {rng.randint(1, 500)} 號")
+            for sid in range(first, first + self.config.suppliers)
+        ]
+
+    def staff(self) -> List[tuple]:
+        rng = self.rng
+        return [
+            (sid, rng.choice(SURNAMES) + "".join(rng.choices(GIVEN, k=2)), rng.choice(DEPARTMENTS))
+            for sid in self.staff_ids
+        ]
+
+    # --- 單據 ---
+    def _date(self) -> date:
+        return self.rng.choices(self.dates, cum_weights=self.date_weights)[0]
+
+    def _lines(self) -> List[Tuple[int, int, int]]:
+        """(ProductID, WarehouseID, 數量)，同一張單的商品不重複"""
+        rng = self.rng
+        k = rng.choices(self.detail_counts, cum_weights=self.detail_weights)[0]
+        products = dict.fromkeys(rng.choices(self.product_ids, cum_weights=self.product_weights, k=k))
+        warehouses = rng.choices(self.warehouse_ids, cum_weights=self.warehouse_weights, k=len(products))
+        # 數量呈對數常態：大多是個位數到數十，偶爾有大量
+        return [
+            (pid, wid, int(rng.lognormvariate(2.5, 0.9)) + 1)
+            for pid, wid in zip(products, warehouses)
+        ]
+
+    def inbound_batch(self, first_id: int, count: int) -> Tuple[List[tuple], List[tuple]]:
+        rng, headers, details = self.rng, [], []
+        for inbound_id in range(first_id, first_id + count):
+            supplier = rng.choices(self.supplier_ids, cum_weights=self.supplier_weights)[0]
+            headers.append((inbound_id, self._date(), supplier, rng.choice(self.staff_ids)))
+            for pid, wid, qty in self._lines():
+                details.append((inbound_id, pid, qty, wid))
+                self.stock[(pid, wid)] = self.stock.get((pid, wid), 0) + qty
+        return headers, details
+
+    def requisition_batch(self, first_id: int, count: int) -> Tuple[List[tuple], List[tuple]]:
+        rng, headers, details = self.rng, [], []
+        for req_id in range(first_id, first_id + count):
+            header = (req_id, self._date(), rng.choice(REASONS), rng.choice(self.staff_ids))
+            lines = []
+            for pid, wid, qty in self._lines():
+                available = self.stock.get((pid, wid), 0)
+                qty = min(qty, available)
+                if qty <= 0:
+                    continue
+                lines.append((req_id, pid, qty, wid))
+                self.stock[(pid, wid)] = available - qty
+            # 全部品項都沒有庫存的領料單不寫入 (ID 會跳號)
+            if lines:
+                headers.append(header)
+                details.extend(lines)
+        return headers, details
+
+
+async def _copy_rows(db: AsyncSession, model, columns: Sequence[str], rows: List[tuple]) -> None:
+    """不經過 ORM 的批次寫入：PostgreSQL 用 COPY，SQLite 用 executemany"""
+    if not rows:
+        return
+    table = model.__tablename__
+    conn = await db.connection()
+    if conn.dialect.name == "postgresql":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(table, records=rows, columns=list(columns))
+    else:
+        # SQLite 的日期欄位以 ISO 字串儲存 (與 SQLAlchemy 的 Date 型別一致)
+        if any(isinstance(v, date) for v in rows[0]):
+            rows = [tuple(v.isoformat() if isinstance(v, date) else v for v in row) for row in rows]
+        names = ", ".join(f'"{c}"' for c in columns)
+        marks = ", ".join("?" for _ in columns)
+        await conn.exec_driver_sql(f'INSERT INTO "{table}" ({names}) VALUES ({marks})', rows)
+    # 直接走 driver 不會觸發 session 事件，手動讓 ETag 版本號失效
+    mark_changed(db, table)
+
+
+async def _first_ids(db: AsyncSession) -> Dict[str, int]:
+    ids = {}
+    # 單據也要避開已封存的單號
+    for name, *columns in (
+        ("product", Product.ProductID), ("warehouse", Warehouse.WarehouseID),
+        ("supplier", Supplier.SupplierID), ("staff", Staff.StaffID),
+        ("inbound", InboundOrder.InboundID, InboundOrderArchive.InboundID),
+        ("requisition", Requisition.ReqID, RequisitionArchive.ReqID),
+    ):
+        ids[name] = 1
+        for column in columns:
+            result = await db.exec(select(func.coalesce(func.max(column), 0)))
+            ids[name] = max(ids[name], result.one()[0] + 1)
+    return ids
+
+
+async def generate(db: AsyncSession, config: DatagenConfig, rebuild: bool = True) -> Dict[str, int]:
+    """產生並寫入資料，回傳各表新增筆數"""
+    first_ids = await _first_ids(db)
+    gen = Generator(config, first_ids)
+    counts: Dict[str, int] = {}
+
+    # 1. 主檔
+    for model, columns, rows in (
+        (Product, ("ProductID", "prName", "prSpec", "prCategory"), gen.products()),
+        (Warehouse, ("WarehouseID", "waName", "waLocation"), gen.warehouses()),
+        (Supplier, ("SupplierID", "suName", "suPhone", "suAddress"), gen.suppliers()),
+        (Staff, ("StaffID", "stName", "stDept"), gen.staff()),
+    ):
+        await _copy_rows(db, model, columns, rows)
+        counts[model.__tablename__] = len(rows)
+    await db.commit()
+    print(f"🏭 Master data: {counts}")
+
+    # 2. 單據 (每批一個交易；進貨在前，領料依進貨後的庫存扣減)
+    for label, total, batch_fn, header, detail in (
+        ("inbound", config.inbound_orders, gen.inbound_batch,
+         (InboundOrder, ("InboundID", "ioDate", "SupplierID", "StaffID")),
+         (InboundDetail, ("InboundID", "ProductID", "idQuantity", "WarehouseID"))),
+        ("requisition", config.requisitions, gen.requisition_batch,
+         (Requisition, ("ReqID", "reDate", "reReason", "StaffID")),
+         (ReqDetail, ("ReqID", "ProductID", "rdQuantity", "WarehouseID"))),
+    ):
+        started, orders, details = time.perf_counter(), 0, 0
+        for offset in range(0, total, config.batch_size):
+            headers, lines = batch_fn(first_ids[label] + offset, min(config.batch_size, total - offset))
+            await _copy_rows(db, header[0], header[1], headers)
+            await _copy_rows(db, detail[0], detail[1], lines)
+            await db.commit()
+            orders += len(headers)
+            details += len(lines)
+        counts[header[0].__tablename__] = orders
+        counts[detail[0].__tablename__] = details
+        print(f"📦 {label}: {orders} orders / {details} details in {time.perf_counter() - started:.1f}s")
+
+    # 3. PostgreSQL 的 sequence 跟上明確寫入的 ID
+    for model, pk in (
+        (Product, "ProductID"), (Warehouse, "WarehouseID"), (Supplier, "SupplierID"),
+        (Staff, "StaffID"), (InboundOrder, "InboundID"), (Requisition, "ReqID"),
+    ):
+        await reset_sequence(db, model.__tablename__, pk)
+    await db.commit()
+
+    # 4. 衍生資料 (庫存、彙總、搜尋索引) 由明細重建
+    if rebuild:
+        started = time.perf_counter()
+        await rebuild_stock_balances(db)
+        await rebuild_volume_rollups(db)
+        await rebuild_search_index(db)
+        print(f"🔄 Derived tables rebuilt in {time.perf_counter() - started:.1f}s")
+    return counts
+
+
+def _parse_args() -> Tuple[DatagenConfig, bool]:
+    defaults = DatagenConfig()
+    parser = argparse.ArgumentParser(description="產生壓測用的大量假資料 (相同 seed 產生相同資料)")
+    parser.add_argument("--products", type=int, default=defaults.products)
+    parser.add_argument("--warehouses", type=int, default=defaults.warehouses)
+    parser.add_argument("--suppliers", type=int, default=defaults.suppliers)
+    parser.add_argument("--staff", type=int, default=defaults.staff)
+    parser.add_argument("--inbound-orders", type=int, default=defaults.inbound_orders)
+    parser.add_argument("--requisitions", type=int, default=defaults.requisitions)
+    parser.add_argument("--max-details", type=int, default=defaults.max_details, help="每張單據最多幾筆明細")
+    parser.add_argument("--start", type=date.fromisoformat, default=defaults.start, help="起始日期 (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=defaults.days, help="單據日期分布的天數")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size, help="每個交易寫入的單據數")
+    parser.add_argument("--skew", type=float, default=defaults.skew, help="Zipf 指數")
+    parser.add_argument("--skip-rebuild", action="store_true", help="不重建庫存 / 彙總 / 搜尋索引")
+    args = vars(parser.parse_args())
+    skip_rebuild = args.pop("skip_rebuild")
+    return DatagenConfig(**args), not skip_rebuild
+
+
+async def _main():
+    config, rebuild = _parse_args()
+    started = time.perf_counter()
+    await ensure_schema(auto_migrate=True)
+    async with get_db_session_context() as db:
+        await generate(db, config, rebuild)
+    await engine.dispose()
+    print(f"✅ Done in {time.perf_counter() - started:.1f}s")
+
+
+# 使用方式: python -m app.core.datagen --help
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,86 @@
+# app/core/etag.py
+# GET 回應的 ETag / 條件式請求：ETag 由回應所依賴的資料表版本號組成，
+# If-None-Match 相符時直接回 304，不進路由、不查資料庫也不序列化
+from typing import Dict, Optional, Tuple
+
+from app.core.replicas import require_versions, reset_versions
+from app.core.versions import table_versions
+from app.models.inbound_order import InboundDetail, InboundDetailArchive, InboundOrder, InboundOrderArchive
+from app.models.inventory import StockBalance
+from app.models.product import Product
+from app.models.report import VolumeRollup
+from app.models.requisition import ReqDetail, ReqDetailArchive, Requisition, RequisitionArchive
+from app.models.staff import Staff
+from app.models.supplier import Supplier
+from app.models.warehouse import Warehouse
+
+API_PREFIX = "/api/v1/"
+
+
+def _tables(*models) -> Tuple[str, ...]:
+    return tuple(model.__tablename__ for model in models)
+
+
+# 路由前綴 -> 回應內容依賴的資料表 (單據會帶出商品、倉庫等主檔名稱，主檔變動也要讓 ETag 失效；
+# 單號查詢與 include_archived 會讀到封存表)
+ETAG_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    "products": _tables(Product),
+    "staff": _tables(Staff),
+    "suppliers": _tables(Supplier),
+    "warehouse": _tables(Warehouse),
+    "inbound": _tables(InboundOrder, InboundDetail, InboundOrderArchive, InboundDetailArchive, Product, Warehouse, Supplier, Staff),
+    "requisitions": _tables(Requisition, ReqDetail, RequisitionArchive, ReqDetailArchive, Product, Warehouse, Staff),
+    "inventory": _tables(StockBalance),
+    "reports": _tables(VolumeRollup),
+}
+
+
+def _dependencies(path: str) -> Optional[Tuple[str, ...]]:
+    if not path.startswith(API_PREFIX):
+        return None
+    return ETAG_DEPENDENCIES.get(path[len(API_PREFIX):].split("/", 1)[0])
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # 比對時忽略弱 ETag 的 W/ 前綴
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in tags)
+
+
+class ETagMiddleware:
+    """ASGI middleware：只處理 GET / HEAD，其他方法與未登記的路徑直接放行"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        tables = _dependencies(scope["path"])
+        if tables is None:
+            return await self.app(scope, receive, send)
+
+        # 在執行路由之前取版本號：路由執行期間若有寫入，下次請求的 ETag 不同，不會誤回 304
+        versions = await table_versions.get(tables)
+        etag = 'W/"' + "-".join(str(v) for v in versions) + '"'
+        headers = [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+
+        for name, value in scope["headers"]:
+            if name == b"if-none-match" and _matches(value.decode("latin-1"), etag):
+                await send({"type": "http.response.start", "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message = {**message, "headers": [*message.get("headers", []), *headers]}
+            await send(message)
+
+        # 讀取副本的資料必須至少是這個 ETag 的版本
+        token = require_versions(dict(zip(tables, versions)))
+        try:
+            await self.app(scope, receive, send_with_etag)
+        finally:
+            reset_versions(token)
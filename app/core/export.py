@@ -0,0 +1,130 @@
+# app/core/export.py
+# 進貨 / 領料歷史的串流匯出：伺服器端游標分批讀取 (yield_per)，邊讀邊輸出，
+# 記憶體用量與匯出筆數無關
+import csv
+import io
+import json
+from datetime import date
+from typing import AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select, union_all
+
+from app.core.database import get_db_session_context
+from app.models.inbound_order import InboundOrder, InboundDetail, InboundOrderArchive, InboundDetailArchive
+from app.models.requisition import Requisition, ReqDetail, RequisitionArchive, ReqDetailArchive
+from app.models.product import Product
+from app.models.staff import Staff
+from app.models.supplier import Supplier
+from app.models.warehouse import Warehouse
+
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _inbound_rows(order, detail, date_from: Optional[date], date_to: Optional[date]) -> Select:
+    statement = (
+        select(
+            order.InboundID,
+            order.ioDate,
+            order.SupplierID,
+            Supplier.suName,
+            order.StaffID,
+            Staff.stName,
+            detail.ProductID,
+            Product.prName,
+            detail.WarehouseID,
+            Warehouse.waName,
+            detail.idQuantity,
+        )
+        .join(detail, detail.InboundID == order.InboundID)
+        .outerjoin(Supplier, Supplier.SupplierID == order.SupplierID)
+        .outerjoin(Staff, Staff.StaffID == order.StaffID)
+        .outerjoin(Product, Product.ProductID == detail.ProductID)
+        .outerjoin(Warehouse, Warehouse.WarehouseID == detail.WarehouseID)
+    )
+    if date_from:
+        statement = statement.where(order.ioDate >= date_from)
+    if date_to:
+        statement = statement.where(order.ioDate <= date_to)
+    return statement
+
+
+def _requisition_rows(order, detail, date_from: Optional[date], date_to: Optional[date]) -> Select:
+    statement = (
+        select(
+            order.ReqID,
+            order.reDate,
+            order.reReason,
+            order.StaffID,
+            Staff.stName,
+            detail.ProductID,
+            Product.prName,
+            detail.WarehouseID,
+            Warehouse.waName,
+            detail.rdQuantity,
+        )
+        .join(detail, detail.ReqID == order.ReqID)
+        .outerjoin(Staff, Staff.StaffID == order.StaffID)
+        .outerjoin(Product, Product.ProductID == detail.ProductID)
+        .outerjoin(Warehouse, Warehouse.WarehouseID == detail.WarehouseID)
+    )
+    if date_from:
+        statement = statement.where(order.reDate >= date_from)
+    if date_to:
+        statement = statement.where(order.reDate <= date_to)
+    return statement
+
+
+def _union_ordered(hot: Select, archive: Select, date_key: str, key: str) -> Select:
+    # hot 表與封存表 UNION ALL 後再排序
+    rows = union_all(hot, archive).subquery()
+    return select(rows).order_by(rows.c[date_key], rows.c[key], rows.c.ProductID)
+
+
+def inbound_export_statement(date_from: Optional[date] = None, date_to: Optional[date] = None, archived: bool = False) -> Select:
+    """進貨單攤平成「主單 + 明細」一行；archived=True 時包含封存表"""
+    hot = _inbound_rows(InboundOrder, InboundDetail, date_from, date_to)
+    if not archived:
+        return hot.order_by(InboundOrder.ioDate, InboundOrder.InboundID, InboundDetail.ProductID)
+    archive = _inbound_rows(InboundOrderArchive, InboundDetailArchive, date_from, date_to)
+    return _union_ordered(hot, archive, "ioDate", "InboundID")
+
+
+def requisition_export_statement(date_from: Optional[date] = None, date_to: Optional[date] = None, archived: bool = False) -> Select:
+    """領料單攤平成「主單 + 明細」一行；archived=True 時包含封存表"""
+    hot = _requisition_rows(Requisition, ReqDetail, date_from, date_to)
+    if not archived:
+        return hot.order_by(Requisition.reDate, Requisition.ReqID, ReqDetail.ProductID)
+    archive = _requisition_rows(RequisitionArchive, ReqDetailArchive, date_from, date_to)
+    return _union_ordered(hot, archive, "reDate", "ReqID")
+
+
+async def iter_export(statement: Select, fmt: str) -> AsyncIterator[str]:
+    """逐批輸出 CSV / NDJSON 文字；自己開 Session，不依賴請求的生命週期"""
+    columns = [c.key for c in statement.selected_columns]
+    if fmt == "csv":
+        # 先送出標頭列，讓用戶端立即收到第一個 byte
+        yield ",".join(columns) + "\r\n"
+
+    # 純讀取，可以送到讀取副本
+    async with get_db_session_context(read_only=True) as db:
+        result = await db.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            buffer = io.StringIO()
+            if fmt == "csv":
+                csv.writer(buffer).writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+
+
+def export_response(statement: Select, fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        iter_export(statement, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
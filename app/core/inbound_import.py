@@ -0,0 +1,168 @@
+# app/core/inbound_import.py
+# 進貨單批次匯入：逐行解析 -> 每 chunk 一個交易，主單與明細皆以多筆 INSERT 寫入
+from typing import AsyncIterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.changes import record_changes
+from app.core.inventory import add_stock_deltas, apply_stock_deltas
+from app.core.rollup import add_inbound_volume, apply_volume_deltas
+from app.core.streaming import Record, iter_records, validation_message
+from app.models.inbound_order import InboundOrder, InboundDetail
+from app.models.product import Product
+from app.models.staff import Staff
+from app.models.supplier import Supplier
+from app.models.warehouse import Warehouse
+from app.schemas.bulk import BulkChunkResult, BulkImportResult, BulkRowError
+from app.schemas.inboundorder import InboundOrderCreate
+
+# CSV 每行是一筆明細，連續且 OrderRef 相同的行屬於同一張進貨單
+# OrderRef,ioDate,SupplierID,StaffID,ProductID,idQuantity,WarehouseID
+CSV_DETAIL_FIELDS = ("ProductID", "idQuantity", "WarehouseID")
+
+
+async def _iter_orders(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Record]:
+    if fmt != "csv":
+        # NDJSON 每行就是一張完整的進貨單 (與 POST /inbound/ 的 body 相同)
+        async for record in iter_records(chunks, fmt):
+            yield record
+        return
+
+    current, current_ref, start_line = None, None, 0
+    async for line_no, row, error in iter_records(chunks, fmt):
+        if error:
+            yield line_no, None, error
+            continue
+
+        ref = (row.get("OrderRef") or "").strip() or None
+        detail = {k: row.get(k) for k in CSV_DETAIL_FIELDS}
+        if current is not None and ref is not None and ref == current_ref:
+            current["details"].append(detail)
+            continue
+
+        if current is not None:
+            yield start_line, current, None
+        current = {
+            "ioDate": row.get("ioDate"),
+            "SupplierID": row.get("SupplierID"),
+            "StaffID": row.get("StaffID"),
+            "details": [detail],
+        }
+        current_ref, start_line = ref, line_no
+
+    if current is not None:
+        yield start_line, current, None
+
+
+async def _existing_ids(db: AsyncSession, column, ids: set) -> set:
+    if not ids:
+        return set()
+    result = await db.exec(select(column).where(column.in_(ids)))
+    return set(result.scalars().all())
+
+
+async def _write_chunk(db: AsyncSession, chunk_no: int, batch: List[Record]) -> BulkChunkResult:
+    summary = BulkChunkResult(chunk=chunk_no)
+
+    # 1. 欄位驗證
+    valid: List[Tuple[int, InboundOrderCreate]] = []
+    for line_no, data, error in batch:
+        order = None
+        if error is None:
+            try:
+                order = InboundOrderCreate.model_validate(data)
+            except ValidationError as e:
+                error = validation_message(e)
+        if error is None and not order.details:
+            error = "進貨單至少需要一筆明細"
+        if error is None and len({d.ProductID for d in order.details}) != len(order.details):
+            error = "同一張進貨單的商品不可重複"
+        if error:
+            summary.errors.append(BulkRowError(line=line_no, error=error))
+            continue
+        valid.append((line_no, order))
+
+    # 2. 外鍵檢查 (每種主檔一次 IN 查詢)
+    suppliers = await _existing_ids(db, Supplier.SupplierID, {o.SupplierID for _, o in valid})
+    staff = await _existing_ids(db, Staff.StaffID, {o.StaffID for _, o in valid})
+    products = await _existing_ids(db, Product.ProductID, {d.ProductID for _, o in valid for d in o.details})
+    warehouses = await _existing_ids(db, Warehouse.WarehouseID, {d.WarehouseID for _, o in valid for d in o.details})
+
+    orders = []
+    for line_no, order in valid:
+        error = None
+        if order.SupplierID not in suppliers:
+            error = f"供應商不存在: {order.SupplierID}"
+        elif order.StaffID not in staff:
+            error = f"員工不存在: {order.StaffID}"
+        else:
+            for d in order.details:
+                if d.ProductID not in products:
+                    error = f"商品不存在: {d.ProductID}"
+                    break
+                if d.WarehouseID not in warehouses:
+                    error = f"倉庫不存在: {d.WarehouseID}"
+                    break
+        if error:
+            summary.errors.append(BulkRowError(line=line_no, error=error))
+            continue
+        orders.append((line_no, order))
+
+    # 3. 寫入：主單 (RETURNING 取得 ID) -> 明細 -> 庫存，整個 chunk 一個交易
+    if orders:
+        order_table = InboundOrder.__table__
+        try:
+            result = await db.exec(
+                order_table.insert().returning(order_table.c.InboundID, sort_by_parameter_order=True),
+                params=[o.model_dump(exclude={"details"}) for _, o in orders],
+            )
+            inbound_ids = result.scalars().all()
+
+            detail_rows = [
+                {"InboundID": inbound_id, **d.model_dump()}
+                for inbound_id, (_, o) in zip(inbound_ids, orders)
+                for d in o.details
+            ]
+            await db.exec(InboundDetail.__table__.insert(), params=detail_rows)
+
+            deltas, volume = {}, {}
+            for _, o in orders:
+                add_stock_deltas(deltas, o.details, "idQuantity")
+                add_inbound_volume(volume, o.ioDate, o.SupplierID, o.details)
+            await apply_stock_deltas(db, deltas)
+            await apply_volume_deltas(db, volume)
+            record_changes(db, InboundOrder, "create", inbound_ids)
+
+            await db.commit()
+            summary.accepted = len(orders)
+        except SQLAlchemyError as e:
+            await db.rollback()
+            message = f"寫入失敗，整個區塊已回滾: {e.__class__.__name__}"
+            summary.errors.extend(BulkRowError(line=line_no, error=message) for line_no, _ in orders)
+
+    summary.errors.sort(key=lambda e: e.line)
+    summary.rejected = len(summary.errors)
+    return summary
+
+
+async def import_inbound_orders(
+    db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str, chunk_size: int = 500
+) -> BulkImportResult:
+    """邊解析邊寫入，每累積 chunk_size 張進貨單提交一次"""
+    result = BulkImportResult()
+    batch: List[Record] = []
+
+    async for record in _iter_orders(chunks, fmt):
+        batch.append(record)
+        if len(batch) >= chunk_size:
+            result.chunks.append(await _write_chunk(db, len(result.chunks) + 1, batch))
+            batch = []
+    if batch:
+        result.chunks.append(await _write_chunk(db, len(result.chunks) + 1, batch))
+
+    result.accepted = sum(c.accepted for c in result.chunks)
+    result.rejected = sum(c.rejected for c in result.chunks)
+    return result
@@ -0,0 +1,180 @@
+# app/core/inventory.py
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, select, tuple_, union_all
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.database import dialect_insert, engine, get_db_session_context
+from app.core.versions import defer_version_bump
+from app.models.inventory import StockBalance
+from app.models.inbound_order import InboundDetail, InboundDetailArchive
+from app.models.requisition import ReqDetail, ReqDetailArchive
+
+# (ProductID, WarehouseID) -> 數量增減
+StockDeltas = Dict[Tuple[int, int], int]
+
+
+def add_stock_deltas(deltas: StockDeltas, details: Iterable, quantity_field: str, sign: int = 1) -> StockDeltas:
+    """把明細 (ORM 物件或 schema 皆可) 的數量累加進 deltas，進貨 sign=1、領料 sign=-1"""
+    for d in details:
+        key = (d.ProductID, d.WarehouseID)
+        deltas[key] = deltas.get(key, 0) + sign * getattr(d, quantity_field)
+    return deltas
+
+
+async def apply_stock_deltas(db: AsyncSession, deltas: StockDeltas) -> None:
+    """在目前交易中更新庫存餘額 (不 commit，由呼叫端一起提交)；餘額歸零的列直接刪除"""
+    # 依主鍵排序，讓併發交易以相同順序鎖定列，避免死結
+    rows = [
+        {"ProductID": pid, "WarehouseID": wid, "sbQuantity": qty}
+        for (pid, wid), qty in sorted(deltas.items())
+        if qty != 0
+    ]
+    if not rows:
+        return
+
+    stmt = dialect_insert(db, StockBalance)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["ProductID", "WarehouseID"],
+        set_={"sbQuantity": StockBalance.sbQuantity + stmt.excluded.sbQuantity},
+    )
+    await db.exec(stmt, params=rows)
+
+    # 扣減後不留數量 0 的列：單據都刪除後，商品 / 倉庫不會因為空的餘額列被外鍵擋住而無法刪除
+    keys = _withdrawn_keys(deltas)
+    if keys:
+        await db.exec(
+            delete(StockBalance).where(
+                tuple_(StockBalance.ProductID, StockBalance.WarehouseID).in_(keys),
+                StockBalance.sbQuantity == 0,
+            )
+        )
+
+
+# SQLite 沒有列鎖：程序內把 (ProductID, WarehouseID) 雜湊到固定數量的鎖上 (lock striping)，
+# 不同 SKU 幾乎都落在不同的鎖，彼此不會互相等待；這些鎖只在同一程序內有效，
+# 跨程序 (多個 worker、背景工作、CLI) 由 stock_guard 的 BEGIN IMMEDIATE 取得資料庫的寫入鎖
+_stock_locks = [asyncio.Lock() for _ in range(max(1, settings.stock_lock_stripes))]
+
+
+def _withdrawn_keys(deltas: StockDeltas) -> List[Tuple[int, int]]:
+    return sorted(key for key, qty in deltas.items() if qty < 0)
+
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+@asynccontextmanager
+async def stock_guard(db: AsyncSession, deltas: StockDeltas) -> AsyncIterator[None]:
+    """扣庫存的臨界區：區塊內依序 check_stock → 寫入 → commit，且必須在任何寫入之前進入
+
+    PostgreSQL 由 check_stock 的 SELECT ... FOR UPDATE 鎖住庫存列 (commit / rollback 時釋放)；
+    SQLite 則在這裡持有對應 SKU 的分段鎖直到區塊結束，並以 BEGIN IMMEDIATE 先取得寫入鎖再讀庫存，
+    其他程序的寫入要等這個交易結束。區塊內發生例外時先 rollback 再放鎖；
+    commit 後的版本號遞增等放鎖後才執行 (見 versions.defer_version_bump)。
+    """
+    locks = []
+    if not _is_postgres(db):
+        stripes = sorted({hash(key) % len(_stock_locks) for key in _withdrawn_keys(deltas)})
+        locks = [_stock_locks[i] for i in stripes]
+
+    async with defer_version_bump(db):
+        held = []
+        try:
+            # 依固定順序取得，避免兩筆交易互相等待
+            for lock in locks:
+                await lock.acquire()
+                held.append(lock)
+            if not _is_postgres(db):
+                await _begin_immediate(db)
+            yield
+        except BaseException:
+            await db.rollback()
+            raise
+        finally:
+            for lock in reversed(held):
+                lock.release()
+
+
+async def _begin_immediate(db: AsyncSession) -> None:
+    # sqlite3 在第一個寫入語句前才開始交易 (讀取不鎖)；已經在交易中代表已寫入過，寫入鎖已經在手上
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    if not raw.driver_connection.in_transaction:
+        await conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+async def check_stock(db: AsyncSession, deltas: StockDeltas) -> None:
+    """確認扣減後庫存不會變成負數，不足時回 409 (需在 stock_guard 內呼叫)"""
+    keys = _withdrawn_keys(deltas)
+    if not keys:
+        return
+
+    stmt = (
+        select(StockBalance.ProductID, StockBalance.WarehouseID, StockBalance.sbQuantity)
+        .where(tuple_(StockBalance.ProductID, StockBalance.WarehouseID).in_(keys))
+        .order_by(StockBalance.ProductID, StockBalance.WarehouseID)
+    )
+    if _is_postgres(db):
+        stmt = stmt.with_for_update()
+    result = await db.exec(stmt)
+    available = {(pid, wid): qty for pid, wid, qty in result.all()}
+
+    shortages = [
+        f"商品 {pid} / 倉庫 {wid} (庫存 {available.get((pid, wid), 0)}，扣減 {-deltas[(pid, wid)]})"
+        for pid, wid in keys
+        if available.get((pid, wid), 0) + deltas[(pid, wid)] < 0
+    ]
+    if shortages:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="庫存不足: " + "; ".join(shortages),
+        )
+
+
+async def rebuild_stock_balances(db: AsyncSession) -> int:
+    """由進貨 / 領料明細 (含封存表) 重新計算全部庫存餘額，回傳餘額筆數"""
+    movements = union_all(
+        *(
+            select(detail.ProductID, detail.WarehouseID, detail.idQuantity.label("qty"))
+            for detail in (InboundDetail, InboundDetailArchive)
+        ),
+        *(
+            select(detail.ProductID, detail.WarehouseID, (-detail.rdQuantity).label("qty"))
+            for detail in (ReqDetail, ReqDetailArchive)
+        ),
+    ).subquery()
+
+    totals = (
+        select(movements.c.ProductID, movements.c.WarehouseID, func.sum(movements.c.qty))
+        .group_by(movements.c.ProductID, movements.c.WarehouseID)
+        .having(func.sum(movements.c.qty) != 0)
+    )
+
+    await db.exec(delete(StockBalance))
+    await db.exec(
+        StockBalance.__table__.insert().from_select(
+            ["ProductID", "WarehouseID", "sbQuantity"], totals
+        )
+    )
+    await db.commit()
+
+    result = await db.exec(select(func.count()).select_from(StockBalance))
+    return result.one()[0]
+
+
+async def _main():
+    async with get_db_session_context() as db:
+        count = await rebuild_stock_balances(db)
+    await engine.dispose()
+    print(f"🔄 Stock balances rebuilt: {count} rows.")
+
+
+# 使用方式: python -m app.core.inventory
+if __name__ == "__main__":
+    asyncio.run(_main())
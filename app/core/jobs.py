@@ -0,0 +1,458 @@
+# app/core/jobs.py
+# 背景工作：批次匯入 / 匯出 / 重建這類動輒數分鐘的作業不再佔住 HTTP 請求。
+# API 只在 job 表新增一列 (queued) 就回 202，JobRunner 輪詢取出執行，完成後把結果摘要 / 結果檔記回 job 表
+#
+# - 同時執行的工作數受 JOB_CONCURRENCY 限制，每個工作只用一條連線，背景工作不會把請求用的連線池耗盡
+# - 以「UPDATE ... WHERE jbStatus = 'queued'」搶工作，API 程序與獨立 worker (python -m app.core.jobs) 同時跑也不會重複執行
+# - 進度只記在記憶體，每個輪詢週期連同心跳寫回一次；取消旗標也在這時讀回，
+#   工作在下一次回報進度時 (chunk / 批次之間) 自行中止，不會在 SQL 執行到一半時被打斷
+# - 工作表的簿記一律用 Core 連線直接寫，不經過 session，不會觸發資料表版本號 (ETag)
+# 不需要外部 broker，SQLite 上一樣可用
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import socket
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from app.core.archive import archive_orders, include_archive
+from app.core.config import settings
+from app.core.database import engine, get_db_session_context
+from app.core.export import inbound_export_statement, iter_export, requisition_export_statement
+from app.core.inbound_import import import_inbound_orders
+from app.core.inventory import rebuild_stock_balances
+from app.core.master_upsert import upsert_master_rows
+from app.core.migrations import ensure_schema
+from app.core.rollup import rebuild_volume_rollups
+from app.core.search import SEARCH_ENTITIES, rebuild_search_index
+from app.models.job import Job
+
+logger = logging.getLogger("wms.jobs")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+UPLOAD_NAME = "upload"
+UPLOAD_READ_SIZE = 64 * 1024
+RESULT_JSON = "result.json"
+
+# 關閉時先讓工作在檢查點自行中止，超過這麼多秒才強制中斷
+SHUTDOWN_GRACE_SECONDS = 10
+
+
+def utcnow() -> datetime:
+    # 資料表欄位不帶時區 (PostgreSQL 的 timestamp without time zone)，一律存 UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def job_dir(job_id: int) -> Path:
+    return Path(settings.job_dir) / str(job_id)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """交給工作函式的執行環境：參數、工作目錄與進度回報"""
+
+    def __init__(self, job_id: int, params: Dict[str, Any]):
+        self.job_id = job_id
+        self.params = params
+        self.done = 0
+        self.total: Optional[int] = None
+        self.unit: Optional[str] = None
+        self.cancel_requested = False
+        # 可下載的結果檔名 (位於工作目錄內)
+        self.result_file: Optional[str] = None
+
+    def progress(self, done: int, total: Optional[int] = None, unit: Optional[str] = None) -> None:
+        """回報進度，同時也是取消的檢查點"""
+        if self.cancel_requested:
+            raise JobCancelled()
+        self.done = done
+        if total is not None:
+            self.total = total
+        if unit is not None:
+            self.unit = unit
+
+    def path(self, name: str) -> Path:
+        return job_dir(self.job_id) / name
+
+    async def read_upload(self) -> AsyncIterator[bytes]:
+        """逐段讀回上傳檔，以已讀取的位元組數回報進度"""
+        path = self.path(UPLOAD_NAME)
+        total = path.stat().st_size
+        done = 0
+        self.progress(0, total, "bytes")
+        with path.open("rb") as f:
+            while chunk := f.read(UPLOAD_READ_SIZE):
+                done += len(chunk)
+                self.progress(done)
+                yield chunk
+
+    def write_json(self, name: str, data: Any) -> None:
+        self.path(name).write_text(json.dumps(data, ensure_ascii=False, default=str), encoding="utf-8")
+        self.result_file = name
+
+
+JobHandler = Callable[[JobContext], Awaitable[Optional[Dict[str, Any]]]]
+
+# 工作種類 -> 工作函式 (回傳值為結果摘要，記在 jbResult)
+JOB_KINDS: Dict[str, JobHandler] = {}
+
+
+def job_kind(name: str):
+    def register(handler: JobHandler) -> JobHandler:
+        JOB_KINDS[name] = handler
+        return handler
+    return register
+
+
+# --- 工作種類 ---
+
+@job_kind("inbound_import")
+async def _inbound_import(ctx: JobContext):
+    async with get_db_session_context() as db:
+        result = await import_inbound_orders(db, ctx.read_upload(), ctx.params["format"], ctx.params["chunk_size"])
+    # 各 chunk 的錯誤明細可能很大，完整結果放結果檔，job 表只記筆數
+    ctx.write_json(RESULT_JSON, result.model_dump())
+    return {"accepted": result.accepted, "rejected": result.rejected}
+
+
+@job_kind("master_upsert")
+async def _master_upsert(ctx: JobContext):
+    async with get_db_session_context() as db:
+        result = await upsert_master_rows(
+            db, ctx.params["entity"], ctx.read_upload(), ctx.params["format"], ctx.params["chunk_size"]
+        )
+    ctx.write_json(RESULT_JSON, result.model_dump())
+    return result.model_dump(exclude={"chunks"})
+
+
+EXPORT_STATEMENTS = {
+    "inbound": inbound_export_statement,
+    "requisitions": requisition_export_statement,
+}
+
+
+@job_kind("export")
+async def _export(ctx: JobContext):
+    params = ctx.params
+    date_from, date_to = (date.fromisoformat(d) if d else None for d in (params.get("date_from"), params.get("date_to")))
+    archived = await include_archive(params["target"], params.get("include_archived", False), date_from)
+    statement = EXPORT_STATEMENTS[params["target"]](date_from, date_to, archived)
+    name = f"{params['target']}.{params['format']}"
+
+    written = 0
+    ctx.progress(0, unit="bytes")
+    with ctx.path(name).open("w", encoding="utf-8", newline="") as f:
+        async for text in iter_export(statement, params["format"]):
+            f.write(text)
+            written += len(text.encode("utf-8"))
+            ctx.progress(written)
+    ctx.result_file = name
+    return {"bytes": written}
+
+
+@job_kind("rebuild_inventory")
+async def _rebuild_inventory(ctx: JobContext):
+    async with get_db_session_context() as db:
+        return {"balances": await rebuild_stock_balances(db)}
+
+
+@job_kind("rebuild_reports")
+async def _rebuild_reports(ctx: JobContext):
+    async with get_db_session_context() as db:
+        return {"rows": await rebuild_volume_rollups(db)}
+
+
+@job_kind("rebuild_search")
+async def _rebuild_search(ctx: JobContext):
+    # 逐個主檔重建 (每個主檔一個交易)，以完成的主檔數回報進度
+    entities = list(SEARCH_ENTITIES)
+    grams = 0
+    ctx.progress(0, len(entities), "tables")
+    async with get_db_session_context() as db:
+        for done, entity in enumerate(entities, 1):
+            grams = await rebuild_search_index(db, [entity])
+            ctx.progress(done)
+    return {"grams": grams}
+
+
+@job_kind("archive")
+async def _archive(ctx: JobContext):
+    # 每搬完一批 (一個交易) 回報一次，取消時已搬的批次保留
+    before = date.fromisoformat(ctx.params["before"])
+    ctx.progress(0, unit="orders")
+    async with get_db_session_context() as db:
+        moved = await archive_orders(db, ctx.params["target"], before, ctx.params.get("batch_size"), ctx.progress)
+    return {"archived": moved, "before": before.isoformat()}
+
+
+# --- 送出 / 取消 / 刪除 ---
+
+async def submit_job(kind: str, params: Dict[str, Any], upload: Optional[AsyncIterator[bytes]] = None) -> int:
+    """新增一個 queued 工作並回傳 JobID；upload 先寫到暫存檔，工作列 commit 前搬進工作目錄"""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"未知的工作種類 {kind}")
+    staging: Optional[Path] = None
+    if upload is not None:
+        staging = Path(settings.job_dir) / "uploads" / f"{uuid.uuid4().hex}.part"
+        staging.parent.mkdir(parents=True, exist_ok=True)
+        with staging.open("wb") as f:
+            async for chunk in upload:
+                f.write(chunk)
+
+    try:
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                insert(Job).values(
+                    jbKind=kind, jbStatus=QUEUED, jbParams=params, jbDone=0, jbCancelRequested=False, jbCreatedAt=utcnow(),
+                )
+            )
+            job_id = result.inserted_primary_key[0]
+            job_dir(job_id).mkdir(parents=True, exist_ok=True)
+            if staging is not None:
+                staging.replace(job_dir(job_id) / UPLOAD_NAME)
+    except BaseException:
+        if staging is not None:
+            staging.unlink(missing_ok=True)
+        raise
+
+    runner.wake()
+    return job_id
+
+
+async def get_job(job_id: int) -> Optional[Job]:
+    async with engine.connect() as conn:
+        row = (await conn.execute(select(Job).where(Job.JobID == job_id))).mappings().first()
+    return Job.model_construct(**row) if row else None
+
+
+async def list_jobs(status: Optional[str] = None, kind: Optional[str] = None, skip: int = 0, limit: int = 20) -> List[Job]:
+    statement = select(Job).order_by(Job.JobID.desc()).offset(skip).limit(limit)
+    if status:
+        statement = statement.where(Job.jbStatus == status)
+    if kind:
+        statement = statement.where(Job.jbKind == kind)
+    async with engine.connect() as conn:
+        rows = (await conn.execute(statement)).mappings().all()
+    return [Job.model_construct(**row) for row in rows]
+
+
+async def cancel_job(job_id: int) -> None:
+    """還沒開始的直接取消；執行中的只設旗標，由負責的程序在下一個輪詢週期 cancel"""
+    async with engine.begin() as conn:
+        await conn.execute(
+            update(Job).where(Job.JobID == job_id, Job.jbStatus == QUEUED)
+            .values(jbStatus=CANCELLED, jbCancelRequested=True, jbFinishedAt=utcnow())
+        )
+        await conn.execute(update(Job).where(Job.JobID == job_id, Job.jbStatus == RUNNING).values(jbCancelRequested=True))
+    runner.wake()
+
+
+async def delete_job(job_id: int) -> None:
+    """刪除已結束的工作與其檔案"""
+    async with engine.begin() as conn:
+        await conn.execute(Job.__table__.delete().where(Job.JobID == job_id, Job.jbStatus.not_in(ACTIVE_STATUSES)))
+    shutil.rmtree(job_dir(job_id), ignore_errors=True)
+
+
+async def fail_stale_jobs() -> int:
+    """執行中但超過 JOB_STALE_SECONDS 沒有心跳的工作 (負責的程序已中止) 標記為失敗"""
+    cutoff = utcnow() - timedelta(seconds=settings.job_stale_seconds)
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            update(Job).where(Job.jbStatus == RUNNING, Job.jbHeartbeat < cutoff)
+            .values(jbStatus=FAILED, jbError="執行工作的程序已中止 (心跳逾時)", jbFinishedAt=utcnow())
+        )
+    return result.rowcount
+
+
+# --- 執行 ---
+
+class JobRunner:
+    """在目前的 event loop 中輪詢並執行工作，同時最多 concurrency 個"""
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Dict[int, JobContext] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._wake = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def wake(self) -> None:
+        """有新工作或取消請求時不必等到下一個輪詢週期"""
+        if self._loop_task is not None:
+            self._wake.set()
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """停止取新工作並中斷執行中的工作 (記為失敗，可重新送出)"""
+        if self._loop_task is None:
+            return
+        self._stopping = True
+        self._loop_task.cancel()
+        await asyncio.gather(self._loop_task, return_exceptions=True)
+
+        # 強制 cancel 可能停在 SQL 執行到一半，連線上的交易沒有正常結束 (SQLite 會一直鎖住)，所以先等檢查點
+        for ctx in self._running.values():
+            ctx.cancel_requested = True
+        tasks = list(self._tasks.values())
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=SHUTDOWN_GRACE_SECONDS)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._loop_task = None
+
+    async def _loop(self) -> None:
+        last_stale_check = float("-inf")
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if loop.time() - last_stale_check >= settings.job_stale_seconds:
+                    if await fail_stale_jobs():
+                        logger.warning("marked stale running jobs as failed")
+                    last_stale_check = loop.time()
+                await self._heartbeat()
+                await self._claim()
+            except OperationalError as e:
+                # SQLite 正被長交易 (例如重建) 鎖住：下一輪再寫
+                logger.debug("job bookkeeping skipped: %s", e)
+            except Exception:
+                logger.exception("job runner iteration failed")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.job_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _heartbeat(self) -> None:
+        """寫回進度與心跳，並讀回取消旗標"""
+        if not self._running:
+            return
+        now = utcnow()
+        async with engine.begin() as conn:
+            for job_id, ctx in list(self._running.items()):
+                await conn.execute(
+                    update(Job).where(Job.JobID == job_id, Job.jbStatus == RUNNING)
+                    .values(jbHeartbeat=now, jbDone=ctx.done, jbTotal=ctx.total, jbUnit=ctx.unit)
+                )
+            result = await conn.execute(
+                select(Job.JobID).where(Job.JobID.in_(list(self._running)), Job.jbCancelRequested.is_(True))
+            )
+            cancelled = result.scalars().all()
+        for job_id in cancelled:
+            ctx = self._running.get(job_id)
+            if ctx is not None:
+                ctx.cancel_requested = True
+
+    async def _claim(self) -> None:
+        slots = self.concurrency - len(self._tasks)
+        if slots <= 0:
+            return
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                select(Job.JobID).where(Job.jbStatus == QUEUED).order_by(Job.JobID).limit(slots)
+            )
+            candidates = result.scalars().all()
+
+        for job_id in candidates:
+            now = utcnow()
+            async with engine.begin() as conn:
+                claimed = await conn.execute(
+                    update(Job).where(Job.JobID == job_id, Job.jbStatus == QUEUED)
+                    .values(jbStatus=RUNNING, jbWorker=self.worker_id, jbStartedAt=now, jbHeartbeat=now)
+                )
+                if claimed.rowcount != 1:
+                    continue  # 已被其他程序取走或已取消
+                kind, params = (await conn.execute(select(Job.jbKind, Job.jbParams).where(Job.JobID == job_id))).one()
+
+            ctx = JobContext(job_id, params)
+            self._running[job_id] = ctx
+            task = asyncio.create_task(self._execute(ctx, kind), name=f"job-{job_id}")
+            self._tasks[job_id] = task
+            task.add_done_callback(lambda _, job_id=job_id: self._forget(job_id))
+
+    def _forget(self, job_id: int) -> None:
+        self._running.pop(job_id, None)
+        self._tasks.pop(job_id, None)
+        self.wake()  # 空出名額，立即取下一個
+
+    async def _execute(self, ctx: JobContext, kind: str) -> None:
+        result, error = None, None
+        try:
+            handler = JOB_KINDS.get(kind)
+            if handler is None:
+                raise ValueError(f"未知的工作種類 {kind}")
+            result = await handler(ctx)
+            status = SUCCEEDED
+        except JobCancelled:
+            # 已 commit 的部分 (例如批次匯入已完成的 chunk) 不會回滾
+            status = FAILED if self._stopping else CANCELLED
+            error = "程序關閉時中斷" if self._stopping else None
+        except asyncio.CancelledError:
+            status, error = FAILED, "程序關閉時中斷"
+        except Exception as e:
+            if asyncio.current_task().cancelling():
+                # 關閉時被中斷的連線在 rollback 時可能另外丟出例外，一樣視為中斷
+                status, error = FAILED, "程序關閉時中斷"
+            else:
+                logger.exception("job %s (%s) failed", ctx.job_id, kind)
+                status, error = FAILED, f"{e.__class__.__name__}: {e}"
+
+        values = dict(
+            jbStatus=status, jbResult=result, jbError=error, jbFinishedAt=utcnow(),
+            jbDone=ctx.done, jbTotal=ctx.total, jbUnit=ctx.unit,
+            jbResultFile=ctx.result_file if status == SUCCEEDED else None,
+        )
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(update(Job).where(Job.JobID == ctx.job_id).values(**values))
+        except Exception:
+            # 寫不回去的工作會停在 running，之後由心跳逾時的檢查標記為失敗
+            logger.exception("failed to record job %s as %s", ctx.job_id, status)
+
+
+# API 程序內的 runner (JOB_CONCURRENCY=0 時不啟動，submit 只排入工作)
+runner = JobRunner(settings.job_concurrency)
+
+
+async def _main(concurrency: int):
+    worker = JobRunner(concurrency)
+    try:
+        await ensure_schema()
+        await worker.start()
+        print(f"🧵 Job worker {worker.worker_id} running {concurrency} job(s) at a time. Ctrl+C to stop.")
+        await asyncio.Event().wait()
+    finally:
+        await worker.stop()
+        await engine.dispose()
+
+
+# 使用方式: python -m app.core.jobs [--concurrency 2]
+# 與 API 分開執行背景工作 (API 可設 JOB_CONCURRENCY=0 只負責排入)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="執行背景工作的 worker")
+    parser.add_argument("--concurrency", type=int, default=max(settings.job_concurrency, 1))
+    try:
+        asyncio.run(_main(parser.parse_args().concurrency))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,136 @@
+# app/core/master_upsert.py
+# 主檔 (商品 / 員工 / 供應商 / 倉庫) 批次 upsert：逐行解析 -> 每 chunk 一個交易
+# 先以一次 IN 查詢取出現有資料比對，只有新增或內容有變的列才以 INSERT ... ON CONFLICT DO UPDATE 寫入，
+# 夜間同步大多數資料沒變，不會產生多餘的寫入、索引更新與快取失效
+from typing import AsyncIterator, Dict, List, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import EntityCache, product_cache, staff_cache, supplier_cache, warehouse_cache
+from app.core.changes import record_changes
+from app.core.database import dialect_insert, reset_sequence
+from app.core.search import index_rows
+from app.core.streaming import Record, iter_records, validation_message
+from app.schemas.bulk import BulkRowError, BulkUpsertChunkResult, BulkUpsertResult
+
+# 與搜尋索引使用相同的 entity 名稱；model / schema / 主鍵取自快取設定
+UPSERT_ENTITIES: Dict[str, EntityCache] = {
+    "product": product_cache,
+    "staff": staff_cache,
+    "supplier": supplier_cache,
+    "warehouse": warehouse_cache,
+}
+
+
+def _nullable_fields(schema: Type[BaseModel]) -> List[str]:
+    """預設值為 None 的欄位 (資料庫中可為 NULL)"""
+    return [name for name, field in schema.model_fields.items() if not field.is_required() and field.default is None]
+
+
+async def _upsert_chunk(
+    db: AsyncSession, entity: str, chunk_no: int, batch: List[Record], fmt: str
+) -> BulkUpsertChunkResult:
+    cache = UPSERT_ENTITIES[entity]
+    table, pk = cache.model.__table__, cache.pk
+    fields = list(cache.schema.model_fields)
+    # CSV 無法表示 NULL，空白的儲存格就是沒有值；不轉成 None 的話原本為 NULL 的列每次都會被當成有變動
+    blank_to_null = _nullable_fields(cache.schema) if fmt == "csv" else []
+    summary = BulkUpsertChunkResult(chunk=chunk_no)
+
+    # 1. 欄位驗證 (每列都必須帶主鍵)；同一 chunk 內重複的主鍵以最後一列為準
+    rows: Dict[int, Tuple[int, BaseModel]] = {}
+    for line_no, data, error in batch:
+        item = None
+        if error is None:
+            for field in blank_to_null:
+                if data.get(field) == "":
+                    data[field] = None
+            try:
+                item = cache.schema.model_validate(data)
+            except ValidationError as e:
+                error = validation_message(e)
+        if error:
+            summary.errors.append(BulkRowError(line=line_no, error=error))
+            continue
+        key = getattr(item, pk)
+        if key in rows:
+            summary.errors.append(BulkRowError(line=rows[key][0], error=f"主鍵重複 ({pk}={key})，以第 {line_no} 行為準"))
+        rows[key] = (line_no, item)
+
+    # 2. 一次 IN 查詢取出現有資料，分出新增 / 更新 / 未變動
+    if rows:
+        result = await db.exec(select(*(table.c[f] for f in fields)).where(table.c[pk].in_(rows.keys())))
+        existing = {row[pk]: dict(row) for row in result.mappings()}
+
+        changed: List[BaseModel] = []
+        created, updated = 0, 0
+        for key, (_, item) in rows.items():
+            values = item.model_dump()
+            if key not in existing:
+                created += 1
+            elif existing[key] != values:
+                updated += 1
+            else:
+                continue
+            changed.append(item)
+
+        # 3. 只寫入有變動的列 (依主鍵排序，併發交易以相同順序鎖定列)，同一交易更新搜尋索引
+        try:
+            if changed:
+                changed.sort(key=lambda item: getattr(item, pk))
+                stmt = dialect_insert(db, cache.model)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[pk],
+                    set_={f: stmt.excluded[f] for f in fields if f != pk},
+                )
+                await db.exec(stmt, params=[item.model_dump() for item in changed])
+                await index_rows(db, entity, changed)
+                keys = [getattr(item, pk) for item in changed]
+                record_changes(db, cache.model, "update", [k for k in keys if k in existing])
+                record_changes(db, cache.model, "create", [k for k in keys if k not in existing])
+                await db.commit()
+            summary.created, summary.updated = created, updated
+            summary.unchanged = len(rows) - created - updated
+        except SQLAlchemyError as e:
+            await db.rollback()
+            message = f"寫入失敗，整個區塊已回滾: {e.__class__.__name__}"
+            summary.errors.extend(BulkRowError(line=line_no, error=message) for line_no, _ in rows.values())
+        else:
+            # 更新過的資料才需要讓快取失效 (新增的本來就不在快取裡)
+            for key in existing.keys() & {getattr(item, pk) for item in changed}:
+                cache.invalidate(key)
+
+    summary.errors.sort(key=lambda e: e.line)
+    summary.rejected = len(summary.errors)
+    return summary
+
+
+async def upsert_master_rows(
+    db: AsyncSession, entity: str, chunks: AsyncIterator[bytes], fmt: str, chunk_size: int = 1000
+) -> BulkUpsertResult:
+    """邊解析邊寫入，每累積 chunk_size 列提交一次"""
+    result = BulkUpsertResult()
+    batch: List[Record] = []
+
+    async for record in iter_records(chunks, fmt):
+        batch.append(record)
+        if len(batch) >= chunk_size:
+            result.chunks.append(await _upsert_chunk(db, entity, len(result.chunks) + 1, batch, fmt))
+            batch = []
+    if batch:
+        result.chunks.append(await _upsert_chunk(db, entity, len(result.chunks) + 1, batch, fmt))
+
+    result.created = sum(c.created for c in result.chunks)
+    result.updated = sum(c.updated for c in result.chunks)
+    result.unchanged = sum(c.unchanged for c in result.chunks)
+    result.rejected = sum(c.rejected for c in result.chunks)
+
+    # 明確寫入了主鍵，PostgreSQL 的 sequence 要跟上，之後 POST 新增才不會撞號
+    if result.created:
+        cache = UPSERT_ENTITIES[entity]
+        await reset_sequence(db, cache.model.__tablename__, cache.pk)
+        await db.commit()
+    return result
@@ -0,0 +1,212 @@
+# app/core/metrics.py
+# 每個路由 (以路由樣板分組，例如 /api/v1/products/{product_id}) 的延遲分布、SQL 次數 / 時間、
+# 回傳列數、回應大小與連線池等待時間，以 Prometheus 文字格式輸出
+#
+# 請求期間的累計值放在 contextvar，SQLAlchemy 的 cursor 事件與連線池直接累加進去；
+# 全部在記憶體中以整數 / 浮點數相加，不做 I/O，可以在正式環境常駐開啟
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+# 延遲 (秒) 與每個請求 SQL 次數的 histogram 區間
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+UNMATCHED = "unmatched"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最後一格是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestMetrics:
+    """單一請求期間的累計值"""
+    __slots__ = ("queries", "db_time", "rows", "pool_wait")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.pool_wait = 0.0
+
+
+class RouteStats:
+    __slots__ = ("latency", "queries", "statuses", "db_time", "rows", "response_bytes", "pool_wait")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.statuses: Dict[int, int] = {}
+        self.db_time = 0.0
+        self.rows = 0
+        self.response_bytes = 0
+        self.pool_wait = 0.0
+
+    def record(self, status: int, elapsed: float, body_bytes: int, current: RequestMetrics) -> None:
+        self.latency.observe(elapsed)
+        self.queries.observe(current.queries)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.db_time += current.db_time
+        self.rows += current.rows
+        self.response_bytes += body_bytes
+        self.pool_wait += current.pool_wait
+
+
+# (method, 路由樣板) -> 統計；路由數量固定，不會無限成長
+route_stats: Dict[Tuple[str, str], RouteStats] = {}
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def record_pool_wait(elapsed: float) -> None:
+    """連線池取得連線後呼叫 (database.TimedQueuePool)，把等待時間算到目前的請求"""
+    current = _current.get()
+    if current is not None:
+        current.pool_wait += elapsed
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    current = _current.get()
+    if started is None or current is None:
+        return
+    current.queries += 1
+    current.db_time += time.perf_counter() - started
+    # async driver (aiosqlite / asyncpg) 的一般 cursor 執行後就把結果全部取回放在 _rows；
+    # 串流 (server-side cursor) 的匯出沒有這個欄位，列數不計入
+    rows = getattr(cursor, "_rows", None)
+    if rows is not None:
+        current.rows += len(rows)
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        # 被外層 middleware 直接回應 (例如 ETag 的 304) 時還沒經過路由比對，自己比對一次
+        app = scope.get("app")
+        for candidate in getattr(getattr(app, "router", None), "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", UNMATCHED) if route is not None else UNMATCHED
+
+
+class MetricsMiddleware:
+    """ASGI middleware：放在最外層，量測包含其他 middleware 在內的完整處理時間"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        current = RequestMetrics()
+        token = _current.set(current)
+        status, body_bytes = 500, 0
+        started = time.perf_counter()
+
+        async def send_with_metrics(message):
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            key = (scope["method"], route_template(scope))
+            stats = route_stats.get(key)
+            if stats is None:
+                stats = route_stats[key] = RouteStats()
+            stats.record(status, elapsed, body_bytes, current)
+
+
+# --- Prometheus 文字格式 ---
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def format_metric(name: str, kind: str, help_text: str, samples: Iterable[Tuple[str, Dict[str, object], float]]) -> List[str]:
+    """samples 為 (後綴, labels, 值)，後綴例如 histogram 的 _bucket / _sum / _count"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{suffix}{_labels(labels)} {_number(value)}" for suffix, labels, value in samples)
+    return lines
+
+
+def _histogram_samples(labels: Dict[str, object], histogram: Histogram):
+    cumulative = 0
+    for bound, count in zip((*histogram.buckets, float("inf")), histogram.counts):
+        cumulative += count
+        yield "_bucket", {**labels, "le": _number(float(bound))}, cumulative
+    yield "_sum", labels, histogram.sum
+    yield "_count", labels, histogram.count
+
+
+def render_route_metrics() -> List[str]:
+    items = sorted(route_stats.items())
+
+    def per_route(value_of):
+        return (("", {"method": m, "route": r}, value_of(s)) for (m, r), s in items)
+
+    lines: List[str] = []
+    lines += format_metric(
+        "wms_http_request_duration_seconds", "histogram", "Request latency by route template",
+        (sample for (m, r), s in items for sample in _histogram_samples({"method": m, "route": r}, s.latency)),
+    )
+    lines += format_metric(
+        "wms_http_requests_total", "counter", "Requests by route template and status code",
+        (("", {"method": m, "route": r, "status": code}, n) for (m, r), s in items for code, n in sorted(s.statuses.items())),
+    )
+    lines += format_metric(
+        "wms_db_queries_per_request", "histogram", "SQL statements executed per request",
+        (sample for (m, r), s in items for sample in _histogram_samples({"method": m, "route": r}, s.queries)),
+    )
+    lines += format_metric("wms_db_query_seconds_total", "counter", "Time spent executing SQL", per_route(lambda s: s.db_time))
+    lines += format_metric("wms_db_rows_total", "counter", "Rows returned by SQL statements", per_route(lambda s: s.rows))
+    lines += format_metric("wms_http_response_bytes_total", "counter", "Response body bytes", per_route(lambda s: s.response_bytes))
+    lines += format_metric(
+        "wms_db_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection", per_route(lambda s: s.pool_wait),
+    )
+    return lines
@@ -0,0 +1,91 @@
+# app/core/migrations.py
+# 啟動時的資料庫結構檢查：讀一次 alembic_version 與程式的 head 比對，相符就什麼都不做
+# (不再每次啟動都跑 create_all / 種子資料)；不相符時依 DB_AUTO_MIGRATE 自動升級或拒絕啟動
+#
+# import alembic 本身就要 0.1 秒以上，所以版本比對不經過 alembic：
+# head 直接讀 migrations/versions 的 revision / down_revision，只有真的要遷移時才載入 alembic
+import ast
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import inspect, text
+
+from app.core.config import settings
+from app.core.database import engine
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+ALEMBIC_INI = PROJECT_ROOT / "alembic.ini"
+VERSIONS_DIR = PROJECT_ROOT / "migrations" / "versions"
+
+_REVISION = re.compile(r"^revision\s*(?::[^=]+)?=\s*(.+)$", re.MULTILINE)
+_DOWN_REVISION = re.compile(r"^down_revision\s*(?::[^=]+)?=\s*(.+)$", re.MULTILINE)
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+@lru_cache(maxsize=1)
+def head_revision() -> Optional[str]:
+    """沒有被任何遷移當作 down_revision 的就是 head (與 alembic heads 相同)"""
+    revisions, parents = set(), set()
+    for path in VERSIONS_DIR.glob("*.py"):
+        source = path.read_text(encoding="utf-8")
+        revision, down = _REVISION.search(source), _DOWN_REVISION.search(source)
+        if revision is None:
+            continue
+        revisions.add(ast.literal_eval(revision.group(1).strip()))
+        down_revision = ast.literal_eval(down.group(1).strip()) if down else None
+        if isinstance(down_revision, str):
+            parents.add(down_revision)
+        elif down_revision:
+            parents.update(down_revision)
+
+    heads = revisions - parents
+    if len(heads) > 1:
+        raise SchemaOutOfDate(f"遷移有多個 head {sorted(heads)}，請先執行 `alembic merge heads`")
+    return next(iter(heads), None)
+
+
+def _current_revision(connection) -> Optional[str]:
+    if not inspect(connection).has_table("alembic_version"):
+        return None
+    return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def _upgrade(connection) -> None:
+    from alembic import command
+
+    # 導入 Alembic 前以 create_all 建立的資料庫沒有 alembic_version，
+    # 由 0001 只補上還沒有的資料表，之後的遷移照常執行
+    command.upgrade(alembic_config(connection), "head")
+
+
+async def ensure_schema(auto_migrate: Optional[bool] = None) -> Optional[str]:
+    """確認資料庫結構為最新版，回傳目前的版本"""
+    if auto_migrate is None:
+        auto_migrate = settings.db_auto_migrate
+    head = head_revision()
+    async with engine.connect() as conn:
+        current = await conn.run_sync(_current_revision)
+    if current == head:
+        return current
+
+    if not auto_migrate:
+        raise SchemaOutOfDate(f"資料庫結構版本 {current} 與程式 {head} 不符，請先執行 `alembic upgrade head`")
+    print(f"🛠️ Migrating database schema {current} -> {head}")
+    async with engine.begin() as conn:
+        await conn.run_sync(_upgrade)
+    return head
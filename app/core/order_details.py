@@ -0,0 +1,94 @@
+# app/core/order_details.py
+# 單據明細的差異更新：以 ProductID 比對新舊明細，只對有變動的列下 UPDATE / INSERT / DELETE
+# (取代「全部刪除再重新寫入」，減少列異動、索引維護與鎖定時間)
+from typing import Iterable, List, Sequence, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import and_, bindparam, delete
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.changes import record_changes
+
+
+def check_unique_products(lines: Iterable) -> None:
+    # 明細主鍵是 (單號, ProductID)，同一張單的商品不可重複
+    seen = set()
+    for line in lines:
+        if line.ProductID in seen:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"同一張單據的商品不可重複: {line.ProductID}",
+            )
+        seen.add(line.ProductID)
+
+
+def merge_detail_patch(
+    existing: Sequence, patches: Sequence, quantity_field: str, line_cls: Type[BaseModel]
+) -> List[BaseModel]:
+    """把 PATCH 的變動列套到現有明細上，回傳完整的新明細 (remove=True 表示刪除該商品)"""
+    check_unique_products(patches)
+    lines = {
+        d.ProductID: {"ProductID": d.ProductID, quantity_field: getattr(d, quantity_field), "WarehouseID": d.WarehouseID}
+        for d in existing
+    }
+    for p in patches:
+        if p.remove:
+            lines.pop(p.ProductID, None)
+            continue
+        changes = p.model_dump(exclude={"remove"}, exclude_none=True)
+        if p.ProductID in lines:
+            lines[p.ProductID].update(changes)
+        elif getattr(p, quantity_field) is None or p.WarehouseID is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"新增明細需同時提供 {quantity_field} 與 WarehouseID: {p.ProductID}",
+            )
+        else:
+            lines[p.ProductID] = changes
+    return [line_cls(**line) for line in lines.values()]
+
+
+async def sync_details(
+    db: AsyncSession,
+    detail_model: Type[SQLModel],
+    parent_key: str,
+    parent_id: int,
+    quantity_field: str,
+    existing: Sequence,
+    incoming: Sequence,
+) -> None:
+    """只寫入明細的差異；不 commit (庫存增減由呼叫端在寫入前計算、檢查)"""
+    check_unique_products(incoming)
+    table = detail_model.__table__
+    old = {d.ProductID: (getattr(d, quantity_field), d.WarehouseID) for d in existing}
+    new = {d.ProductID: (getattr(d, quantity_field), d.WarehouseID) for d in incoming}
+
+    removed = [pid for pid in old if pid not in new]
+    added = [pid for pid in new if pid not in old]
+    changed = [pid for pid in new if pid in old and new[pid] != old[pid]]
+
+    if removed:
+        await db.exec(
+            delete(table).where(table.c[parent_key] == parent_id, table.c.ProductID.in_(removed))
+        )
+    if changed:
+        statement = (
+            table.update()
+            .where(and_(table.c[parent_key] == bindparam("b_parent"), table.c.ProductID == bindparam("b_product")))
+            .values({quantity_field: bindparam("b_quantity"), "WarehouseID": bindparam("b_warehouse")})
+        )
+        await db.exec(statement, params=[
+            {"b_parent": parent_id, "b_product": pid, "b_quantity": new[pid][0], "b_warehouse": new[pid][1]}
+            for pid in changed
+        ])
+    if added:
+        await db.exec(table.insert(), params=[
+            {parent_key: parent_id, "ProductID": pid, quantity_field: new[pid][0], "WarehouseID": new[pid][1]}
+            for pid in added
+        ])
+
+    # 主單欄位沒變、只改明細時 ORM 看不到，異動事件要手動記錄
+    if removed or added or changed:
+        record_changes(db, detail_model, "update", [parent_id])
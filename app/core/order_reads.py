@@ -0,0 +1,128 @@
+# app/core/order_reads.py
+# 單據讀取的快速路徑：不建立 ORM 物件、不經 response_model 驗證
+# 一次 JOIN 查詢取回「主單分頁 + 明細」，直接組成與 InboundOrderRead / RequisitionRead
+# 相同結構的 dict，主檔節點由快取補上，最後用 orjson 輸出
+from typing import Callable, Dict, List
+
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Select, select, union_all
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import product_cache, staff_cache, supplier_cache, warehouse_cache
+from app.models.inbound_order import InboundOrder, InboundDetail, InboundDetailArchive
+from app.models.requisition import Requisition, ReqDetail, ReqDetailArchive
+
+
+def inbound_headers(model=InboundOrder) -> Select:
+    """進貨主單欄位 (model 可換成封存表)；呼叫端再加上篩選、排序與分頁"""
+    return select(model.ioDate, model.SupplierID, model.StaffID, model.InboundID)
+
+
+def requisition_headers(model=Requisition) -> Select:
+    """領料主單欄位 (model 可換成封存表)；呼叫端再加上篩選、排序與分頁"""
+    return select(model.reDate, model.reReason, model.StaffID, model.ReqID)
+
+
+def with_archive(page: Callable[[type], Select], hot, archive, date_key: str, key: str, skip: int, limit: int) -> Select:
+    """同時查 hot 表與封存表的一頁主單：page(model) 回傳加上篩選與排序的主單查詢，
+    兩邊各自只取前 skip + limit 筆 (走各自的日期索引)，合併後再依 (日期, 單號) 倒序分頁"""
+    branches = []
+    for model in (hot, archive):
+        statement = page(model)
+        if limit > 0:
+            statement = statement.limit(skip + limit)
+        # 包成子查詢，合併的各段才能有自己的 ORDER BY / LIMIT
+        branches.append(select(statement.subquery()))
+    merged = union_all(*branches).subquery()
+    statement = select(merged).order_by(merged.c[date_key].desc(), merged.c[key].desc())
+    if limit > 0:
+        statement = statement.offset(skip).limit(limit)
+    return statement
+
+
+async def _attach_nodes(db: AsyncSession, orders: List[dict]) -> None:
+    details = [d for o in orders for d in o["details"]]
+    products = await product_cache.get_many(db, {d["ProductID"] for d in details})
+    warehouses = await warehouse_cache.get_many(db, {d["WarehouseID"] for d in details})
+    for d in details:
+        d["product"] = products.get(d["ProductID"])
+        d["warehouse"] = warehouses.get(d["WarehouseID"])
+
+    if orders and "SupplierID" in orders[0]:
+        suppliers = await supplier_cache.get_many(db, {o["SupplierID"] for o in orders})
+        for o in orders:
+            o["supplier"] = suppliers.get(o["SupplierID"])
+
+    staff = await staff_cache.get_many(db, {o["StaffID"] for o in orders})
+    for o in orders:
+        o["staff"] = staff.get(o["StaffID"])
+
+
+async def _load(db: AsyncSession, headers: Select, detail, parent_key: str, date_key: str, quantity_field: str, archive_detail=None) -> List[dict]:
+    page = headers.subquery()
+    parent_id = page.c[parent_key]
+    statement = (
+        select(page, detail.ProductID, getattr(detail, quantity_field), detail.WarehouseID)
+        .outerjoin(detail, getattr(detail, parent_key) == parent_id)
+        .order_by(page.c[date_key].desc(), parent_id.desc(), detail.ProductID)
+    )
+    result = await db.exec(statement)
+
+    # 以欄位位置取值，主單欄位在前、明細三欄在後
+    header_keys = list(page.c.keys())
+    n = len(header_keys)
+    id_index = header_keys.index(parent_key)
+    orders: Dict[int, dict] = {}
+    for row in result.all():
+        order_id = row[id_index]
+        order = orders.get(order_id)
+        if order is None:
+            order = orders[order_id] = dict(zip(header_keys, row[:n]))
+            order["details"] = []
+        product_id, quantity, warehouse_id = row[n:]
+        if product_id is not None:
+            order["details"].append({
+                "ProductID": product_id,
+                quantity_field: quantity,
+                "WarehouseID": warehouse_id,
+                parent_key: order_id,
+            })
+
+    # 封存的單據明細在封存表：hot 表找不到明細的單據再到封存表補一次
+    missing = [order_id for order_id, order in orders.items() if not order["details"]] if archive_detail is not None else []
+    if missing:
+        archive_parent = getattr(archive_detail, parent_key)
+        result = await db.exec(
+            select(archive_parent, archive_detail.ProductID, getattr(archive_detail, quantity_field), archive_detail.WarehouseID)
+            .where(archive_parent.in_(missing))
+            .order_by(archive_parent, archive_detail.ProductID)
+        )
+        for order_id, product_id, quantity, warehouse_id in result.all():
+            orders[order_id]["details"].append({
+                "ProductID": product_id,
+                quantity_field: quantity,
+                "WarehouseID": warehouse_id,
+                parent_key: order_id,
+            })
+
+    items = list(orders.values())
+    await _attach_nodes(db, items)
+    return items
+
+
+async def load_inbound_orders(db: AsyncSession, headers: Select, archived: bool = False) -> List[dict]:
+    """headers 為 inbound_headers() 加上條件後的查詢，回傳依 (ioDate, InboundID) 倒序；
+    archived=True 表示 headers 可能含封存的主單 (with_archive 或直接查封存表)"""
+    archive_detail = InboundDetailArchive if archived else None
+    return await _load(db, headers, InboundDetail, "InboundID", "ioDate", "idQuantity", archive_detail)
+
+
+async def load_requisitions(db: AsyncSession, headers: Select, archived: bool = False) -> List[dict]:
+    """headers 為 requisition_headers() 加上條件後的查詢，回傳依 (reDate, ReqID) 倒序；archived 同上"""
+    archive_detail = ReqDetailArchive if archived else None
+    return await _load(db, headers, ReqDetail, "ReqID", "reDate", "rdQuantity", archive_detail)
+
+
+def json_response(content, status_code: int = 200) -> ORJSONResponse:
+    # 直接回傳 Response，FastAPI 不會再用 response_model 驗證一次
+    return ORJSONResponse(content, status_code=status_code)
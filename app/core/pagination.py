@@ -0,0 +1,37 @@
+# app/core/pagination.py
+# Keyset (cursor) 分頁：以排序鍵定位下一頁，不必像 OFFSET 一樣掃過前面所有資料
+import base64
+import json
+from datetime import date
+from typing import Any, Callable, Sequence
+
+from fastapi import HTTPException, Response, status
+
+# 下一頁游標放在回應標頭，列表回應本身維持原本的 JSON 陣列
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, date) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Callable) -> list:
+    """還原游標並依 types 轉型 (例如 date.fromisoformat, int)，格式錯誤回 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return [t(v) for t, v in zip(types, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="無效的分頁游標")
+
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int, key: Callable) -> None:
+    # 取滿一整頁才可能還有下一頁
+    if limit > 0 and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
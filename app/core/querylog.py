@@ -0,0 +1,212 @@
+# app/core/querylog.py
+# 慢查詢紀錄與 N+1 偵測：cursor 事件把每個 SQL 正規化成 fingerprint (去掉參數值、IN 清單長度)，
+# - 執行時間超過 SLOW_QUERY_MS 的語句連同參數記錄下來，EXPLAIN 等到查看時才在執行該語句的 engine (主庫或副本) 執行，
+#   不拖慢原本的請求；參數只保留在記憶體中供 EXPLAIN 使用，輸出時預設只顯示型別 (QUERY_LOG_PARAMETERS)
+# - 同一個請求內同一個 fingerprint 執行超過 N_PLUS_ONE_THRESHOLD 次就標記為疑似 N+1
+# 兩者都會寫一行 JSON 到 logger "wms.sql"，摘要由 /api/v1/_internal/queries 查看
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger("wms.sql")
+
+# 記憶體中保留的筆數上限
+SLOW_LOG_SIZE = 100
+REPEATED_LOG_SIZE = 100
+MAX_FINGERPRINTS = 1000
+MAX_PARAMETERS_REPR = 500
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBERED = re.compile(r"\$\d+")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> Tuple[str, str]:
+    """回傳 (fingerprint, 正規化後的語句)；IN 清單不論長短都視為同一種查詢"""
+    normalized = _STRING.sub("?", statement)
+    normalized = _NUMBERED.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _LIST.sub("(...)", normalized)
+    normalized = _LISTS.sub("(...)", normalized)
+    normalized = _SPACE.sub(" ", normalized).strip()
+    return hashlib.md5(normalized.encode()).hexdigest()[:12], normalized
+
+
+def format_parameters(parameters) -> str:
+    """輸出用的參數：預設把值換成型別名稱，QUERY_LOG_PARAMETERS=true 時才輸出實際的值"""
+    if settings.query_log_parameters:
+        return repr(parameters)[:MAX_PARAMETERS_REPR]
+    if isinstance(parameters, dict):
+        redacted = "{" + ", ".join(f"{key!r}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    elif isinstance(parameters, (list, tuple)):
+        redacted = "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    else:
+        redacted = type(parameters).__name__
+    return redacted[:MAX_PARAMETERS_REPR]
+
+
+class SlowQueryEntry:
+    __slots__ = ("fingerprint", "statement", "parameters", "duration", "route", "at", "plan", "engine")
+
+    def __init__(self, fp: str, statement: str, parameters, duration: float, route: Optional[str], engine: AsyncEngine):
+        self.fingerprint = fp
+        self.statement = statement
+        self.parameters = parameters
+        self.duration = duration
+        self.route = route
+        self.at = datetime.now(timezone.utc)
+        self.plan: Optional[List[str]] = None
+        # 執行這個語句的 engine (主庫或副本)，EXPLAIN 在同一個資料庫執行
+        self.engine = engine
+
+
+class QueryLog:
+    def __init__(self):
+        # fingerprint -> [正規化語句, 次數, 總時間, 最長時間]
+        self.stats: Dict[str, list] = {}
+        self.slow: Deque[SlowQueryEntry] = deque(maxlen=SLOW_LOG_SIZE)
+        self.repeated: Deque[dict] = deque(maxlen=REPEATED_LOG_SIZE)
+
+    def clear(self) -> None:
+        self.stats.clear()
+        self.slow.clear()
+        self.repeated.clear()
+
+
+query_log = QueryLog()
+
+
+class RequestQueries:
+    """單一請求內各 fingerprint 的執行次數"""
+    __slots__ = ("scope", "counts")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.counts: Counter = Counter()
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+def _log(event_name: str, **fields) -> None:
+    logger.warning(json.dumps({"event": event_name, **fields}, ensure_ascii=False, default=str))
+
+
+def _current_route() -> Optional[str]:
+    current = _current.get()
+    if current is None:
+        return None
+    return f"{current.scope['method']} {route_template(current.scope)}"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._querylog_started = time.perf_counter()
+
+
+def _after_cursor_execute(engine, statement, parameters, context, executemany):
+    started = getattr(context, "_querylog_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    fp, normalized = fingerprint(statement)
+
+    stats = query_log.stats.get(fp)
+    if stats is None and len(query_log.stats) < MAX_FINGERPRINTS:
+        stats = query_log.stats[fp] = [normalized, 0, 0.0, 0.0]
+    if stats is not None:
+        stats[1] += 1
+        stats[2] += elapsed
+        stats[3] = max(stats[3], elapsed)
+
+    current = _current.get()
+    if current is not None:
+        current.counts[fp] += 1
+
+    if elapsed * 1000 >= settings.slow_query_ms:
+        # executemany 只保留第一組參數 (EXPLAIN 用)
+        params = parameters[0] if executemany and parameters else parameters
+        entry = SlowQueryEntry(fp, statement, params, elapsed, _current_route(), engine)
+        query_log.slow.append(entry)
+        _log(
+            "slow_query", fingerprint=fp, duration_ms=round(elapsed * 1000, 3), route=entry.route,
+            statement=normalized, parameters=format_parameters(params),
+        )
+
+
+def install_query_log(engine: AsyncEngine) -> None:
+    """在 engine 上註冊 cursor 事件 (database.py / replicas.py 建立 engine 後呼叫)"""
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _after_cursor_execute(engine, statement, parameters, context, executemany)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+class QueryLogMiddleware:
+    """ASGI middleware：請求結束時檢查是否有 fingerprint 重複執行過多次"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        current = RequestQueries(scope)
+        token = _current.set(current)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            threshold = settings.n_plus_one_threshold
+            for fp, count in current.counts.items():
+                if count > threshold:
+                    _flag_repeated(scope, fp, count)
+
+
+def _flag_repeated(scope, fp: str, count: int) -> None:
+    route = f"{scope['method']} {route_template(scope)}"
+    stats = query_log.stats.get(fp)
+    statement = stats[0] if stats else ""
+    query_log.repeated.append({
+        "fingerprint": fp, "statement": statement, "route": route, "count": count, "at": datetime.now(timezone.utc),
+    })
+    _log("n_plus_one", fingerprint=fp, route=route, count=count, statement=statement)
+
+
+async def explain(entry: SlowQueryEntry) -> List[str]:
+    """以記錄下來的參數在原本的 engine 執行 EXPLAIN (只針對 SELECT)；結果快取在 entry 上"""
+    if entry.plan is not None:
+        return entry.plan
+    if not entry.statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        entry.plan = []
+        return entry.plan
+
+    prefix = "EXPLAIN " if entry.engine.dialect.name == "postgresql" else "EXPLAIN QUERY PLAN "
+    try:
+        async with entry.engine.connect() as conn:
+            result = await conn.exec_driver_sql(prefix + entry.statement, entry.parameters or ())
+            # PostgreSQL 一列一行文字；SQLite 的最後一欄是說明
+            entry.plan = [str(row[-1]) for row in result.all()]
+    except Exception as e:  # 參數已無法重現 (例如暫存表) 時只回報錯誤，不影響其他項目
+        entry.plan = [f"EXPLAIN failed: {e.__class__.__name__}: {e}"]
+    return entry.plan
@@ -0,0 +1,191 @@
+# app/core/replicas.py
+# 讀取副本 (read replica)：GET 請求的查詢分散到副本，寫入一律在主庫 (路由規則見 database.RoutingSession)
+#
+# 副本落後的保護分兩層：
+#   1. 背景定期量測每個副本的複寫延遲，超過 REPLICA_MAX_LAG 秒或連不上就暫停使用
+#   2. 有 ETag 的路徑 (etag.py) 要求副本的資料表版本號不低於 ETag 的版本號，否則這個請求改讀主庫；
+#      不然用戶端會把舊內容配上新 ETag 快取起來，之後的輪詢一直拿到 304
+import asyncio
+import itertools
+import logging
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+from app.core.database import create_engine_from_settings
+from app.core.querylog import install_query_log
+from app.models.version import TableVersion
+
+logger = logging.getLogger("wms.replicas")
+
+BALANCE_MODES = ("round_robin", "least_connections")
+
+# PostgreSQL 副本的複寫延遲 (秒)：已重播完收到的 WAL 就視為 0，避免主庫閒置時「最後重播時間」越來越舊被誤判為落後
+PG_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+# 目前請求的回應依賴的資料表版本號 (ETag middleware 設定)
+_required_versions: ContextVar[Optional[Dict[str, int]]] = ContextVar("required_versions", default=None)
+
+
+def require_versions(versions: Dict[str, int]):
+    """ETag middleware 呼叫：這個請求只能讀版本號不低於 versions 的副本；回傳 token 供 reset_versions 還原"""
+    return _required_versions.set(versions)
+
+
+def reset_versions(token) -> None:
+    _required_versions.reset(token)
+
+
+class Replica:
+    def __init__(self, url: str, engine: AsyncEngine):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = engine
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        # 上次在副本上讀到的資料表版本號 (副本只會前進，可當作下限使用)
+        self.versions: Dict[str, int] = {}
+        self.reads = 0
+
+    @property
+    def checked_out(self) -> int:
+        pool = self.engine.pool
+        return pool.checkedout() if isinstance(pool, AsyncAdaptedQueuePool) else 0
+
+    def publish(self, versions: Dict[str, int]) -> None:
+        for table, version in versions.items():
+            if version > self.versions.get(table, 0):
+                self.versions[table] = version
+
+    def covers(self, required: Dict[str, int]) -> bool:
+        return all(self.versions.get(table, 0) >= version for table, version in required.items())
+
+    async def load_versions(self, tables: Optional[Iterable[str]] = None) -> None:
+        statement = select(TableVersion.tvTable, TableVersion.tvVersion)
+        if tables is not None:
+            statement = statement.where(TableVersion.tvTable.in_(list(tables)))
+        async with self.engine.connect() as conn:
+            self.publish(dict((await conn.execute(statement)).all()))
+
+    async def check(self, max_lag: float) -> None:
+        try:
+            async with self.engine.connect() as conn:
+                lag = await conn.scalar(PG_LAG_SQL) if conn.dialect.name == "postgresql" else 0
+            await self.load_versions()
+        except Exception as exc:
+            if self.healthy or self.error is None:
+                logger.warning("replica %s unavailable: %r", self.name, exc)
+            self.healthy, self.error = False, repr(exc)
+            return
+
+        self.lag, self.error = float(lag or 0), None
+        healthy = self.lag <= max_lag
+        if healthy != self.healthy:
+            logger.warning("replica %s %s (lag %.1fs)", self.name, "back in rotation" if healthy else "lagging", self.lag)
+        self.healthy = healthy
+
+
+class ReplicaSet:
+    """讀取副本的清單、挑選與健康檢查；未啟動 (CLI 工具) 或沒有可用副本時 choose() 回傳 None，也就是讀主庫"""
+
+    def __init__(self, replicas: List[Replica], balance: str, max_lag: float, check_interval: float):
+        if balance not in BALANCE_MODES:
+            raise ValueError(f"REPLICA_BALANCE must be one of {', '.join(BALANCE_MODES)}")
+        self.members = replicas
+        self.balance = balance
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        # 改讀主庫的次數：沒有可用副本 / 副本版本號落後於 ETag
+        self.unavailable_fallbacks = 0
+        self.stale_fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.members)
+
+    def _pick(self, candidates: List[Replica]) -> Replica:
+        if self.balance == "least_connections":
+            # 同樣少時輪流，避免全部擠到清單中的第一個
+            start = next(self._next)
+            ordered = candidates[start % len(candidates):] + candidates[:start % len(candidates)]
+            return min(ordered, key=lambda replica: replica.checked_out)
+        return candidates[next(self._next) % len(candidates)]
+
+    async def choose(self) -> Optional[Engine]:
+        """挑一個副本給這次的 session 讀取，回傳 sync engine (RoutingSession 的 bind)；None 代表讀主庫"""
+        if not self.enabled:
+            return None
+        candidates = [replica for replica in self.members if replica.healthy]
+        if not candidates:
+            self.unavailable_fallbacks += 1
+            return None
+
+        replica = self._pick(candidates)
+        required = _required_versions.get()
+        if required and not replica.covers(required):
+            # 背景檢查之後副本可能已經跟上，只重讀這幾張表的版本號再判斷一次
+            try:
+                await replica.load_versions(required)
+            except Exception as exc:
+                replica.healthy, replica.error = False, repr(exc)
+                self.unavailable_fallbacks += 1
+                return None
+            if not replica.covers(required):
+                self.stale_fallbacks += 1
+                return None
+
+        replica.reads += 1
+        return replica.engine.sync_engine
+
+    async def check(self) -> None:
+        await asyncio.gather(*(replica.check(self.max_lag) for replica in self.members))
+
+    async def start(self) -> None:
+        # 先檢查一次，第一個請求就能使用副本
+        if not self.enabled or self._task is not None:
+            return
+        await self.check()
+        self._task = asyncio.create_task(self._loop(), name="replica-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for replica in self.members:
+            replica.healthy = False
+            await replica.engine.dispose()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("replica check failed")
+
+
+def _create_replica(url: str) -> Replica:
+    # 副本使用一般的連線池：連線等待時間只統計主庫 (pool_wait_stats)
+    replica_engine = create_engine_from_settings(settings, url, poolclass=AsyncAdaptedQueuePool)
+    if settings.query_log_enabled:
+        install_query_log(replica_engine)
+    return Replica(url, replica_engine)
+
+
+replica_set = ReplicaSet(
+    [_create_replica(url) for url in settings.read_replica_urls],
+    settings.replica_balance,
+    settings.replica_max_lag,
+    settings.replica_check_interval,
+)
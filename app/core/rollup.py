@@ -0,0 +1,180 @@
+# app/core/rollup.py
+# 進貨 / 領料數量的時間序列彙總 (日 / 週 / 月)
+# 寫入明細時在同一交易內遞增，報表查詢只讀彙總列，不必加總全部明細
+import asyncio
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import Date, cast, delete, func, literal, select, tuple_, union_all
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.database import dialect_insert, engine, get_db_session_context
+from app.models.inbound_order import InboundDetail, InboundDetailArchive, InboundOrder, InboundOrderArchive
+from app.models.report import VolumeRollup
+from app.models.requisition import ReqDetail, ReqDetailArchive, Requisition, RequisitionArchive
+
+PERIODS = ("day", "week", "month")
+
+# 領料沒有供應商，彙總時 SupplierID 記為 0
+NO_SUPPLIER = 0
+
+# (日期, ProductID, WarehouseID, SupplierID) -> [進貨量, 領料量]
+VolumeDeltas = Dict[Tuple[date, int, int, int], List[int]]
+
+
+def period_start(period: str, day: date) -> date:
+    """期間起日：週以星期一為起日 (與 PostgreSQL date_trunc('week') 相同)"""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def add_inbound_volume(deltas: VolumeDeltas, order_date: date, supplier_id: int, details: Iterable, sign: int = 1) -> VolumeDeltas:
+    """把進貨明細累加進 deltas (刪除 / 修改前的舊明細用 sign=-1 沖銷)"""
+    for d in details:
+        key = (order_date, d.ProductID, d.WarehouseID, supplier_id)
+        deltas.setdefault(key, [0, 0])[0] += sign * d.idQuantity
+    return deltas
+
+
+def add_requisition_volume(deltas: VolumeDeltas, req_date: date, details: Iterable, sign: int = 1) -> VolumeDeltas:
+    """把領料明細累加進 deltas (刪除 / 修改前的舊明細用 sign=-1 沖銷)"""
+    for d in details:
+        key = (req_date, d.ProductID, d.WarehouseID, NO_SUPPLIER)
+        deltas.setdefault(key, [0, 0])[1] += sign * d.rdQuantity
+    return deltas
+
+
+async def apply_volume_deltas(db: AsyncSession, deltas: VolumeDeltas) -> None:
+    """在目前交易中更新日 / 週 / 月彙總 (不 commit，由呼叫端一起提交)；沖銷到進貨與領料都是 0 的列直接刪除"""
+    rows: Dict[tuple, List[int]] = {}
+    for (day, pid, wid, sid), (inbound, outbound) in deltas.items():
+        if inbound == 0 and outbound == 0:
+            continue
+        for period in PERIODS:
+            acc = rows.setdefault((period, period_start(period, day), pid, wid, sid), [0, 0])
+            acc[0] += inbound
+            acc[1] += outbound
+
+    # 依主鍵排序，讓併發交易以相同順序鎖定列，避免死結
+    params = [
+        {
+            "vrPeriod": period, "vrStart": start, "ProductID": pid, "WarehouseID": wid,
+            "SupplierID": sid, "vrInbound": inbound, "vrOutbound": outbound,
+        }
+        for (period, start, pid, wid, sid), (inbound, outbound) in sorted(rows.items())
+        if inbound or outbound
+    ]
+    if not params:
+        return
+
+    stmt = dialect_insert(db, VolumeRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["vrPeriod", "vrStart", "ProductID", "WarehouseID", "SupplierID"],
+        set_={
+            "vrInbound": VolumeRollup.vrInbound + stmt.excluded.vrInbound,
+            "vrOutbound": VolumeRollup.vrOutbound + stmt.excluded.vrOutbound,
+        },
+    )
+    await db.exec(stmt, params=params)
+
+    # 只有沖銷 (修改 / 刪除單據) 才可能歸零；不留空的列，單據都刪除後商品 / 倉庫不會被外鍵擋住
+    emptied = [
+        (p["vrPeriod"], p["vrStart"], p["ProductID"], p["WarehouseID"], p["SupplierID"])
+        for p in params
+        if p["vrInbound"] < 0 or p["vrOutbound"] < 0
+    ]
+    if emptied:
+        key = tuple_(
+            VolumeRollup.vrPeriod, VolumeRollup.vrStart, VolumeRollup.ProductID,
+            VolumeRollup.WarehouseID, VolumeRollup.SupplierID,
+        )
+        await db.exec(
+            delete(VolumeRollup).where(key.in_(emptied), VolumeRollup.vrInbound == 0, VolumeRollup.vrOutbound == 0)
+        )
+
+
+def _period_expr(dialect: str, period: str, column):
+    # 各資料庫取期間起日的寫法不同
+    if dialect == "postgresql":
+        if period == "day":
+            return cast(column, Date)
+        return cast(func.date_trunc(period, column), Date)
+    if period == "week":
+        # 'weekday 0' 先跳到當週星期日 (當天是星期日則不動)，再退 6 天就是星期一
+        return func.date(column, "weekday 0", "-6 days")
+    if period == "month":
+        return func.date(column, "start of month")
+    return func.date(column)
+
+
+async def rebuild_volume_rollups(db: AsyncSession) -> int:
+    """由進貨 / 領料歷史 (含封存表) 重新計算全部彙總 (backfill)，回傳彙總列數"""
+    movements = union_all(
+        *(
+            select(
+                order.ioDate.label("day"),
+                detail.ProductID.label("ProductID"),
+                detail.WarehouseID.label("WarehouseID"),
+                order.SupplierID.label("SupplierID"),
+                detail.idQuantity.label("inbound"),
+                literal(0).label("outbound"),
+            ).join_from(detail, order, detail.InboundID == order.InboundID)
+            for order, detail in ((InboundOrder, InboundDetail), (InboundOrderArchive, InboundDetailArchive))
+        ),
+        *(
+            select(
+                order.reDate,
+                detail.ProductID,
+                detail.WarehouseID,
+                literal(NO_SUPPLIER),
+                literal(0),
+                detail.rdQuantity,
+            ).join_from(detail, order, detail.ReqID == order.ReqID)
+            for order, detail in ((Requisition, ReqDetail), (RequisitionArchive, ReqDetailArchive))
+        ),
+    ).subquery()
+
+    dialect = db.get_bind().dialect.name
+    await db.exec(delete(VolumeRollup))
+    for period in PERIODS:
+        start = _period_expr(dialect, period, movements.c.day)
+        totals = select(
+            literal(period),
+            start,
+            movements.c.ProductID,
+            movements.c.WarehouseID,
+            movements.c.SupplierID,
+            func.sum(movements.c.inbound),
+            func.sum(movements.c.outbound),
+        ).group_by(start, movements.c.ProductID, movements.c.WarehouseID, movements.c.SupplierID)
+
+        await db.exec(
+            VolumeRollup.__table__.insert().from_select(
+                ["vrPeriod", "vrStart", "ProductID", "WarehouseID", "SupplierID", "vrInbound", "vrOutbound"],
+                totals,
+            )
+        )
+    await db.commit()
+
+    result = await db.exec(select(func.count()).select_from(VolumeRollup))
+    return result.one()[0]
+
+
+async def is_rollup_empty(db: AsyncSession) -> bool:
+    result = await db.exec(select(VolumeRollup.vrStart).limit(1))
+    return result.first() is None
+
+
+async def _main():
+    async with get_db_session_context() as db:
+        count = await rebuild_volume_rollups(db)
+    await engine.dispose()
+    print(f"📊 Volume rollups rebuilt: {count} rows.")
+
+
+# 使用方式: python -m app.core.rollup
+if __name__ == "__main__":
+    asyncio.run(_main())
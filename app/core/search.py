@@ -0,0 +1,197 @@
+# app/core/search.py
+# 主檔搜尋：自建 n-gram 反向索引 (SearchGram table)
+# LIKE '%q%' 無法使用索引，資料量一大就是全表掃描；
+# 這裡把名稱等欄位拆成單字 + 雙字 gram 存進索引表，查詢時只讀取 q 的 gram 對應的列，
+# 同時適用 PostgreSQL 與 SQLite，中文不需要分詞器
+#
+# gram 全部命中只代表「可能」包含 q (例如 q=「abca」的 gram 在「abc ca」也都找得到)，
+# 所以縮小範圍後再以 lower(欄位) LIKE '%lower(q)%' 複查：英文不分大小寫，其餘 (含全形 / 半形) 需完全相同。
+# gram 與複查使用同一種正規化 (只轉小寫)，索引找得到的候選不會在複查時被濾掉
+import asyncio
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from fastapi import Response
+from sqlalchemy import and_, delete, desc, func, literal, or_, select
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.database import engine, get_db_session_context
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.models.product import Product
+from app.models.search import SearchGram
+from app.models.staff import Staff
+from app.models.supplier import Supplier
+from app.models.warehouse import Warehouse
+
+# 各主檔可搜尋的欄位與權重 (名稱欄位命中排在前面)；欄位與原本 LIKE 搜尋的相同
+SEARCH_ENTITIES = {
+    "product": (Product, "ProductID", {"prName": 3, "prCategory": 1}),
+    "staff": (Staff, "StaffID", {"stName": 3, "stDept": 1}),
+    "supplier": (Supplier, "SupplierID", {"suName": 3}),
+    "warehouse": (Warehouse, "WarehouseID", {"waName": 3, "waLocation": 1}),
+}
+
+REBUILD_BATCH_SIZE = 1000
+
+_SPACES = re.compile(r"\s+")
+
+
+def _tokens(text: str) -> List[str]:
+    # 英文轉小寫 (與複查的 lower() 一致)，再以空白切開
+    text = text.lower()
+    return [t for t in _SPACES.split(text) if t]
+
+
+def text_grams(text: str) -> Set[str]:
+    """索引用：每個 token 的所有單字與相鄰雙字"""
+    grams = set()
+    for token in _tokens(text):
+        grams.update(token)
+        grams.update(token[i:i + 2] for i in range(len(token) - 1))
+    return grams
+
+
+def query_grams(q: str) -> Set[str]:
+    """查詢用：單一字元的 token 查單字，其餘只查雙字 (較有鑑別度)"""
+    grams = set()
+    for token in _tokens(q):
+        if len(token) == 1:
+            grams.add(token)
+        else:
+            grams.update(token[i:i + 2] for i in range(len(token) - 1))
+    return grams
+
+
+def _row_grams(row: SQLModel, fields: Dict[str, int]) -> Dict[str, int]:
+    weights: Dict[str, int] = {}
+    for field, weight in fields.items():
+        value = getattr(row, field)
+        if not value:
+            continue
+        for gram in text_grams(value):
+            weights[gram] = max(weights.get(gram, 0), weight)
+    return weights
+
+
+async def index_rows(db: AsyncSession, entity: str, rows: Sequence[SQLModel]) -> None:
+    """新增 / 更新主檔時同步索引 (同一交易，不 commit)"""
+    _, pk, fields = SEARCH_ENTITIES[entity]
+    if not rows:
+        return
+    await remove_rows(db, entity, [getattr(r, pk) for r in rows])
+    params = [
+        {"sgEntity": entity, "sgGram": gram, "RefID": getattr(row, pk), "sgWeight": weight}
+        for row in rows
+        for gram, weight in _row_grams(row, fields).items()
+    ]
+    if params:
+        await db.exec(SearchGram.__table__.insert(), params=params)
+
+
+async def remove_rows(db: AsyncSession, entity: str, ids: Iterable[int]) -> None:
+    ids = list(ids)
+    if ids:
+        await db.exec(
+            delete(SearchGram).where(SearchGram.sgEntity == entity, SearchGram.RefID.in_(ids))
+        )
+
+
+async def search_ids(
+    db: AsyncSession, entity: str, q: str, skip: int = 0, limit: int = 10, after: Optional[Tuple[int, int]] = None
+) -> List[Tuple[int, int]]:
+    """回傳符合 q 的 (主鍵, 相關度)，依相關度 (命中 gram 的權重總和) 排序；所有 gram 都要命中，
+    且至少一個欄位 (不分大小寫) 包含 q。after 為上一頁最後一筆的 (相關度, 主鍵)，從它之後開始 (忽略 skip)"""
+    model, pk, fields = SEARCH_ENTITIES[entity]
+    key = getattr(model, pk)
+    matches = or_(*(func.lower(getattr(model, field)).contains(q.lower()) for field in fields))
+    grams = query_grams(q)
+    if not grams:
+        # q 只有空白：沒有 gram 可以縮小範圍，直接以 LIKE 比對 (相關度一律為 0)
+        score = literal(0)
+        statement = select(key, score.label("score")).where(matches).order_by(key)
+        if after:
+            statement = statement.where(key > after[1])
+    else:
+        score = func.sum(SearchGram.sgWeight)
+        statement = (
+            select(SearchGram.RefID, score.label("score"))
+            .join(model, key == SearchGram.RefID)
+            .where(SearchGram.sgEntity == entity, SearchGram.sgGram.in_(grams), matches)
+            .group_by(SearchGram.RefID)
+            .having(func.count() == len(grams))
+            .order_by(desc("score"), SearchGram.RefID)
+        )
+        if after:
+            after_score, after_id = after
+            statement = statement.having(or_(score < after_score, and_(score == after_score, SearchGram.RefID > after_id)))
+    if limit > 0:
+        if not after:
+            statement = statement.offset(skip)
+        statement = statement.limit(limit)
+
+    result = await db.exec(statement)
+    return [(ref_id, score) for ref_id, score in result.all()]
+
+
+async def search_rows(
+    db: AsyncSession, entity: str, q: str, skip: int = 0, limit: int = 10, after: Optional[Tuple[int, int]] = None
+) -> List[Tuple[SQLModel, int]]:
+    """search_ids + 一次 IN 查詢取回資料，保持相關度順序；回傳 (資料, 相關度)"""
+    model, pk, _ = SEARCH_ENTITIES[entity]
+    hits = await search_ids(db, entity, q, skip, limit, after)
+    if not hits:
+        return []
+    result = await db.exec(select(model).where(getattr(model, pk).in_([i for i, _ in hits])))
+    rows = {getattr(r, pk): r for r in result.scalars().all()}
+    return [(rows[i], score) for i, score in hits if i in rows]
+
+
+async def search_page(
+    db: AsyncSession, response: Response, entity: str, q: str, skip: int, limit: int, after: Optional[str]
+) -> List[SQLModel]:
+    """列表端點的搜尋模式：與一般列表相同以 X-Next-Cursor 標頭提供下一頁游標 (相關度, 主鍵)"""
+    _, pk, _ = SEARCH_ENTITIES[entity]
+    cursor = tuple(decode_cursor(after, int, int)) if after else None
+    hits = await search_rows(db, entity, q, skip, limit, cursor)
+    set_next_cursor(response, hits, limit, lambda hit: (hit[1], getattr(hit[0], pk)))
+    return [row for row, _ in hits]
+
+
+async def rebuild_search_index(db: AsyncSession, entities: Iterable[str] = SEARCH_ENTITIES) -> int:
+    """由主檔重建索引，回傳索引筆數"""
+    for entity in entities:
+        model, pk, _ = SEARCH_ENTITIES[entity]
+        await db.exec(delete(SearchGram).where(SearchGram.sgEntity == entity))
+
+        last_id = None
+        while True:
+            statement = select(model).order_by(getattr(model, pk)).limit(REBUILD_BATCH_SIZE)
+            if last_id is not None:
+                statement = statement.where(getattr(model, pk) > last_id)
+            rows = (await db.exec(statement)).scalars().all()
+            if not rows:
+                break
+            await index_rows(db, entity, rows)
+            last_id = getattr(rows[-1], pk)
+        await db.commit()
+
+    result = await db.exec(select(func.count()).select_from(SearchGram))
+    return result.one()[0]
+
+
+async def is_index_empty(db: AsyncSession) -> bool:
+    result = await db.exec(select(SearchGram.RefID).limit(1))
+    return result.first() is None
+
+
+async def _main():
+    async with get_db_session_context() as db:
+        count = await rebuild_search_index(db)
+    await engine.dispose()
+    print(f"🔎 Search index rebuilt: {count} grams.")
+
+
+# 使用方式: python -m app.core.search
+if __name__ == "__main__":
+    asyncio.run(_main())
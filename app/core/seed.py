@@ -1,5 +1,6 @@
+import asyncio
 from datetime import date
-from sqlmodel import select, text
+from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.product import Product
 from app.models.staff import Staff
@@ -7,6 +8,11 @@ from app.models.supplier import Supplier
 from app.models.inbound_order import InboundDetail, InboundOrder
 from app.models.warehouse import Warehouse
 from app.models.requisition import Requisition, ReqDetail
+from app.core.database import engine, get_db_session_context, reset_sequence
+from app.core.inventory import rebuild_stock_balances
+from app.core.migrations import ensure_schema
+from app.core.rollup import is_rollup_empty, rebuild_volume_rollups
+from app.core.search import is_index_empty, rebuild_search_index
 
 # --- Seed Staff ---
 INITIAL_STAFF = [
@@ -57,7 +63,19 @@ INITIAL_REQUISITIONS = [
     }
 ]
 
+# 種子資料明確指定主鍵的資料表
+SEQUENCES = [
+    ("staff", "StaffID"),
+    ("supplier", "SupplierID"),
+    ("product", "ProductID"),
+    ("warehouse", "WarehouseID"),
+    ("inboundorder", "InboundID"),
+    ("requisition", "ReqID"),
+]
+
 async def create_initial_data(db: AsyncSession):
+    seeded_orders = False
+
     result = await db.exec(select(Staff))
     first_staff = result.first()
     
@@ -109,6 +127,7 @@ async def create_initial_data(db: AsyncSession):
                 db.add(detail)
         
         await db.commit()
+        seeded_orders = True
 
     result = await db.exec(select(Requisition))
     if not result.first():
@@ -128,29 +147,38 @@ async def create_initial_data(db: AsyncSession):
                 db.add(detail)
         
         await db.commit()
+        seeded_orders = True
 
-    try:
-        # 1. 重置 Staff
-        await db.exec(text("SELECT setval(pg_get_serial_sequence('staff', 'StaffID'), (SELECT MAX(\"StaffID\") FROM staff));"))
-        
-        # 2. 重置 Supplier
-        await db.exec(text("SELECT setval(pg_get_serial_sequence('supplier', 'SupplierID'), (SELECT MAX(\"SupplierID\") FROM supplier));"))
-        
-        # 3. 重置 Product
-        await db.exec(text("SELECT setval(pg_get_serial_sequence('product', 'ProductID'), (SELECT MAX(\"ProductID\") FROM product));"))
+    # 種子單據是直接寫入明細的，需重算一次庫存餘額
+    if seeded_orders:
+        print("🌱 Rebuilding stock balances...")
+        await rebuild_stock_balances(db)
 
-        # 4. 重置 Warehouse
-        await db.exec(text("SELECT setval(pg_get_serial_sequence('warehouse', 'WarehouseID'), (SELECT MAX(\"WarehouseID\") FROM warehouse));"))
+    # 數量彙總是空的 (新資料庫或剛升級) 就由歷史單據建立一次
+    if await is_rollup_empty(db):
+        print("🌱 Building volume rollups...")
+        await rebuild_volume_rollups(db)
 
-        # 5. 重置 InboundOrder
-        await db.exec(text("SELECT setval(pg_get_serial_sequence('inboundorder', 'InboundID'), (SELECT MAX(\"InboundID\") FROM inboundorder));"))
-        
-        # 6. 重置 Requisition
-        await db.exec(text("SELECT setval(pg_get_serial_sequence('requisition', 'ReqID'), (SELECT MAX(\"ReqID\") FROM requisition));"))
+    # 搜尋索引是空的 (新資料庫或剛升級) 就由主檔建立一次
+    if await is_index_empty(db):
+        print("🌱 Building search index...")
+        await rebuild_search_index(db)
 
-        # 🔥 關鍵修正：必須 Commit 才會生效！
-        await db.commit() 
-        print("🔄 PostgreSQL Sequences have been reset.")
-        
-    except Exception as e:
-        print(f"ℹ️ Sequence reset skipped: {e}")
\ No newline at end of file
+    # 種子資料明確指定了主鍵，PostgreSQL 的 sequence 要跟上 (SQLite 不需要，直接略過)
+    for table, pk in SEQUENCES:
+        await reset_sequence(db, table, pk)
+    await db.commit()
+
+
+async def _main():
+    # 先確認資料庫結構為最新版 (新資料庫會建立全部資料表)
+    await ensure_schema(auto_migrate=True)
+    async with get_db_session_context() as db:
+        await create_initial_data(db)
+    await engine.dispose()
+    print("✅ Seed data ready.")
+
+
+# 使用方式: python -m app.core.seed (只在需要示範資料時手動執行，伺服器啟動時不再自動寫入)
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,70 @@
+# app/core/streaming.py
+# 逐行解析串流上傳的 CSV / NDJSON，不把整個 body 讀進記憶體
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+from pydantic import ValidationError
+
+# (行號, 解析後的資料, 錯誤訊息)
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+def detect_format(content_type: Optional[str], fmt: Optional[str] = None) -> str:
+    """明確指定的 format 優先，否則由 Content-Type 判斷，預設 NDJSON"""
+    if fmt:
+        return fmt
+    if content_type and "csv" in content_type:
+        return "csv"
+    return "ndjson"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Record]:
+    """NDJSON 每行一個 JSON 物件；CSV 第一行為欄位名稱 (不支援欄位內換行)"""
+    header = None
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            if len(values) != len(header):
+                yield line_no, None, f"預期 {len(header)} 個欄位，實際 {len(values)} 個"
+                continue
+            yield line_no, dict(zip(header, values)), None
+        else:
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"JSON 格式錯誤: {e}"
+                continue
+            if not isinstance(data, dict):
+                yield line_no, None, "每行必須是一個 JSON 物件"
+                continue
+            yield line_no, data, None
+
+
+def validation_message(e: ValidationError) -> str:
+    """把 pydantic 驗證錯誤濃縮成一行 (最多前三個欄位)"""
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()[:3]
+    )
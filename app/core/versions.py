@@ -0,0 +1,158 @@
+# app/core/versions.py
+# 資料表版本號：交易 commit 之後，另外用一個自動 commit 的短交易把寫入過的資料表版本 +1，
+# ETag 由版本號組成，版本沒變就代表回應內容沒變
+#
+# 不在業務交易中遞增：版本列是所有寫入共用的計數器，在交易內 upsert 會鎖住版本列直到 commit，
+# 同一張表的寫入全部排成一列。commit 之後才遞增的代價是 ETag 偏保守：commit 與遞增之間讀到的
+# 新內容會配上舊版本號，遞增之後 ETag 改變、用戶端重新下載一次；反過來「舊內容配新 ETag」不會發生
+# (副本也是先複寫資料、再複寫版本號)。遞增失敗時記下資料表，下一次遞增時一起補上
+#
+# 遞增要另外向連線池取一條連線：持有程序內的鎖 (例如 SQLite 扣庫存的分段鎖) 時 commit，
+# 要用 defer_version_bump 延到放鎖之後，否則等鎖的請求佔滿連線池時會互相等待
+#
+# 寫入來源不限於 API：ORM flush、Core 的 insert / update / delete (批次匯入、重建)
+# 都由 session 事件統一記錄，不需要在每個端點手動呼叫
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from itertools import chain
+from typing import AsyncIterator, Dict, Iterable, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.version import TableVersion
+
+logger = logging.getLogger("wms.versions")
+
+_TOUCHED = "touched_tables"
+_COMMITTED = "committed_tables"
+_DEFERRED = "deferred_tables"
+
+# 遞增失敗 (例如連線中斷) 的資料表，下一次遞增時一起補上
+_unbumped: Set[str] = set()
+
+
+class TableVersions:
+    """程序內的版本號快取：本程序 commit 後立即更新，其他程序的寫入最多 max_age 秒後讀到"""
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._versions: Dict[str, int] = {}
+        self._loaded_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def publish(self, versions: Dict[str, int]) -> None:
+        for table, version in versions.items():
+            if version > self._versions.get(table, 0):
+                self._versions[table] = version
+
+    async def get(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        if time.monotonic() - self._loaded_at >= self.max_age:
+            await self.refresh()
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    async def refresh(self) -> None:
+        # 同時過期的請求只讓一個去讀資料庫
+        loaded_at = self._loaded_at
+        async with self._lock:
+            if self._loaded_at != loaded_at:
+                return
+            async with engine.connect() as conn:
+                result = await conn.execute(select(TableVersion.tvTable, TableVersion.tvVersion))
+                self.publish(dict(result.all()))
+            self._loaded_at = time.monotonic()
+
+
+table_versions = TableVersions(settings.etag_max_age)
+
+
+def _touch(session: Session, table) -> None:
+    if table is not None and table.name != TableVersion.__tablename__:
+        session.info.setdefault(_TOUCHED, set()).add(table.name)
+
+
+def mark_changed(session, *tables: str) -> None:
+    """繞過 session 直接以 driver 寫入 (例如 COPY) 時，手動標記有變動的資料表"""
+    session.info.setdefault(_TOUCHED, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        _touch(session, getattr(type(obj), "__table__", None))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_dml(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        _touch(state.session, getattr(state.statement, "table", None))
+
+
+@event.listens_for(Session, "after_commit")
+def _collect_versions(session):
+    # commit 內的最後一次 flush 在 after_commit 之前，此時已記錄完整；連線還沒歸還，等交易結束再遞增
+    tables = session.info.pop(_TOUCHED, None)
+    if tables:
+        session.info.setdefault(_COMMITTED, set()).update(tables)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _bump_versions(session, transaction):
+    # 最外層交易結束時 session 的連線已經歸還連線池，另外取一條連線遞增，不會同時佔用兩條
+    if transaction.parent is not None:
+        return
+    tables = session.info.pop(_COMMITTED, None)
+    if not tables:
+        return
+    deferred = session.info.get(_DEFERRED)
+    if deferred is not None:
+        deferred.update(tables)
+    else:
+        bump_versions(tables)
+
+
+@asynccontextmanager
+async def defer_version_bump(db: AsyncSession) -> AsyncIterator[None]:
+    """區塊內 commit 的版本號遞增延到離開區塊時才執行 (區塊結束前要放掉持有的鎖)"""
+    info = db.sync_session.info
+    info[_DEFERRED] = set()
+    try:
+        yield
+    finally:
+        tables = info.pop(_DEFERRED)
+        if tables:
+            await db.run_sync(lambda _: bump_versions(tables))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_versions(session):
+    session.info.pop(_TOUCHED, None)
+
+
+def bump_versions(tables: Iterable[str]) -> None:
+    """以自動 commit 的短交易遞增資料表版本號並更新本程序的快取 (在 session 的 greenlet 內同步執行)"""
+    tables = set(tables) | _unbumped
+    _unbumped.clear()
+    sync_engine = engine.sync_engine
+    insert = postgresql.insert if sync_engine.dialect.name == "postgresql" else sqlite.insert
+    # 依表名排序，併發的遞增以相同順序鎖定版本列
+    stmt = insert(TableVersion).values([{"tvTable": table, "tvVersion": 1} for table in sorted(tables)])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["tvTable"],
+        set_={"tvVersion": TableVersion.tvVersion + 1},
+    ).returning(TableVersion.tvTable, TableVersion.tvVersion)
+    try:
+        with sync_engine.begin() as conn:
+            versions = dict(conn.execute(stmt).all())
+    except Exception:
+        # 資料已經 commit，不能讓請求因此失敗；ETag 暫時沿用舊值，下一次遞增時補上
+        logger.exception("failed to bump table versions for %s", ", ".join(sorted(tables)))
+        _unbumped.update(tables)
+        return
+    table_versions.publish(versions)
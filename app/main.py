@@ -1,36 +1,80 @@
+import time
+_import_started = time.perf_counter()  # 量測啟動時間 (含 import 所有模組)
+
 from fastapi import FastAPI, Request
-from app.api import products, requisitions, staffs, suppliers, inboundorders, warehouse
+from app.api import products, requisitions, staffs, suppliers, inboundorders, warehouse, inventory, reports, internal, metrics, jobs, changes
 
 from contextlib import asynccontextmanager
-from app.core.database import init_db, get_db_session_context
-from app.core.seed import create_initial_data
+from app.core.database import engine
+from app.core.migrations import ensure_schema
+from app.core.jobs import runner as job_runner
+from app.core.changes import change_feed
+from app.core.replicas import replica_set
+from app.core.config import settings
+from app.core.etag import ETagMiddleware
+from app.core.metrics import MetricsMiddleware
+from app.core.querylog import QueryLogMiddleware
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 啟動時建立資料庫 Tables (SQLModel)
-    await init_db()
-
-    is_need_seed = True
-    if is_need_seed:
-        from app.core.database import engine
-        from sqlmodel.ext.asyncio.session import AsyncSession
-        from sqlalchemy.orm import sessionmaker
-        
-        async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-        
-        async with async_session() as session:
-            await create_initial_data(session)
+    # 資料庫結構已是最新版時只查一次 alembic_version；建表 / 遷移交給 Alembic，種子資料改用 python -m app.core.seed
+    started = time.perf_counter()
+    try:
+        revision = await ensure_schema()
+    except Exception:
+        # 結構不符而拒絕啟動時也要釋放連線 (aiosqlite 的連線執行緒會讓程序無法結束)
+        await engine.dispose()
+        raise
+    app.state.startup_seconds = {"import": started - _import_started, "lifespan": time.perf_counter() - started}
+    print(
+        f"⏱️ Startup in {sum(app.state.startup_seconds.values()) * 1000:.0f} ms "
+        f"(import {app.state.startup_seconds['import'] * 1000:.0f} ms, "
+        f"schema check {app.state.startup_seconds['lifespan'] * 1000:.0f} ms, revision {revision})"
+    )
+
+    # 背景工作在同一個 event loop 執行 (JOB_CONCURRENCY=0 時改由 python -m app.core.jobs 執行)
+    if settings.job_concurrency > 0:
+        await job_runner.start()
+    # 異動事件的分送 (PostgreSQL 另外佔用一條連線 LISTEN)
+    if settings.change_feed_enabled:
+        await change_feed.start()
+        change_feed.close_streams_on_exit()
+    # 讀取副本的延遲檢查 (未設定 READ_REPLICA_URLS 時不做任何事)
+    await replica_set.start()
 
     yield
 
+    # 關閉時中斷執行中的背景工作，再釋放連線池
+    await job_runner.stop()
+    await change_feed.stop()
+    await replica_set.stop()
+    await engine.dispose()
+
 app = FastAPI(title="物流倉儲管理系統 API", version="1.0.0", lifespan=lifespan)
 
+# 輪詢用的 GET 依資料表版本號回 ETag，沒變動時回 304
+app.add_middleware(ETagMiddleware)
+
+# 請求結束時檢查同一 SQL 是否重複執行過多次 (N+1)
+if settings.query_log_enabled:
+    app.add_middleware(QueryLogMiddleware)
+
+# 最後加入的 middleware 在最外層，量測時間才包含 ETag 的處理與 304
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(products.router, prefix="/api/v1")
 app.include_router(suppliers.router, prefix="/api/v1")
 app.include_router(staffs.router, prefix="/api/v1")
 app.include_router(inboundorders.router, prefix="/api/v1")
 app.include_router(warehouse.router, prefix="/api/v1")
 app.include_router(requisitions.router, prefix="/api/v1")
+app.include_router(inventory.router, prefix="/api/v1")
+app.include_router(reports.router, prefix="/api/v1")
+app.include_router(internal.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
+app.include_router(changes.router, prefix="/api/v1")
+app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
@@ -2,5 +2,11 @@ from .staff import Staff
 from .supplier import Supplier
 from .product import Product
 from .warehouse import Warehouse
-from .inbound_order import InboundOrder, InboundDetail
-from .requisition import Requisition, ReqDetail
\ No newline at end of file
+from .inbound_order import InboundOrder, InboundDetail, InboundOrderArchive, InboundDetailArchive
+from .requisition import Requisition, ReqDetail, RequisitionArchive, ReqDetailArchive
+from .inventory import StockBalance
+from .search import SearchGram
+from .report import VolumeRollup
+from .version import TableVersion
+from .job import Job
+from .change import ChangeEvent
\ No newline at end of file
@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel, Index
+
+# --- 異動事件 Table (change feed) ---
+# 單據 / 主檔的新增、修改、刪除與資料同一個交易寫入一列，ceSeq 由 sequence 取號 (commit 順序可能不同，讀取端處理空缺)，
+# 用戶端以最後收到的 ceSeq 接續
+class ChangeEvent(SQLModel, table=True):
+    ceSeq: Optional[int] = Field(default=None, primary_key=True)
+    # product / staff / supplier / warehouse / inbound / requisition
+    ceEntity: str = Field(max_length=20)
+    # create / update / delete (明細異動記為主單的 update)
+    ceOp: str = Field(max_length=8)
+    ceKey: int
+    ceAt: datetime
+
+    # 依時間清除過期事件；SQLite 加上 AUTOINCREMENT，事件全部清除後序號也不會從頭開始
+    __table_args__ = (
+        Index("ix_changeevent_at", "ceAt"),
+        {"sqlite_autoincrement": True},
+    )
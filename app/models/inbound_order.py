@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import date
-from sqlmodel import Field, SQLModel, Relationship
+from sqlmodel import Field, SQLModel, Relationship, Index
 from app.schemas.inboundorder import InboundOrderBase, InboundDetailBase
 
 from app.models.product import Product
@@ -14,7 +14,7 @@ class InboundDetail(InboundDetailBase, SQLModel, table=True):
     ProductID: int = Field(primary_key=True, foreign_key="product.ProductID")
     
     # Warehouse (雖是 FK，但這裡只需存 ID，若需關聯物件可再加 Relationship)
-    WarehouseID: int = Field(foreign_key="warehouse.WarehouseID")
+    WarehouseID: int = Field(foreign_key="warehouse.WarehouseID", index=True)
 
     # 反向關聯回主單 (Optional, 方便操作)
     order: "InboundOrder" = Relationship(back_populates="details")
@@ -22,13 +22,16 @@ class InboundDetail(InboundDetailBase, SQLModel, table=True):
     product: Optional[Product] = Relationship() 
     warehouse: Optional[Warehouse] = Relationship()
 
+    # 主鍵以 InboundID 開頭，依商品查明細 (與刪除商品時的外鍵檢查) 需要另外的索引
+    __table_args__ = (Index("ix_inbounddetail_product", "ProductID"),)
+
 # --- 進貨主單 Table ---
 class InboundOrder(InboundOrderBase, SQLModel, table=True):
     InboundID: Optional[int] = Field(default=None, primary_key=True)
     
     # 關聯欄位
-    SupplierID: int = Field(foreign_key="supplier.SupplierID")
-    StaffID: int = Field(foreign_key="staff.StaffID")
+    SupplierID: int = Field(foreign_key="supplier.SupplierID", index=True)
+    StaffID: int = Field(foreign_key="staff.StaffID", index=True)
 
     # 建立與明細的關聯 (One-to-Many)
     details: List[InboundDetail] = Relationship(
@@ -37,4 +40,23 @@ class InboundOrder(InboundOrderBase, SQLModel, table=True):
     )
 
     supplier: Optional[Supplier] = Relationship()
-    staff: Optional[Staff] = Relationship()
\ No newline at end of file
+    staff: Optional[Staff] = Relationship()
+
+    # 列表 / 匯出依日期篩選並以 (日期, 單號) 排序與分頁
+    # SQLite 使用 AUTOINCREMENT：單號不會重用 (已封存的單號仍被佔用)
+    __table_args__ = (Index("ix_inboundorder_date_id", "ioDate", "InboundID"), {"sqlite_autoincrement": True})
+
+# --- 封存表 (app/core/archive.py 分批把舊單搬過來)：欄位與 hot 表相同，沿用原本的單號 ---
+class InboundDetailArchive(InboundDetailBase, SQLModel, table=True):
+    InboundID: int = Field(primary_key=True, foreign_key="inboundorderarchive.InboundID")
+    ProductID: int = Field(primary_key=True, foreign_key="product.ProductID")
+    WarehouseID: int = Field(foreign_key="warehouse.WarehouseID", index=True)
+
+    __table_args__ = (Index("ix_inbounddetailarchive_product", "ProductID"),)
+
+class InboundOrderArchive(InboundOrderBase, SQLModel, table=True):
+    InboundID: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    SupplierID: int = Field(foreign_key="supplier.SupplierID", index=True)
+    StaffID: int = Field(foreign_key="staff.StaffID", index=True)
+
+    __table_args__ = (Index("ix_inboundorderarchive_date_id", "ioDate", "InboundID"),)
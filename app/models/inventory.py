@@ -0,0 +1,10 @@
+from sqlmodel import Field, SQLModel
+from app.schemas.inventory import StockBalanceBase
+
+# --- 庫存餘額 Table ---
+# 由進貨單 / 領料單的寫入在同一個交易中增減，查詢庫存時不必再加總所有明細；餘額歸零的列會刪除 (查詢時視為 0)
+class StockBalance(StockBalanceBase, SQLModel, table=True):
+    # 複合主鍵: ProductID + WarehouseID
+    ProductID: int = Field(primary_key=True, foreign_key="product.ProductID")
+    # WarehouseID 另建索引，供「查某倉庫全部庫存」使用
+    WarehouseID: int = Field(primary_key=True, foreign_key="warehouse.WarehouseID", index=True)
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import JSON, Column
+from sqlmodel import Field, SQLModel, Index
+
+# --- 背景工作 Table ---
+# 批次匯入 / 匯出 / 重建等長時間作業：API 只建立一列 (queued)，由 JobRunner 取出執行，
+# 進度、結果摘要與心跳都寫回這裡，重新啟動或另開 worker 程序也能接續
+class Job(SQLModel, table=True):
+    JobID: Optional[int] = Field(default=None, primary_key=True)
+    jbKind: str = Field(max_length=40)
+    # queued / running / succeeded / failed / cancelled
+    jbStatus: str = Field(default="queued", max_length=16)
+    jbParams: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+
+    # 進度：已處理量 / 總量 (總量未知時為 None)，單位依工作種類 (bytes / rows / tables)
+    jbDone: int = 0
+    jbTotal: Optional[int] = None
+    jbUnit: Optional[str] = Field(default=None, max_length=16)
+
+    jbResult: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    # 可下載的結果檔 (相對於 JOB_DIR)
+    jbResultFile: Optional[str] = None
+    jbError: Optional[str] = None
+    jbCancelRequested: bool = False
+
+    # 執行中的工作由哪個程序負責；超過 JOB_STALE_SECONDS 沒有心跳視為中斷
+    jbWorker: Optional[str] = Field(default=None, max_length=64)
+    jbHeartbeat: Optional[datetime] = None
+    jbCreatedAt: datetime
+    jbStartedAt: Optional[datetime] = None
+    jbFinishedAt: Optional[datetime] = None
+
+    # 依狀態取出待執行 / 執行中的工作
+    __table_args__ = (
+        Index("ix_job_status_id", "jbStatus", "JobID"),
+    )
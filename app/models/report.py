@@ -0,0 +1,22 @@
+from datetime import date
+from sqlmodel import Field, SQLModel, Index
+from app.schemas.report import VolumeRollupBase
+
+# --- 進貨 / 領料數量彙總 Table ---
+# 寫入明細時在同一個交易中遞增 (日 / 週 / 月各一列)，報表只讀這裡，不必加總全部明細；沖銷到全為 0 的列會刪除
+class VolumeRollup(VolumeRollupBase, SQLModel, table=True):
+    # 複合主鍵: 期間 + 起日 + 商品 + 倉庫 + 供應商
+    # 主鍵順序讓「某期間、某日期區間」的報表查詢可以直接走主鍵索引
+    vrPeriod: str = Field(primary_key=True, max_length=8)
+    vrStart: date = Field(primary_key=True)
+    ProductID: int = Field(primary_key=True, foreign_key="product.ProductID")
+    WarehouseID: int = Field(primary_key=True, foreign_key="warehouse.WarehouseID")
+    # 領料列的 SupplierID 為 0，因此不設外鍵
+    SupplierID: int = Field(default=0, primary_key=True)
+
+    # 指定商品 / 倉庫的報表 (也用於刪除主檔時的外鍵檢查)
+    __table_args__ = (
+        Index("ix_volumerollup_product", "ProductID", "vrPeriod", "vrStart"),
+        Index("ix_volumerollup_warehouse", "WarehouseID", "vrPeriod", "vrStart"),
+    )
+
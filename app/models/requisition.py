@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import date
-from sqlmodel import Field, SQLModel, Relationship
+from sqlmodel import Field, SQLModel, Relationship, Index
 from app.schemas.requisition import RequisitionBase, ReqDetailBase
 
 from app.models.product import Product
@@ -14,7 +14,7 @@ class ReqDetail(ReqDetailBase, SQLModel, table=True):
     ProductID: int = Field(primary_key=True, foreign_key="product.ProductID")
     
     # 倉庫 FK
-    WarehouseID: int = Field(foreign_key="warehouse.WarehouseID")
+    WarehouseID: int = Field(foreign_key="warehouse.WarehouseID", index=True)
 
     # 反向關聯回主單
     requisition: "Requisition" = Relationship(back_populates="details")
@@ -22,13 +22,16 @@ class ReqDetail(ReqDetailBase, SQLModel, table=True):
     product: Optional[Product] = Relationship()
     warehouse: Optional[Warehouse] = Relationship()
 
+    # 主鍵以 ReqID 開頭，依商品查明細 (與刪除商品時的外鍵檢查) 需要另外的索引
+    __table_args__ = (Index("ix_reqdetail_product", "ProductID"),)
+
 # --- 領料主單 Table ---
 class Requisition(RequisitionBase, SQLModel, table=True):
     # PK
     ReqID: Optional[int] = Field(default=None, primary_key=True)
     
     # 員工 FK
-    StaffID: int = Field(foreign_key="staff.StaffID")
+    StaffID: int = Field(foreign_key="staff.StaffID", index=True)
 
     # 建立與明細的關聯 (One-to-Many)
     # cascade="all, delete-orphan": 刪除主單時，明細自動刪除
@@ -37,4 +40,22 @@ class Requisition(RequisitionBase, SQLModel, table=True):
         sa_relationship_kwargs={"cascade": "all, delete-orphan"} 
     )
 
-    staff: Optional[Staff] = Relationship()
\ No newline at end of file
+    staff: Optional[Staff] = Relationship()
+
+    # 列表 / 匯出依日期篩選並以 (日期, 單號) 排序與分頁
+    # SQLite 使用 AUTOINCREMENT：單號不會重用 (已封存的單號仍被佔用)
+    __table_args__ = (Index("ix_requisition_date_id", "reDate", "ReqID"), {"sqlite_autoincrement": True})
+
+# --- 封存表 (app/core/archive.py 分批把舊單搬過來)：欄位與 hot 表相同，沿用原本的單號 ---
+class ReqDetailArchive(ReqDetailBase, SQLModel, table=True):
+    ReqID: int = Field(primary_key=True, foreign_key="requisitionarchive.ReqID")
+    ProductID: int = Field(primary_key=True, foreign_key="product.ProductID")
+    WarehouseID: int = Field(foreign_key="warehouse.WarehouseID", index=True)
+
+    __table_args__ = (Index("ix_reqdetailarchive_product", "ProductID"),)
+
+class RequisitionArchive(RequisitionBase, SQLModel, table=True):
+    ReqID: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    StaffID: int = Field(foreign_key="staff.StaffID", index=True)
+
+    __table_args__ = (Index("ix_requisitionarchive_date_id", "reDate", "ReqID"),)
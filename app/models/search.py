@@ -0,0 +1,14 @@
+from sqlmodel import Field, SQLModel, Index
+
+# --- 全文搜尋用的 n-gram 反向索引 Table ---
+# 每筆主檔拆成單字 + 雙字 (bigram)，中文名稱沒有空白分詞也能做部分比對
+# 主鍵 (sgEntity, sgGram, RefID) 讓「某個 gram 出現在哪些資料」是索引範圍查詢
+class SearchGram(SQLModel, table=True):
+    sgEntity: str = Field(primary_key=True, max_length=20)
+    sgGram: str = Field(primary_key=True, max_length=8)
+    RefID: int = Field(primary_key=True)
+    # 出現在名稱欄位的 gram 權重較高，用來排序搜尋結果
+    sgWeight: int = 1
+
+    # 更新 / 刪除主檔時依 (sgEntity, RefID) 清掉舊的 gram
+    __table_args__ = (Index("ix_searchgram_entity_ref", "sgEntity", "RefID"),)
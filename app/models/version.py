@@ -0,0 +1,7 @@
+from sqlmodel import Field, SQLModel
+
+# --- 資料表版本號 Table ---
+# 每次 commit 時把有寫入的資料表版本 +1，GET 回應的 ETag 由相關資料表的版本組成
+class TableVersion(SQLModel, table=True):
+    tvTable: str = Field(primary_key=True, max_length=40)
+    tvVersion: int = 0
@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import Generic, List, TypeVar
+
+T = TypeVar("T")
+
+# --- 批次依 ID 查詢 (batch-get) ---
+class BatchGetRequest(BaseModel):
+    # 一次最多 1000 個 ID，避免單一 IN 查詢過大
+    ids: List[int] = Field(..., max_length=1000)
+
+class BatchGetResult(BaseModel, Generic[T]):
+    items: List[T]       # 依請求順序排列 (重複的 ID 只回一次)
+    missing: List[int]   # 查無資料的 ID
@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import List
+
+# --- 批次匯入結果 ---
+class BulkRowError(BaseModel):
+    line: int
+    error: str
+
+class BulkChunkResult(BaseModel):
+    chunk: int
+    accepted: int = 0
+    rejected: int = 0
+    errors: List[BulkRowError] = []
+
+class BulkImportResult(BaseModel):
+    accepted: int = 0
+    rejected: int = 0
+    chunks: List[BulkChunkResult] = []
+
+
+# --- 主檔批次 upsert 結果 ---
+class BulkUpsertChunkResult(BaseModel):
+    chunk: int
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    errors: List[BulkRowError] = []
+
+class BulkUpsertResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    chunks: List[BulkUpsertChunkResult] = []
@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+# --- 異動事件 (change feed) ---
+class ChangeEventRead(BaseModel):
+    ceSeq: int
+    ceEntity: str
+    ceOp: str
+    ceKey: int
+    ceAt: datetime
+
+class ChangePage(BaseModel):
+    items: List[ChangeEventRead] = []
+    # 下一次查詢帶入的 after
+    last_seq: int
+    # 要求的 after 早於保留期限，中間的事件已清除：用戶端須重新取得完整清單
+    reset: bool = False
+    oldest_seq: Optional[int] = None
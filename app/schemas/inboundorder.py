@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date
 from typing import List, Optional
 
@@ -13,6 +13,10 @@ class InboundDetailBase(BaseModel):
     idQuantity: int
     WarehouseID: int
 
+# 寫入用：數量必須為正 (負數等於不經庫存檢查的扣庫存)
+class InboundDetailCreate(InboundDetailBase):
+    idQuantity: int = Field(gt=0)
+
 class InboundDetail(InboundDetailBase):
     InboundID: int
 
@@ -23,7 +27,20 @@ class InboundOrderBase(BaseModel):
     StaffID: int
 
 class InboundOrderCreate(InboundOrderBase):
-    details: List[InboundDetailBase]  # 建立單據時同時傳入多筆明細
+    details: List[InboundDetailCreate]  # 建立單據時同時傳入多筆明細
+
+# PATCH 用：只傳有變動的明細列，remove=True 表示刪除該商品
+class InboundDetailPatch(BaseModel):
+    ProductID: int
+    idQuantity: Optional[int] = Field(None, gt=0)
+    WarehouseID: Optional[int] = None
+    remove: bool = False
+
+class InboundOrderPatch(BaseModel):
+    ioDate: Optional[date] = None
+    SupplierID: Optional[int] = None
+    StaffID: Optional[int] = None
+    details: List[InboundDetailPatch] = []
 
 class InboundOrder(InboundOrderBase):
     InboundID: int
@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+# --- 內部監控 ---
+class PoolStatus(BaseModel):
+    pool_class: str
+    size: int = 0
+    checked_out: int = 0
+    idle: int = 0
+    overflow: int = 0
+    max_overflow: int = 0
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_avg_ms: float = 0.0
+    wait_max_ms: float = 0.0
+
+class ReplicaStatus(BaseModel):
+    name: str
+    healthy: bool
+    lag_seconds: Optional[float] = None
+    checked_out: int = 0
+    reads: int = 0
+    error: Optional[str] = None
+
+class ReplicaSetStatus(BaseModel):
+    balance: str
+    max_lag_seconds: float
+    replicas: List[ReplicaStatus] = []
+    # GET 改讀主庫的次數：沒有可用的副本 / 副本尚未複寫到 ETag 的版本
+    unavailable_fallbacks: int = 0
+    stale_fallbacks: int = 0
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+# --- 慢查詢 / N+1 ---
+class QueryStat(BaseModel):
+    fingerprint: str
+    statement: str
+    count: int
+    total_ms: float
+    max_ms: float
+
+class SlowQuery(BaseModel):
+    fingerprint: str
+    statement: str
+    parameters: str
+    duration_ms: float
+    route: Optional[str] = None
+    at: datetime
+    plan: Optional[List[str]] = None
+
+class RepeatedQuery(BaseModel):
+    fingerprint: str
+    statement: str
+    route: str
+    count: int
+    at: datetime
+
+class QueryLogSummary(BaseModel):
+    slow_query_ms: float
+    n_plus_one_threshold: int
+    top: List[QueryStat] = []
+    slow: List[SlowQuery] = []
+    repeated: List[RepeatedQuery] = []
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import List
+
+# --- 庫存餘額 (StockBalance) ---
+class StockBalanceBase(BaseModel):
+    ProductID: int
+    WarehouseID: int
+    sbQuantity: int = 0
+
+class StockBalance(StockBalanceBase):
+
+    class Config:
+        from_attributes = True
+
+# 批次查詢用的 (商品, 倉庫) 組合
+class StockKey(BaseModel):
+    ProductID: int
+    WarehouseID: int
+
+class StockLookup(BaseModel):
+    items: List[StockKey]
+
+class StockRebuildResult(BaseModel):
+    balances: int
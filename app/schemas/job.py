@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+# --- 背景工作 ---
+class JobRead(BaseModel):
+    JobID: int
+    jbKind: str
+    jbStatus: str
+    jbParams: Dict[str, Any] = {}
+    jbDone: int = 0
+    jbTotal: Optional[int] = None
+    jbUnit: Optional[str] = None
+    # 0 ~ 1，總量未知時為 None
+    progress: Optional[float] = None
+    jbResult: Optional[Dict[str, Any]] = None
+    # 有結果檔時為下載路徑
+    result_url: Optional[str] = None
+    jbError: Optional[str] = None
+    jbCancelRequested: bool = False
+    jbCreatedAt: datetime
+    jbStartedAt: Optional[datetime] = None
+    jbFinishedAt: Optional[datetime] = None
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import Optional
+
+# --- 進貨 / 領料數量彙總 (VolumeRollup) ---
+class VolumeRollupBase(BaseModel):
+    vrPeriod: str          # day / week / month
+    vrStart: date          # 期間起日 (週以星期一為起日)
+    ProductID: int
+    WarehouseID: int
+    SupplierID: int = 0    # 領料沒有供應商，記為 0
+    vrInbound: int = 0
+    vrOutbound: int = 0
+
+# 報表列：未指定分組的維度回傳 null
+class VolumeReportRow(BaseModel):
+    vrStart: date
+    ProductID: Optional[int] = None
+    WarehouseID: Optional[int] = None
+    SupplierID: Optional[int] = None
+    vrInbound: int = 0
+    vrOutbound: int = 0
+
+class RollupRebuildResult(BaseModel):
+    rows: int
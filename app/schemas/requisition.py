@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date
 from typing import List, Optional
 
@@ -12,6 +12,10 @@ class ReqDetailBase(BaseModel):
     rdQuantity: int
     WarehouseID: int
 
+# 寫入用：數量必須為正 (負數會繞過庫存檢查，反而增加庫存)
+class ReqDetailCreate(ReqDetailBase):
+    rdQuantity: int = Field(gt=0)
+
 class ReqDetail(ReqDetailBase):
     ReqID: int
     
@@ -25,7 +29,20 @@ class RequisitionBase(BaseModel):
     StaffID: int
 
 class RequisitionCreate(RequisitionBase):
-    details: List[ReqDetailBase]  # 建立時傳入明細列表
+    details: List[ReqDetailCreate]  # 建立時傳入明細列表
+
+# PATCH 用：只傳有變動的明細列，remove=True 表示刪除該商品
+class ReqDetailPatch(BaseModel):
+    ProductID: int
+    rdQuantity: Optional[int] = Field(None, gt=0)
+    WarehouseID: Optional[int] = None
+    remove: bool = False
+
+class RequisitionPatch(BaseModel):
+    reDate: Optional[date] = None
+    reReason: Optional[str] = None
+    StaffID: Optional[int] = None
+    details: List[ReqDetailPatch] = []
 
 class Requisition(RequisitionBase):
     ReqID: int
@@ -0,0 +1,168 @@
+# benchmarks/explain_guard.py
+# 索引檢查：以 app.core.datagen 產生大量資料後實際呼叫各 router，擷取請求中執行的 SELECT 逐一 EXPLAIN，
+# 單據 / 明細資料表出現全表掃描 (SQLite 的 SCAN <table>、PostgreSQL 的 Seq Scan) 就列出並以非 0 結束，可放在 CI。
+# 新增查詢條件或排序後忘了補索引，或改動 model 讓關聯載入變成掃描時會在這裡被擋下
+#
+# 使用方式: uv run --group dev python -m benchmarks.explain_guard [--inbound-orders 100000 --show-plans]
+# 預設使用暫存的 SQLite 檔案；APP_ENV=production 時對 DATABASE_URL 指向的資料庫執行 (會寫入大量資料，請用本機測試庫)
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from datetime import date, timedelta
+from typing import Callable, List, Optional, Tuple
+
+if os.getenv("APP_ENV") != "production":
+    os.environ["SQLITE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='wms-explain-')}/explain.db"
+# 產生資料時的大量寫入不需要慢查詢紀錄
+os.environ.setdefault("QUERY_LOG_ENABLED", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import event, func, select, text  # noqa: E402
+
+from app.core.database import engine, get_db_session_context  # noqa: E402
+from app.core.datagen import DatagenConfig, generate  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import InboundOrder, Product, Requisition, Warehouse  # noqa: E402
+
+# 不允許全表掃描的資料表
+GUARDED_TABLES = ("inboundorder", "inbounddetail", "requisition", "reqdetail")
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)$")
+_PG_SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+Request = Tuple[str, str, dict]
+
+
+class Capture:
+    """請求期間執行過的 SELECT (語句, 參數)"""
+
+    def __init__(self):
+        self.statements: Optional[List[Tuple[str, object]]] = None
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.statements is not None and not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.statements.append((statement, parameters))
+
+
+async def explain(statement: str, parameters) -> List[str]:
+    prefix = "EXPLAIN " if engine.dialect.name == "postgresql" else "EXPLAIN QUERY PLAN "
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql(prefix + statement, parameters or ())
+        return [str(row[-1]) for row in result.all()]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    tables = []
+    for line in plan:
+        match = _PG_SEQ_SCAN.search(line) if engine.dialect.name == "postgresql" else _SQLITE_SCAN.match(line.strip())
+        if match and match.group(1) in GUARDED_TABLES:
+            tables.append(match.group(1))
+    return tables
+
+
+async def sample_ids():
+    async with get_db_session_context() as db:
+        async def middle(column):
+            low, high = (await db.exec(select(func.min(column), func.max(column)))).one()
+            return (low + high) // 2
+
+        return {
+            "inbound": await middle(InboundOrder.InboundID),
+            "requisition": await middle(Requisition.ReqID),
+            "product": await middle(Product.ProductID),
+            "warehouse": await middle(Warehouse.WarehouseID),
+            "day": (await db.exec(select(func.max(InboundOrder.ioDate)))).one()[0],
+        }
+
+
+def scenarios(ids: dict) -> List[Tuple[str, Callable[[dict], Request]]]:
+    day = ids["day"] if isinstance(ids["day"], date) else date.fromisoformat(str(ids["day"]))
+    week = {"date_from": (day - timedelta(days=6)).isoformat(), "date_to": day.isoformat(), "format": "ndjson"}
+    inbound_id, req_id = ids["inbound"], ids["requisition"]
+    batch = lambda first: {"ids": list(range(first, first + 50))}  # noqa: E731
+
+    return [
+        ("inbound list", lambda s: ("GET", "/inbound/", {"params": {"limit": 50}})),
+        ("inbound list by date", lambda s: ("GET", "/inbound/", {"params": {"io_date": day.isoformat(), "limit": 50}})),
+        ("inbound list next page", lambda s: ("GET", "/inbound/", {"params": {"limit": 50, "after": s.get("inbound_cursor")}})),
+        ("inbound get", lambda s: ("GET", f"/inbound/{inbound_id}", {})),
+        ("inbound batch-get", lambda s: ("POST", "/inbound/batch-get", {"json": batch(inbound_id)})),
+        ("inbound export week", lambda s: ("GET", "/inbound/export", {"params": week})),
+        ("requisitions list", lambda s: ("GET", "/requisitions/", {"params": {"limit": 50}})),
+        ("requisitions list by date", lambda s: ("GET", "/requisitions/", {"params": {"re_date": day.isoformat(), "limit": 50}})),
+        ("requisitions list next page", lambda s: ("GET", "/requisitions/", {"params": {"limit": 50, "after": s.get("req_cursor")}})),
+        ("requisitions search", lambda s: ("GET", "/requisitions/", {"params": {"q": "補貨", "limit": 50}})),
+        ("requisitions get", lambda s: ("GET", f"/requisitions/{req_id}", {})),
+        ("requisitions batch-get", lambda s: ("POST", "/requisitions/batch-get", {"json": batch(req_id)})),
+        ("requisitions export week", lambda s: ("GET", "/requisitions/export", {"params": week})),
+        ("report by product", lambda s: ("GET", "/reports/volume", {"params": {"period": "day", "product_id": ids["product"]}})),
+        ("report by warehouse", lambda s: ("GET", "/reports/volume", {"params": {"period": "month", "warehouse_id": ids["warehouse"]}})),
+        ("inventory by product", lambda s: ("GET", f"/inventory/products/{ids['product']}", {})),
+    ]
+
+
+async def run(args) -> int:
+    capture = Capture()
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+
+    async with get_db_session_context() as db:
+        config = DatagenConfig(products=args.products, inbound_orders=args.inbound_orders, requisitions=args.requisitions)
+        await generate(db, config)
+        # 讓查詢規劃器拿到實際的資料分布
+        await db.exec(text("ANALYZE"))
+        await db.commit()
+
+    failures = 0
+    state: dict = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://explain/api/v1", timeout=None) as client:
+        for name, build in scenarios(await sample_ids()):
+            method, url, kwargs = build(state)
+            capture.statements = []
+            response = await client.request(method, url, **kwargs)
+            statements, capture.statements = capture.statements, None
+            if response.status_code >= 400:
+                print(f"❌ {name}: HTTP {response.status_code} {response.text[:200]}")
+                failures += 1
+                continue
+            # 下一頁的情境使用上一頁回應的游標
+            if name == "inbound list":
+                state["inbound_cursor"] = response.headers.get("x-next-cursor")
+            elif name == "requisitions list":
+                state["req_cursor"] = response.headers.get("x-next-cursor")
+
+            scanned = []
+            for statement, parameters in statements:
+                plan = await explain(statement, parameters)
+                tables = full_scans(plan)
+                if tables or args.show_plans:
+                    print(f"   {' '.join(statement.split())[:160]}")
+                    print("\n".join(f"      {line}" for line in plan))
+                scanned.extend(tables)
+            mark = "❌" if scanned else "✅"
+            suffix = f"  full scan: {', '.join(sorted(set(scanned)))}" if scanned else ""
+            print(f"{mark} {name:<30} {len(statements)} queries{suffix}")
+            failures += bool(scanned)
+
+    print("PASS" if not failures else f"FAIL ({failures} scenario(s))")
+    return 1 if failures else 0
+
+
+async def main(args) -> int:
+    try:
+        async with app.router.lifespan_context(app):
+            return await run(args)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="對各 router 的查詢執行 EXPLAIN，單據 / 明細資料表不得全表掃描")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--inbound-orders", type=int, default=100000)
+    parser.add_argument("--requisitions", type=int, default=50000)
+    parser.add_argument("--show-plans", action="store_true", help="列出每個查詢的執行計畫")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,132 @@
+# benchmarks/requisition_concurrency.py
+# 併發領料檢查：同時對同一個 SKU 送出大量領料單，確認庫存不會被扣成負數，
+# 同時對其他 SKU 送出領料單，確認不同 SKU 不會互相排隊拖慢吞吐量。
+#
+# 使用方式: uv run --group dev python -m benchmarks.requisition_concurrency [--stock 200 --extra 100]
+# 預設使用暫存的 SQLite 檔案；設定 APP_ENV=production 時會對 DATABASE_URL 指向的資料庫執行 (會寫入資料)。
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+DB_DIR = tempfile.mkdtemp(prefix="wms-concurrency-")
+if os.getenv("APP_ENV") != "production":
+    os.environ["SQLITE_URL"] = f"sqlite+aiosqlite:///{DB_DIR}/bench.db"
+
+import httpx  # noqa: E402
+
+from app.core.database import engine, get_db_session_context  # noqa: E402
+from app.core.seed import create_initial_data  # noqa: E402
+from app.main import app  # noqa: E402
+
+TARGET = (1, 101)  # (ProductID, WarehouseID)
+
+
+def requisition(product_id: int, warehouse_id: int, quantity: int = 1) -> dict:
+    return {
+        "reDate": date.today().isoformat(),
+        "reReason": "concurrency check",
+        "StaffID": 1,
+        "details": [{"ProductID": product_id, "rdQuantity": quantity, "WarehouseID": warehouse_id}],
+    }
+
+
+async def timed_post(client: httpx.AsyncClient, body: dict):
+    start = time.perf_counter()
+    r = await client.post("/requisitions/", json=body)
+    return r.status_code, time.perf_counter() - start
+
+
+def summarize(results) -> str:
+    latencies = sorted(t for _, t in results)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    return f"p50 {statistics.median(latencies) * 1000:.1f} ms / p95 {p95 * 1000:.1f} ms"
+
+
+async def stock(client: httpx.AsyncClient, product_id: int, warehouse_id: int) -> int:
+    r = await client.get(f"/inventory/{product_id}/{warehouse_id}")
+    return r.json()["sbQuantity"]
+
+
+async def run(args) -> bool:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench/api/v1", timeout=None) as client:
+        # 1. 目標 SKU 補進 --stock 件；其他 SKU (所有商品 x 倉庫) 補足本次要扣的數量
+        products = [p["ProductID"] for p in (await client.get("/products/", params={"limit": 100})).json()]
+        warehouses = [w["WarehouseID"] for w in (await client.get("/warehouse/", params={"limit": 100})).json()]
+        others = [(pid, wid) for wid in warehouses for pid in products if (pid, wid) != TARGET]
+        other_keys = [others[i % len(others)] for i in range(args.other_requests)] if others else []
+
+        for wid in warehouses:
+            details = [
+                {"ProductID": pid, "WarehouseID": wid,
+                 "idQuantity": args.stock if (pid, wid) == TARGET else other_keys.count((pid, wid)) + 1}
+                for pid in products
+            ]
+            r = await client.post("/inbound/", json={
+                "ioDate": date.today().isoformat(), "SupplierID": 1, "StaffID": 1, "details": details,
+            })
+            r.raise_for_status()
+        available = await stock(client, *TARGET)
+        before = {key: await stock(client, *key) for key in others}
+
+        # 2. 同時送出：目標 SKU available + extra 筆 (每筆 1 件)，其他 SKU 輪流各扣 1 件
+        target_calls = [timed_post(client, requisition(*TARGET)) for _ in range(available + args.extra)]
+        other_calls = [timed_post(client, requisition(*key)) for key in other_keys]
+        start = time.perf_counter()
+        results = await asyncio.gather(*target_calls, *other_calls)
+        elapsed = time.perf_counter() - start
+
+        target_results = results[: len(target_calls)]
+        other_results = results[len(target_calls):]
+        accepted = sum(1 for code, _ in target_results if code == 201)
+        rejected = sum(1 for code, _ in target_results if code == 409)
+        unexpected = [code for code, _ in results if code not in (201, 409)]
+        remaining = await stock(client, *TARGET)
+        others_ok = all(code == 201 for code, _ in other_results)
+        others_consistent = all([await stock(client, *key) == before[key] - other_keys.count(key) for key in others])
+
+        print(f"requests           : {len(results)} ({len(target_calls)} on SKU {TARGET}, {len(other_calls)} on {len(others)} other SKUs)")
+        print(f"elapsed            : {elapsed:.3f}s ({len(results) / elapsed:.0f} req/s)")
+        print(f"latency target SKU : {summarize(target_results)}")
+        if other_results:
+            print(f"latency other SKUs : {summarize(other_results)}")
+        print(f"target SKU         : stock {available} -> {remaining}, accepted {accepted}, rejected {rejected}")
+        print(f"other SKUs         : all accepted = {others_ok}, stock consistent = {others_consistent}")
+
+        ok = (
+            not unexpected
+            and accepted == available
+            and rejected == args.extra
+            and remaining == 0
+            and others_ok
+            and others_consistent
+        )
+        if unexpected:
+            print(f"unexpected status codes: {sorted(set(unexpected))}")
+        return ok
+
+
+async def main(args) -> int:
+    try:
+        async with app.router.lifespan_context(app):
+            # 使用種子資料的商品 / 倉庫 / 員工
+            async with get_db_session_context() as db:
+                await create_initial_data(db)
+            ok = await run(args)
+    finally:
+        await engine.dispose()
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="併發領料的庫存一致性與吞吐量檢查")
+    parser.add_argument("--stock", type=int, default=200, help="目標 SKU 補進的庫存數量")
+    parser.add_argument("--extra", type=int, default=100, help="超出庫存的領料筆數 (預期全部 409)")
+    parser.add_argument("--other-requests", type=int, default=200, help="同時對其他 SKU 送出的領料筆數")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,394 @@
+# benchmarks/suite.py
+# 端點基準測試：在同一個程序內以 ASGI transport 啟動 FastAPI (不經過網路)，
+# 用 app.core.datagen 產生的資料量測 app/api 各 router 的吞吐量與 p50 / p95 / p99 延遲，
+# 結果輸出成 JSON；compare 模式與基準結果比對，退步超過門檻時以非 0 結束 (可用於 CI 把關)
+#
+# 使用方式:
+#   uv run --group dev python -m benchmarks.suite run --sizes small,medium --concurrency 1,16 -o benchmarks/results/current.json
+#   uv run --group dev python -m benchmarks.suite compare benchmarks/results/baseline.json benchmarks/results/current.json
+#
+# 預設使用暫存的 SQLite 檔案；APP_ENV=production 時對 DATABASE_URL 指向的資料庫執行 (會寫入大量資料，請用本機測試庫)
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 各資料量的「累計」目標筆數：依序執行時只補上差額 (datagen 會接在既有資料後面)
+SIZES: Dict[str, Dict[str, int]] = {
+    "small": dict(products=1000, warehouses=5, suppliers=50, staff=20, inbound_orders=10000, requisitions=5000),
+    "medium": dict(products=10000, warehouses=10, suppliers=200, staff=100, inbound_orders=100000, requisitions=50000),
+    "large": dict(products=100000, warehouses=20, suppliers=500, staff=200, inbound_orders=1000000, requisitions=500000),
+}
+
+# 主檔 router -> (路徑, 主鍵, 產生新增 / 更新 body 的函式, 搜尋字)
+MASTER_ROUTERS = {
+    "products": ("products", "ProductID", lambda rng: {"prName": f"壓測商品 {rng.randint(1, 10**6)}", "prSpec": "bench", "prCategory": "工具"}, "耳機"),
+    "staff": ("staff", "StaffID", lambda rng: {"stName": f"壓測員工{rng.randint(1, 10**6)}", "stDept": "倉庫部"}, "陳"),
+    "suppliers": ("suppliers", "SupplierID", lambda rng: {"suName": f"壓測供應商{rng.randint(1, 10**6)}", "suPhone": "02-0000-0000", "suAddress": "台北"}, "供應商"),
+    "warehouse": ("warehouse", "WarehouseID", lambda rng: {"waName": f"壓測倉{rng.randint(1, 10**6)}", "waLocation": "桃園"}, "倉"),
+}
+
+Request = Tuple[str, str, dict]  # (method, url, httpx kwargs)
+
+
+@dataclass
+class State:
+    """量測期間共用的樣本 ID 與本次新增的資料 (供 update / delete 使用)"""
+    rng: random.Random
+    ids: Dict[str, List[int]] = field(default_factory=dict)
+    stocked: List[Tuple[int, int]] = field(default_factory=list)
+    created: Dict[str, List[Tuple[int, dict]]] = field(default_factory=dict)
+    start: date = date(2024, 1, 1)
+    days: int = 365
+
+
+@dataclass
+class Scenario:
+    router: str
+    op: str
+    build: Callable[[State], Optional[Request]]
+    # create 類的情境：回應中的主鍵欄位，記錄下來給 update / delete 使用
+    created_key: Optional[str] = None
+
+
+def _day(state: State) -> str:
+    return (state.start + timedelta(days=state.rng.randrange(state.days))).isoformat()
+
+
+def _order_lines(state: State, quantity_field: str, stocked: bool = False) -> List[dict]:
+    if stocked:
+        keys = state.rng.sample(state.stocked, k=min(3, len(state.stocked)))
+        keys = list(dict((pid, (pid, wid)) for pid, wid in keys).values())
+    else:
+        products = state.rng.sample(state.ids["products"], k=3)
+        keys = [(pid, state.rng.choice(state.ids["warehouse"])) for pid in products]
+    return [{"ProductID": pid, quantity_field: state.rng.randint(1, 3) if stocked else state.rng.randint(1, 50), "WarehouseID": wid} for pid, wid in keys]
+
+
+def _pop_created(state: State, router: str) -> Optional[Tuple[int, dict]]:
+    created = state.created.get(router)
+    return created.pop() if created else None
+
+
+def _master_scenarios(router: str) -> List[Scenario]:
+    path, pk, body, term = MASTER_ROUTERS[router]
+
+    def update(state: State) -> Optional[Request]:
+        created = state.created.get(router)
+        if not created:
+            return None
+        return "PUT", f"/{path}/{state.rng.choice(created)[0]}", {"json": body(state.rng)}
+
+    def delete(state: State) -> Optional[Request]:
+        item = _pop_created(state, router)
+        return ("DELETE", f"/{path}/{item[0]}", {}) if item else None
+
+    return [
+        Scenario(router, "list", lambda s: ("GET", f"/{path}/", {"params": {"limit": 50}})),
+        Scenario(router, "get", lambda s: ("GET", f"/{path}/{s.rng.choice(s.ids[router])}", {})),
+        Scenario(router, "search", lambda s: ("GET", f"/{path}/", {"params": {"q": term, "limit": 50}})),
+        Scenario(router, "batch-get", lambda s: ("POST", f"/{path}/batch-get", {"json": {"ids": s.rng.sample(s.ids[router], k=min(50, len(s.ids[router])))}})),
+        Scenario(router, "create", lambda s: ("POST", f"/{path}/", {"json": body(s.rng)}), created_key=pk),
+        Scenario(router, "update", update),
+        Scenario(router, "delete", delete),
+    ]
+
+
+def _order_scenarios(router: str) -> List[Scenario]:
+    if router == "inbound":
+        pk, quantity_field = "InboundID", "idQuantity"
+
+        def body(s: State) -> dict:
+            return {"ioDate": _day(s), "SupplierID": s.rng.choice(s.ids["suppliers"]), "StaffID": s.rng.choice(s.ids["staff"]),
+                    "details": _order_lines(s, quantity_field)}
+    else:
+        pk, quantity_field = "ReqID", "rdQuantity"
+
+        def body(s: State) -> dict:
+            return {"reDate": _day(s), "reReason": "壓測", "StaffID": s.rng.choice(s.ids["staff"]),
+                    "details": _order_lines(s, quantity_field, stocked=True)}
+
+    def update(state: State) -> Optional[Request]:
+        created = state.created.get(router)
+        if not created:
+            return None
+        order_id, original = state.rng.choice(created)
+        # 只改一筆明細的數量，走差異更新
+        changed = {**original, "details": [{**original["details"][0], quantity_field: 1}, *original["details"][1:]]}
+        return "PUT", f"/{router}/{order_id}", {"json": changed}
+
+    def delete(state: State) -> Optional[Request]:
+        item = _pop_created(state, router)
+        return ("DELETE", f"/{router}/{item[0]}", {}) if item else None
+
+    def export(state: State) -> Request:
+        day = state.start + timedelta(days=state.rng.randrange(state.days))
+        return "GET", f"/{router}/export", {"params": {"format": "ndjson", "date_from": day.isoformat(), "date_to": day.isoformat()}}
+
+    return [
+        Scenario(router, "list", lambda s: ("GET", f"/{router}/", {"params": {"limit": 50}})),
+        Scenario(router, "get", lambda s: ("GET", f"/{router}/{s.rng.choice(s.ids[router])}", {})),
+        Scenario(router, "batch-get", lambda s: ("POST", f"/{router}/batch-get", {"json": {"ids": s.rng.sample(s.ids[router], k=min(50, len(s.ids[router])))}})),
+        Scenario(router, "export-day", export),
+        Scenario(router, "create", lambda s: ("POST", f"/{router}/", {"json": body(s)}), created_key=pk),
+        Scenario(router, "update", update),
+        Scenario(router, "delete", delete),
+    ]
+
+
+def _other_scenarios() -> List[Scenario]:
+    def lookup(state: State) -> Request:
+        keys = state.rng.sample(state.stocked, k=min(50, len(state.stocked)))
+        return "POST", "/inventory/lookup", {"json": {"items": [{"ProductID": p, "WarehouseID": w} for p, w in keys]}}
+
+    return [
+        Scenario("inventory", "list", lambda s: ("GET", "/inventory/", {"params": {"limit": 50}})),
+        Scenario("inventory", "get", lambda s: ("GET", "/inventory/{}/{}".format(*s.rng.choice(s.stocked)), {})),
+        Scenario("inventory", "lookup", lookup),
+        Scenario("reports", "volume-month", lambda s: ("GET", "/reports/volume", {"params": {"period": "month", "group_by": "warehouse"}})),
+        Scenario("reports", "volume-day-product", lambda s: ("GET", "/reports/volume", {"params": {"period": "day", "product_id": s.rng.choice(s.ids["products"])}})),
+    ]
+
+
+ROUTERS = ["products", "staff", "suppliers", "warehouse", "inbound", "requisitions", "inventory", "reports"]
+
+
+def scenarios_for(routers: List[str]) -> List[Scenario]:
+    result = []
+    for router in routers:
+        if router in MASTER_ROUTERS:
+            result.extend(_master_scenarios(router))
+        elif router in ("inbound", "requisitions"):
+            result.extend(_order_scenarios(router))
+    result.extend(s for s in _other_scenarios() if s.router in routers)
+    return result
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> dict:
+    ms = sorted(t * 1000 for t in latencies)
+    cuts = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "throughput": round(len(ms) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+    }
+
+
+async def run_scenario(client, scenario: Scenario, state: State, requests: int, concurrency: int, warmup: int) -> Optional[dict]:
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests + warmup
+    first_error: Optional[str] = None
+
+    async def worker():
+        nonlocal remaining, errors, first_error
+        while remaining > 0:
+            remaining -= 1
+            measured = remaining < requests
+            request = scenario.build(state)
+            if request is None:
+                return
+            method, url, kwargs = request
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            await response.aread()
+            latency = time.perf_counter() - started
+            if response.status_code >= 400:
+                errors += 1
+                first_error = first_error or f"{response.status_code} {response.text[:200]}"
+            elif scenario.created_key:
+                state.created.setdefault(scenario.router, []).append((response.json()[scenario.created_key], kwargs["json"]))
+            if measured:
+                latencies.append(latency)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        return None
+    if first_error:
+        print(f"   ⚠️ {scenario.router}/{scenario.op}: {errors} errors, first: {first_error}")
+    return summarize(latencies, elapsed, errors)
+
+
+async def _sample_ids(db, model, pk: str, limit: int = 2000) -> List[int]:
+    # 以主鍵取餘數均勻抽樣，避免只抽到最前或最後一段
+    from sqlalchemy import func, select
+
+    column = getattr(model, pk)
+    total = (await db.exec(select(func.count()).select_from(model))).one()[0]
+    step = max(1, total // limit)
+    result = await db.exec(select(column).where(column % step == 0).order_by(column).limit(limit))
+    return list(result.scalars().all())
+
+
+async def prepare_state(seed: int) -> State:
+    from sqlalchemy import select
+
+    from app.core.database import get_db_session_context
+    from app.models import InboundOrder, Product, Requisition, Staff, StockBalance, Supplier, Warehouse
+
+    state = State(rng=random.Random(seed))
+    async with get_db_session_context() as db:
+        for router, model, pk in (
+            ("products", Product, "ProductID"), ("staff", Staff, "StaffID"), ("suppliers", Supplier, "SupplierID"),
+            ("warehouse", Warehouse, "WarehouseID"), ("inbound", InboundOrder, "InboundID"), ("requisitions", Requisition, "ReqID"),
+        ):
+            state.ids[router] = await _sample_ids(db, model, pk)
+        # 領料壓測只扣庫存最多的 SKU，避免庫存不足造成 409
+        result = await db.exec(
+            select(StockBalance.ProductID, StockBalance.WarehouseID).order_by(StockBalance.sbQuantity.desc()).limit(200)
+        )
+        state.stocked = [tuple(row) for row in result.all()]
+    return state
+
+
+async def grow_dataset(size: str, generated: Dict[str, int], seed: int) -> Dict[str, int]:
+    from app.core.database import get_db_session_context
+    from app.core.datagen import DatagenConfig, generate
+
+    target = SIZES[size]
+    delta = {k: max(0, v - generated.get(k, 0)) for k, v in target.items()}
+    if any(delta.values()):
+        async with get_db_session_context() as db:
+            await generate(db, DatagenConfig(**delta, seed=seed + len(generated)))
+    return dict(target)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    if os.getenv("APP_ENV") != "production":
+        os.environ["SQLITE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='wms-bench-')}/bench.db"
+    os.environ.setdefault("SQL_ECHO", "false")
+
+    import httpx
+
+    from app.core.database import engine
+    from app.main import app
+
+    routers = args.routers.split(",") if args.routers else ROUTERS
+    sizes = [s for s in SIZES if s in args.sizes.split(",")]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "datasets": {},
+        "results": [],
+    }
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench/api/v1", timeout=None) as client:
+                generated: Dict[str, int] = {}
+                for size in sizes:
+                    started = time.perf_counter()
+                    generated = await grow_dataset(size, generated, args.seed)
+                    report["datasets"][size] = dict(generated)
+                    print(f"📚 dataset {size} ready in {time.perf_counter() - started:.1f}s")
+
+                    for concurrency in levels:
+                        state = await prepare_state(args.seed)
+                        for scenario in scenarios_for(routers):
+                            stats = await run_scenario(client, scenario, state, args.requests, concurrency, args.warmup)
+                            if stats is None:
+                                continue
+                            row = {"size": size, "concurrency": concurrency, "router": scenario.router, "op": scenario.op, **stats}
+                            report["results"].append(row)
+                            print(f"   {size:<6} c={concurrency:<3} {scenario.router:<12} {scenario.op:<18} "
+                                  f"{stats['throughput']:>9.1f} req/s  p50 {stats['p50_ms']:>8.2f}  p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms")
+    finally:
+        await engine.dispose()
+    return report
+
+
+def _key(row: dict) -> tuple:
+    return row["size"], row["concurrency"], row["router"], row["op"]
+
+
+def compare(baseline: dict, current: dict, metric: str, threshold: float, min_delta_ms: float) -> List[dict]:
+    """回傳退步的項目：延遲增加或吞吐量下降超過門檻 (延遲另需超過最小絕對差，避免微秒級抖動誤報)"""
+    base = {_key(r): r for r in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        old = base.get(_key(row))
+        if old is None:
+            continue
+        latency_ratio = row[metric] / old[metric] if old[metric] else 1.0
+        throughput_ratio = row["throughput"] / old["throughput"] if old["throughput"] else 1.0
+        slower = latency_ratio > 1 + threshold and row[metric] - old[metric] >= min_delta_ms
+        fewer = throughput_ratio < 1 - threshold
+        status = "REGRESSION" if (slower or fewer) else ("improved" if latency_ratio < 1 - threshold else "ok")
+        print(f"{'/'.join(str(k) for k in _key(row)):<50} {metric} {old[metric]:>9.2f} -> {row[metric]:>9.2f} ms "
+              f"({(latency_ratio - 1) * 100:+6.1f}%)  tput {(throughput_ratio - 1) * 100:+6.1f}%  {status}")
+        if slower or fewer:
+            regressions.append({"key": _key(row), "baseline": old, "current": row})
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="WMS API 端點基準測試")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="執行基準測試並輸出 JSON")
+    run_parser.add_argument("--sizes", default="small", help=f"資料量，逗號分隔: {','.join(SIZES)}")
+    run_parser.add_argument("--concurrency", default="1,8", help="併發數，逗號分隔")
+    run_parser.add_argument("--routers", default=None, help=f"只測指定的 router，逗號分隔: {','.join(ROUTERS)}")
+    run_parser.add_argument("--requests", type=int, default=200, help="每個情境量測的請求數")
+    run_parser.add_argument("--warmup", type=int, default=10, help="每個情境先送出不計入的請求數")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("-o", "--output", default=None, help="結果 JSON 路徑 (預設只印出)")
+
+    cmp_parser = sub.add_parser("compare", help="與基準結果比對，有退步時以非 0 結束")
+    cmp_parser.add_argument("baseline")
+    cmp_parser.add_argument("current")
+    cmp_parser.add_argument("--metric", choices=["p50_ms", "p95_ms", "p99_ms"], default="p95_ms")
+    cmp_parser.add_argument("--threshold", type=float, default=0.2, help="允許的變動比例 (預設 20%%)")
+    cmp_parser.add_argument("--min-delta-ms", type=float, default=1.0, help="延遲至少增加多少毫秒才算退步")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        report = asyncio.run(run(args))
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"💾 results written to {args.output}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.metric, args.threshold, args.min_delta_ms)
+    print(f"{len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 06:14:03.144792
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 導入 Alembic 前以 create_all 建立的資料庫已有部分資料表：只建立還沒有的 (與當時的結構相同)
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'product' not in existing:
+        op.create_table('product',
+        sa.Column('prName', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('prSpec', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('prCategory', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('ProductID', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('ProductID')
+        )
+    if 'searchgram' not in existing:
+        op.create_table('searchgram',
+        sa.Column('sgEntity', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column('sgGram', sqlmodel.sql.sqltypes.AutoString(length=8), nullable=False),
+        sa.Column('RefID', sa.Integer(), nullable=False),
+        sa.Column('sgWeight', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('sgEntity', 'sgGram', 'RefID')
+        )
+        with op.batch_alter_table('searchgram', schema=None) as batch_op:
+            batch_op.create_index('ix_searchgram_entity_ref', ['sgEntity', 'RefID'], unique=False)
+
+    if 'staff' not in existing:
+        op.create_table('staff',
+        sa.Column('stName', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('stDept', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('StaffID', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('StaffID')
+        )
+    if 'supplier' not in existing:
+        op.create_table('supplier',
+        sa.Column('suName', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('suPhone', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('suAddress', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('SupplierID', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('SupplierID')
+        )
+    if 'tableversion' not in existing:
+        op.create_table('tableversion',
+        sa.Column('tvTable', sqlmodel.sql.sqltypes.AutoString(length=40), nullable=False),
+        sa.Column('tvVersion', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('tvTable')
+        )
+    if 'warehouse' not in existing:
+        op.create_table('warehouse',
+        sa.Column('waName', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('waLocation', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('WarehouseID', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('WarehouseID')
+        )
+    if 'inboundorder' not in existing:
+        op.create_table('inboundorder',
+        sa.Column('ioDate', sa.Date(), nullable=False),
+        sa.Column('InboundID', sa.Integer(), nullable=False),
+        sa.Column('SupplierID', sa.Integer(), nullable=False),
+        sa.Column('StaffID', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['StaffID'], ['staff.StaffID'], ),
+        sa.ForeignKeyConstraint(['SupplierID'], ['supplier.SupplierID'], ),
+        sa.PrimaryKeyConstraint('InboundID')
+        )
+    if 'requisition' not in existing:
+        op.create_table('requisition',
+        sa.Column('reDate', sa.Date(), nullable=False),
+        sa.Column('reReason', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('ReqID', sa.Integer(), nullable=False),
+        sa.Column('StaffID', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['StaffID'], ['staff.StaffID'], ),
+        sa.PrimaryKeyConstraint('ReqID')
+        )
+    if 'stockbalance' not in existing:
+        op.create_table('stockbalance',
+        sa.Column('ProductID', sa.Integer(), nullable=False),
+        sa.Column('WarehouseID', sa.Integer(), nullable=False),
+        sa.Column('sbQuantity', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ProductID'], ['product.ProductID'], ),
+        sa.ForeignKeyConstraint(['WarehouseID'], ['warehouse.WarehouseID'], ),
+        sa.PrimaryKeyConstraint('ProductID', 'WarehouseID')
+        )
+        with op.batch_alter_table('stockbalance', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_stockbalance_WarehouseID'), ['WarehouseID'], unique=False)
+        # 既有資料庫已有單據：與 rebuild_stock_balances 相同由明細算出餘額，否則升級後每個 SKU 的庫存都是 0
+        movements = []
+        if 'inbounddetail' in existing:
+            movements.append('SELECT "ProductID", "WarehouseID", "idQuantity" AS qty FROM inbounddetail')
+        if 'reqdetail' in existing:
+            movements.append('SELECT "ProductID", "WarehouseID", -"rdQuantity" AS qty FROM reqdetail')
+        if movements:
+            op.execute(
+                'INSERT INTO stockbalance ("ProductID", "WarehouseID", "sbQuantity") '
+                'SELECT "ProductID", "WarehouseID", SUM(qty) FROM (' + ' UNION ALL '.join(movements) + ') AS movements '
+                'GROUP BY "ProductID", "WarehouseID" HAVING SUM(qty) != 0'
+            )
+
+    if 'volumerollup' not in existing:
+        op.create_table('volumerollup',
+        sa.Column('vrPeriod', sqlmodel.sql.sqltypes.AutoString(length=8), nullable=False),
+        sa.Column('vrStart', sa.Date(), nullable=False),
+        sa.Column('ProductID', sa.Integer(), nullable=False),
+        sa.Column('WarehouseID', sa.Integer(), nullable=False),
+        sa.Column('SupplierID', sa.Integer(), nullable=False),
+        sa.Column('vrInbound', sa.Integer(), nullable=False),
+        sa.Column('vrOutbound', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ProductID'], ['product.ProductID'], ),
+        sa.ForeignKeyConstraint(['WarehouseID'], ['warehouse.WarehouseID'], ),
+        sa.PrimaryKeyConstraint('vrPeriod', 'vrStart', 'ProductID', 'WarehouseID', 'SupplierID')
+        )
+    if 'inbounddetail' not in existing:
+        op.create_table('inbounddetail',
+        sa.Column('idQuantity', sa.Integer(), nullable=False),
+        sa.Column('InboundID', sa.Integer(), nullable=False),
+        sa.Column('ProductID', sa.Integer(), nullable=False),
+        sa.Column('WarehouseID', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['InboundID'], ['inboundorder.InboundID'], ),
+        sa.ForeignKeyConstraint(['ProductID'], ['product.ProductID'], ),
+        sa.ForeignKeyConstraint(['WarehouseID'], ['warehouse.WarehouseID'], ),
+        sa.PrimaryKeyConstraint('InboundID', 'ProductID')
+        )
+    if 'reqdetail' not in existing:
+        op.create_table('reqdetail',
+        sa.Column('rdQuantity', sa.Integer(), nullable=False),
+        sa.Column('ReqID', sa.Integer(), nullable=False),
+        sa.Column('ProductID', sa.Integer(), nullable=False),
+        sa.Column('WarehouseID', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ProductID'], ['product.ProductID'], ),
+        sa.ForeignKeyConstraint(['ReqID'], ['requisition.ReqID'], ),
+        sa.ForeignKeyConstraint(['WarehouseID'], ['warehouse.WarehouseID'], ),
+        sa.PrimaryKeyConstraint('ReqID', 'ProductID')
+        )
+
+
+def downgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('reqdetail')
+    op.drop_table('inbounddetail')
+    op.drop_table('volumerollup')
+    with op.batch_alter_table('stockbalance', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stockbalance_WarehouseID'))
+
+    op.drop_table('stockbalance')
+    op.drop_table('requisition')
+    op.drop_table('inboundorder')
+    op.drop_table('warehouse')
+    op.drop_table('tableversion')
+    op.drop_table('supplier')
+    op.drop_table('staff')
+    with op.batch_alter_table('searchgram', schema=None) as batch_op:
+        batch_op.drop_index('ix_searchgram_entity_ref')
+
+    op.drop_table('searchgram')
+    op.drop_table('product')
+    # ### end Alembic commands ###
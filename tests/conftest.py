@@ -0,0 +1,38 @@
+# tests/conftest.py
+# 測試一律使用暫存的 SQLite 檔案：設定在 import 時讀取，必須在 import app 之前指定
+import os
+import tempfile
+
+DB_DIR = tempfile.mkdtemp(prefix="wms-tests-")
+os.environ["APP_ENV"] = "development"
+os.environ["SQLITE_URL"] = f"sqlite+aiosqlite:///{DB_DIR}/test.db"
+os.environ["JOB_DIR"] = os.path.join(DB_DIR, "job_files")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.core.database import get_db_session_context  # noqa: E402
+from app.core.seed import create_initial_data  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+# 所有測試共用一個 event loop：程序內的鎖 (asyncio.Lock) 會綁定第一次使用的 loop
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def started_app():
+    # 與 uvicorn 相同執行 lifespan (建表 / 遷移、背景工作)，再寫入種子資料
+    async with app.router.lifespan_context(app):
+        async with get_db_session_context() as db:
+            await create_initial_data(db)
+        yield app
+
+
+@pytest.fixture
+async def client(started_app):
+    transport = httpx.ASGITransport(app=started_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api/v1", timeout=None) as c:
+        yield c
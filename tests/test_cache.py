@@ -0,0 +1,29 @@
+# tests/test_cache.py
+# 主檔快取：其他 worker 的修改 (不經過本程序的 API，不會在本地清除) 由異動事件清除
+import asyncio
+
+import pytest
+
+from app.core.database import get_db_session_context
+from app.models.supplier import Supplier
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_change_feed_invalidates_cached_master(client):
+    r = await client.post("/suppliers/", json={"suName": "快取測試", "suPhone": "0", "suAddress": "test"})
+    supplier_id = r.json()["SupplierID"]
+    assert (await client.get(f"/suppliers/{supplier_id}")).json()["suName"] == "快取測試"
+
+    # 模擬其他 worker：直接以 session 修改，只留下異動事件
+    async with get_db_session_context() as db:
+        supplier = await db.get(Supplier, supplier_id)
+        supplier.suName = "快取測試 (已修改)"
+        await db.commit()
+
+    for _ in range(50):
+        if (await client.get(f"/suppliers/{supplier_id}")).json()["suName"] == "快取測試 (已修改)":
+            break
+        await asyncio.sleep(0.1)
+    else:
+        pytest.fail("cached supplier was not invalidated by the change feed")
@@ -0,0 +1,63 @@
+# tests/test_inbound_stock.py
+# 修改 / 刪除進貨單會扣回庫存：進來的貨已被領用時回 409，庫存不能變成負數
+from datetime import date
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+SKU = (1, 103)  # (ProductID, WarehouseID)，其他測試不使用
+
+
+async def stock(client) -> int:
+    r = await client.get(f"/inventory/{SKU[0]}/{SKU[1]}")
+    return r.json()["sbQuantity"]
+
+
+async def test_reducing_or_deleting_consumed_inbound_is_rejected(client):
+    r = await client.post("/inbound/", json={
+        "ioDate": date.today().isoformat(), "SupplierID": 1, "StaffID": 1,
+        "details": [{"ProductID": SKU[0], "idQuantity": 10, "WarehouseID": SKU[1]}],
+    })
+    assert r.status_code == 201
+    inbound_id = r.json()["InboundID"]
+    r = await client.post("/requisitions/", json={
+        "reDate": date.today().isoformat(), "reReason": "test", "StaffID": 1,
+        "details": [{"ProductID": SKU[0], "rdQuantity": 7, "WarehouseID": SKU[1]}],
+    })
+    assert r.status_code == 201
+    remaining = await stock(client)
+
+    # 只剩 remaining 件：進貨量減到比已領用的 7 件還少，或整張刪除都會讓庫存變成負數
+    patch = {"details": [{"ProductID": SKU[0], "idQuantity": 10 - remaining - 1}]}
+    assert (await client.patch(f"/inbound/{inbound_id}", json=patch)).status_code == 409
+    assert (await client.delete(f"/inbound/{inbound_id}")).status_code == 409
+    assert await stock(client) == remaining
+
+    # 減到剛好等於已領用的數量可以
+    patch = {"details": [{"ProductID": SKU[0], "idQuantity": 10 - remaining}]}
+    assert (await client.patch(f"/inbound/{inbound_id}", json=patch)).status_code == 200
+    assert await stock(client) == 0
+
+
+async def test_deleting_all_orders_leaves_no_empty_balance_rows(client):
+    # 餘額 / 彙總歸零的列會刪除，主檔不會被空的列以外鍵擋住
+    product = (await client.post("/products/", json={"prName": "暫時商品", "prCategory": "test"})).json()
+    pid, wid = product["ProductID"], 102
+    r = await client.post("/inbound/", json={
+        "ioDate": date.today().isoformat(), "SupplierID": 1, "StaffID": 1,
+        "details": [{"ProductID": pid, "idQuantity": 5, "WarehouseID": wid}],
+    })
+    inbound_id = r.json()["InboundID"]
+    r = await client.post("/requisitions/", json={
+        "reDate": date.today().isoformat(), "reReason": "test", "StaffID": 1,
+        "details": [{"ProductID": pid, "rdQuantity": 5, "WarehouseID": wid}],
+    })
+    req_id = r.json()["ReqID"]
+    assert (await client.get(f"/inventory/products/{pid}")).json() == []
+
+    assert (await client.delete(f"/requisitions/{req_id}")).status_code == 204
+    assert (await client.delete(f"/inbound/{inbound_id}")).status_code == 204
+    assert (await client.get(f"/inventory/products/{pid}")).json() == []
+    assert (await client.get("/reports/volume", params={"period": "day", "product_id": pid})).json() == []
+    assert (await client.delete(f"/products/{pid}")).status_code == 204
@@ -0,0 +1,27 @@
+# tests/test_master_upsert.py
+# 主檔批次 upsert：CSV 空白儲存格視為 NULL，重送相同的檔案不會有任何更新
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+CSV = (
+    "ProductID,prName,prSpec,prCategory\n"
+    "9001,同步測試 A,,工具\n"
+    "9002,同步測試 B,大,工具\n"
+    "9003,同步測試 C,,工具\n"
+)
+
+
+async def upsert(client) -> dict:
+    r = await client.post("/products/bulk-upsert", content=CSV.encode(), headers={"Content-Type": "text/csv"})
+    assert r.status_code == 200
+    return r.json()
+
+
+async def test_resending_same_csv_is_unchanged(client):
+    first = await upsert(client)
+    assert (first["created"], first["rejected"]) == (3, 0)
+    assert (await client.get("/products/9001")).json()["prSpec"] is None
+
+    second = await upsert(client)
+    assert (second["created"], second["updated"], second["unchanged"]) == (0, 0, 3)
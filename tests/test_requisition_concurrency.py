@@ -0,0 +1,70 @@
+# tests/test_requisition_concurrency.py
+# 併發領料：同一個 SKU 同時送出超過庫存的領料單，庫存不能被扣成負數，超出的部分全部回 409
+# (壓力與吞吐量見 benchmarks/requisition_concurrency.py)
+import asyncio
+from datetime import date
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def requisition(product_id: int, warehouse_id: int, quantity: int) -> dict:
+    return {
+        "reDate": date.today().isoformat(),
+        "reReason": "concurrency test",
+        "StaffID": 1,
+        "details": [{"ProductID": product_id, "rdQuantity": quantity, "WarehouseID": warehouse_id}],
+    }
+
+
+async def stock(client, product_id: int, warehouse_id: int) -> int:
+    r = await client.get(f"/inventory/{product_id}/{warehouse_id}")
+    assert r.status_code == 200
+    return r.json()["sbQuantity"]
+
+
+async def restock(client, product_id: int, warehouse_id: int, quantity: int) -> int:
+    r = await client.post("/inbound/", json={
+        "ioDate": date.today().isoformat(), "SupplierID": 1, "StaffID": 1,
+        "details": [{"ProductID": product_id, "idQuantity": quantity, "WarehouseID": warehouse_id}],
+    })
+    assert r.status_code == 201
+    return await stock(client, product_id, warehouse_id)
+
+
+@pytest.mark.parametrize("sku, quantity", [((3, 102), 1), ((3, 103), 3)])
+async def test_parallel_requisitions_do_not_overdraw(client, sku, quantity):
+    available = await restock(client, *sku, 30)
+    fits = available // quantity
+    extra = 20
+
+    results = await asyncio.gather(
+        *(client.post("/requisitions/", json=requisition(*sku, quantity)) for _ in range(fits + extra))
+    )
+    codes = [r.status_code for r in results]
+
+    remaining = await stock(client, *sku)
+    assert remaining >= 0
+    assert codes.count(201) == fits
+    assert codes.count(409) == extra
+    assert remaining == available - fits * quantity
+
+
+async def test_parallel_requisitions_on_other_skus_are_accepted(client):
+    # 目標 SKU 庫存不足的同時，其他 SKU 的領料不受影響
+    target, other = (2, 102), (2, 103)
+    await restock(client, *target, 5)
+    before = await restock(client, *other, 10)
+
+    results = await asyncio.gather(
+        *(client.post("/requisitions/", json=requisition(*target, 1)) for _ in range(15)),
+        *(client.post("/requisitions/", json=requisition(*other, 1)) for _ in range(10)),
+    )
+    target_codes = [r.status_code for r in results[:15]]
+    other_codes = [r.status_code for r in results[15:]]
+
+    assert target_codes.count(201) == 5 and target_codes.count(409) == 10
+    assert other_codes == [201] * 10
+    assert await stock(client, *target) == 0
+    assert await stock(client, *other) == before - 10
@@ -0,0 +1,52 @@
+# tests/test_search.py
+# 主檔搜尋走 n-gram 索引，結果要與原本的 LIKE '%q%' 相同
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def search(client, q: str, **params):
+    r = await client.get("/suppliers/", params={"q": q, "limit": 100, **params})
+    assert r.status_code == 200
+    return [s["suName"] for s in r.json()]
+
+
+async def test_search_matches_substring_only(client):
+    for name in ("abc ca 貿易", "xabcay 貿易"):
+        r = await client.post("/suppliers/", json={"suName": name, "suPhone": "0", "suAddress": "test"})
+        assert r.status_code in (200, 201)
+
+    # 「abc ca」含有 abca 的所有 gram，但不含 abca 這個子字串
+    assert await search(client, "abca") == ["xabcay 貿易"]
+    # 單一字元與其他查詢一樣是子字串比對
+    assert set(await search(client, "y")) >= {"xabcay 貿易"}
+    assert "abc ca 貿易" not in await search(client, "y")
+    assert "abc ca 貿易" in await search(client, "c c")
+    assert "xabcay 貿易" not in await search(client, "c c")
+
+
+async def test_search_cursor_pages_through_all_hits(client):
+    for i in range(5):
+        r = await client.post("/suppliers/", json={"suName": f"游標測試 {i}", "suPhone": "0", "suAddress": "test"})
+        assert r.status_code in (200, 201)
+    expected = await search(client, "游標測試")
+    assert len(expected) == 5
+
+    names, after = [], None
+    while True:
+        r = await client.get("/suppliers/", params={"q": "游標測試", "limit": 2, **({"after": after} if after else {})})
+        names += [s["suName"] for s in r.json()]
+        after = r.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+    assert names == expected
+
+
+async def test_search_ignores_case_on_both_sides(client):
+    r = await client.post("/suppliers/", json={"suName": "USB 配件行", "suPhone": "0", "suAddress": "test"})
+    assert r.status_code in (200, 201)
+
+    # 索引與複查都只轉小寫：大小寫不同也找得到；全形字元不做轉換，需完全相同
+    assert "USB 配件行" in await search(client, "usb")
+    assert "USB 配件行" in await search(client, "Usb 配件")
+    assert "USB 配件行" not in await search(client, "ＵＳＢ")